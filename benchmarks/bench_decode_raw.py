@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Per-call latency of RpcApi._parse_main_response before and after the raw
+protobuf dump was moved behind a DEBUG level check. "before" adds the
+`protoc --decode_raw` fork every response used to pay, regardless of the
+configured log level.
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+import subprocess
+
+from fixtures import inventory_fixture, make_rpc_api, map_objects_fixture, per_call
+
+from pgoapi.wire import decode_raw
+
+
+def protoc_decode_raw(raw):
+    try:
+        process = subprocess.Popen(
+            ['protoc', '--decode_raw'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=True)
+        return process.communicate(raw)[0]
+    except OSError:
+        return None
+
+
+def main():
+    rpc = make_rpc_api()
+    log = logging.getLogger('pgoapi.rpc_api')
+    has_protoc = protoc_decode_raw(b'') is not None
+
+    for name, (subrequests, response) in (('GET_MAP_OBJECTS', map_objects_fixture()),
+                                          ('GET_INVENTORY', inventory_fixture())):
+        print('{} ({} bytes)'.format(name, len(response.content)))
+
+        def parse():
+            rpc._parse_main_response(response, subrequests, True)
+
+        log.setLevel(logging.INFO)
+        after = per_call(parse, number=50)
+        if has_protoc:
+            before = after + per_call(lambda: protoc_decode_raw(response.content), number=20)
+            print('  before, INFO  (protoc fork): {:8.3f} ms'.format(before * 1000))
+        else:
+            print('  before, INFO  (protoc fork): protoc not found in PATH')
+        print('  after,  INFO               : {:8.3f} ms'.format(after * 1000))
+
+        log.setLevel(logging.DEBUG)
+        debug = per_call(parse, number=10, repeat=3)
+        print('  after,  DEBUG (pure python): {:8.3f} ms'.format(debug * 1000))
+        print('  decode_raw alone           : {:8.3f} ms'.format(
+            per_call(lambda: decode_raw(response.content), number=10, repeat=3) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Per-message cost of turning response protos into dicts with
+pgoapi.proto_dict.message_to_dict compared to protobuf3-to-dict, which was
+used up to now. Install protobuf3-to-dict to get the "before" numbers.
+"""
+
+from __future__ import absolute_import, print_function
+
+from fixtures import get_inventory_response, get_map_objects_response, per_call
+
+from pgoapi.proto_dict import message_to_dict
+
+try:
+    from protobuf_to_dict import protobuf_to_dict
+except ImportError:
+    protobuf_to_dict = None
+
+
+def main():
+    cases = (
+        ('GET_MAP_OBJECTS', get_map_objects_response(), ['map_cells.wild_pokemons']),
+        ('GET_INVENTORY', get_inventory_response(),
+         ['inventory_delta.inventory_items.inventory_item_data.pokemon_data']),
+    )
+
+    for name, message, include in cases:
+        print('{} ({} bytes)'.format(name, message.ByteSize()))
+
+        if protobuf_to_dict is not None:
+            if protobuf_to_dict(message) != message_to_dict(message):
+                print('  WARNING: output differs from protobuf_to_dict')
+            print('  protobuf_to_dict       : {:8.3f} ms'.format(
+                per_call(lambda: protobuf_to_dict(message), number=20) * 1000))
+        else:
+            print('  protobuf_to_dict       : not installed')
+
+        print('  message_to_dict        : {:8.3f} ms'.format(
+            per_call(lambda: message_to_dict(message), number=20) * 1000))
+        print('  message_to_dict include: {:8.3f} ms  {}'.format(
+            per_call(lambda: message_to_dict(message, include), number=20) * 1000,
+            ', '.join(include)))
+
+
+if __name__ == '__main__':
+    main()
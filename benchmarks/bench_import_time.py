@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Reports how long `import pgoapi` takes in a fresh interpreter, based on
+`python -X importtime` (Python 3.7+), and lists the slowest imports.
+
+    python benchmarks/bench_import_time.py [--runs 5] [--top 15] [--max-ms 400]
+
+With --max-ms the script exits non-zero when the best run is slower, so it
+can guard against import time regressions.
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def importtime(module):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env)
+    _, stderr = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(stderr.decode('utf-8', 'replace'))
+
+    entries = []
+    for line in stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--module', default='pgoapi')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--max-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 7):
+        parser.error('-X importtime needs Python 3.7 or newer')
+
+    best = None
+    for _ in range(args.runs):
+        entries = importtime(args.module)
+        total = [e for e in entries if e[2].strip() == args.module][-1][0]
+        if best is None or total < best[0]:
+            best = (total, entries)
+
+    total, entries = best
+    print('import {}: {:.1f} ms (best of {})'.format(args.module, total / 1000.0, args.runs))
+    print('{:>10} {:>10}  module'.format('cumul ms', 'self ms'))
+    for cumulative, self_us, name in sorted(entries, reverse=True)[:args.top]:
+        print('{:10.1f} {:10.1f} {}'.format(cumulative / 1000.0, self_us / 1000.0, name))
+
+    if args.max_ms is not None and total / 1000.0 > args.max_ms:
+        print('import time above limit of {} ms'.format(args.max_ms))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+"""
+Load test of the PGoApi call path against the local stand-ins of
+fake_servers.py, which run in a separate process so they don't compete
+with the client for the GIL. Every session is a PGoApi instance logged in
+through the fake SSO (pgoapi.auth_batch.batch_login) and hashing through
+the fake hash server; all sessions share the default TransportManager.
+
+Reports calls and sub-requests per second, p50/p90/p99 call latency, the
+errors by type and the memory held per session (tracemalloc, measured
+while setting the sessions up and making their first call).
+
+    python benchmarks/bench_load.py --sessions 50 --calls 20 --latency 0.02
+    python benchmarks/bench_load.py --mix map --lazy --error-rate 0.01
+    python benchmarks/bench_load.py --mix map --map-cache
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+import argparse
+import threading
+import tracemalloc
+import multiprocessing
+
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+from pgoapi import PGoApi
+from pgoapi.auth_batch import batch_login
+from pgoapi.hash_server import HashServer
+from pgoapi.map_cache import MapCellCache
+from pgoapi.utilities import get_cell_ids, get_time
+
+POSITION = (40.7589, -73.9851, 10.0)
+
+
+def serve(queue, profile_args, hash_quota):
+    from fake_servers import FakeHashServer, FakeRpcServer, Profile
+    from fake_sso import FakeSsoServer
+
+    profile = Profile(**profile_args)
+    servers = [
+        FakeRpcServer(profile=profile).start(),
+        FakeHashServer(profile=profile, quota=hash_quota).start(),
+        # logins are setup, not load, keep them fast and reliable
+        FakeSsoServer().start()
+    ]
+    queue.put([server.url for server in servers])
+    while True:
+        time.sleep(3600)
+
+
+def start_servers(args):
+    queue = multiprocessing.Queue()
+    profile_args = {
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'error_rate': args.error_rate,
+        'throttle_rate': args.throttle_rate
+    }
+    process = multiprocessing.Process(
+        target=serve, args=(queue, profile_args, args.hash_quota))
+    process.daemon = True
+    process.start()
+    return process, queue.get(timeout=30)
+
+
+def get_map_objects(api):
+    lat, lng, _ = POSITION
+    cell_ids = get_cell_ids(lat, lng)
+    request = api.create_request()
+    request.get_map_objects(latitude=lat, longitude=lng,
+                            since_timestamp_ms=[0] * len(cell_ids),
+                            cell_id=cell_ids)
+    request.check_challenge()
+    request.get_hatched_eggs()
+    request.get_inventory(last_timestamp_ms=0)
+    request.check_awarded_badges()
+    return request
+
+
+def get_player(api):
+    request = api.create_request()
+    request.get_player(player_locale={'country': 'US', 'language': 'en',
+                                      'timezone': 'America/New_York'})
+    return request
+
+
+MIXES = {
+    'map': [get_map_objects],
+    'player': [get_player],
+    'mixed': [get_map_objects, get_player, get_player],
+}
+
+
+def create_sessions(args, auths, rpc_url):
+    keys = ['fake-key-{}'.format(i) for i in range(args.hash_keys)]
+    map_cell_cache = MapCellCache() if args.map_cache else None
+    sessions = []
+    for auth in auths:
+        api = PGoApi()
+        api.set_position(*POSITION)
+        api.set_api_endpoint(rpc_url)
+        api.activate_hash_server(keys if len(keys) > 1 else keys[0])
+        api.set_auth_provider(auth)
+        api.set_map_cell_cache(map_cell_cache)
+        sessions.append(api)
+    return sessions
+
+
+def run_session(api, builders, calls, call_kwargs, latencies, errors, lock):
+    own = []
+    own_errors = Counter()
+    for i in range(calls):
+        request = builders[i % len(builders)](api)
+        started = time.time()
+        try:
+            request.call(**call_kwargs)
+        except Exception as e:
+            own_errors[type(e).__name__] += 1
+        own.append(time.time() - started)
+    with lock:
+        latencies.extend(own)
+        errors.update(own_errors)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--calls', type=int, default=20,
+                        help='calls per session')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed')
+    parser.add_argument('--lazy', action='store_true')
+    parser.add_argument('--proto', action='store_true',
+                        help='call(use_dict=False)')
+    parser.add_argument('--map-cache', action='store_true',
+                        help='share a MapCellCache between the sessions')
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0)
+    parser.add_argument('--hash-keys', type=int, default=1)
+    parser.add_argument('--hash-quota', type=int, default=None,
+                        help='hash requests per key and minute')
+    args = parser.parse_args()
+
+    process, (rpc_url, hash_url, sso_url) = start_servers(args)
+    HashServer.endpoint = hash_url
+    call_kwargs = {'use_dict': not args.proto, 'lazy': args.lazy}
+    builders = MIXES[args.mix]
+
+    # memory per session: login, setup and the first call
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    auths = batch_login(
+        [('load{}'.format(i), 'password') for i in range(args.sessions)],
+        workers=20, sso_url=sso_url)
+    failed = [a for a in auths if isinstance(a, Exception)]
+    if failed:
+        sys.exit('{} logins failed, e.g. {!r}'.format(len(failed), failed[0]))
+    sessions = create_sessions(args, auths, rpc_url)
+    for api in sessions:
+        try:
+            builders[0](api).call(**call_kwargs)
+        except Exception:
+            pass  # the error profile applies to the first call too
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / len(sessions)
+    tracemalloc.stop()
+
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+    threads = [threading.Thread(target=run_session,
+                                args=(api, builders, args.calls, call_kwargs,
+                                      latencies, errors, lock))
+               for api in sessions]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    calls = len(latencies)
+    subrequests = sum(
+        5 if builders[i % len(builders)] is get_map_objects else 1
+        for i in range(args.calls)) * len(sessions)
+    print('{} sessions x {} calls ({}), {}s +{}s latency, {:.1%} errors, '
+          '{:.1%} throttled'.format(args.sessions, args.calls, args.mix,
+                                    args.latency, args.jitter, args.error_rate,
+                                    args.throttle_rate))
+    print('  calls/s         {:>10.1f}'.format(calls / elapsed))
+    print('  sub-requests/s  {:>10.1f}'.format(subrequests / elapsed))
+    for p in (50, 90, 99):
+        print('  p{:<14} {:>9.1f}ms'.format(p, percentile(latencies, p) * 1000))
+    print('  memory/session  {:>9.1f}K'.format(per_session / 1024.0))
+    print('  errors          {:>10}  {}'.format(
+        sum(errors.values()),
+        ', '.join('{} {}'.format(n, c) for c, n in errors.most_common())))
+
+    process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+PTC logins per second against the local SSO stand-in (fake_sso.py), one
+account after the other as AccountPool or a plain loop does it, and with
+pgoapi.auth_batch.batch_login. Also reports how many TCP connections the
+server saw, which shows the effect of the shared connection pools.
+
+    python benchmarks/bench_ptc_login.py --accounts 200 --latency 0.02
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from fake_servers import Profile
+from fake_sso import FakeSsoServer
+
+from pgoapi.auth_ptc import AuthPtc
+from pgoapi.auth_batch import batch_login
+from pgoapi.transport import TransportManager
+
+
+def sequential(credentials, sso_url, transport):
+    results = []
+    for username, password in credentials:
+        auth = AuthPtc(username=username, password=password,
+                       sso_url=sso_url, transport=transport)
+        try:
+            auth.user_login()
+            results.append(auth)
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def run(label, server, func):
+    before = server.get_stats()
+    start = time.time()
+    results = func()
+    elapsed = time.time() - start
+    after = server.get_stats()
+
+    ok = sum(1 for r in results if isinstance(r, AuthPtc) and r.is_login())
+    print('  {:<28} {:>8.1f} logins/s {:>6} ok {:>6} connections'.format(
+        label, len(results) / elapsed, ok,
+        after['connections'] - before['connections']))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='simulated round trip per SSO request')
+    parser.add_argument('--workers', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--rate-limit', type=float, default=None)
+    args = parser.parse_args()
+
+    server = FakeSsoServer(profile=Profile(args.latency)).start()
+    credentials = [('user{}'.format(i), 'password') for i in range(args.accounts)]
+    print('{} accounts, {}s latency per request'.format(args.accounts, args.latency))
+
+    run('sequential', server,
+        lambda: sequential(credentials, server.url, TransportManager()))
+    for workers in args.workers:
+        run('batch_login(workers={})'.format(workers), server,
+            lambda: batch_login(credentials, workers=workers,
+                                rate_limit=args.rate_limit,
+                                sso_url=server.url,
+                                transport=TransportManager()))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Peak memory, allocations and latency of RpcApi._parse_main_response per
+mode. "copying envelope" is the previous decoding path of the dict and lazy
+modes: the whole ResponseEnvelope is parsed, which copies every returns[i]
+into its own bytes object before the sub-response is parsed from it.
+"""
+
+from __future__ import absolute_import, print_function
+
+import tracemalloc
+
+from fixtures import inventory_fixture, make_rpc_api, map_objects_fixture, per_call
+
+from pgoapi.wire import split_field
+
+from pogoprotos.networking.envelopes.response_envelope_pb2 import ResponseEnvelope
+
+
+def copying_envelope(content):
+    envelope = ResponseEnvelope()
+    envelope.ParseFromString(content)
+    return envelope, list(envelope.returns)
+
+
+def split_envelope(content):
+    rest, returns = split_field(content, ResponseEnvelope.RETURNS_FIELD_NUMBER)
+    envelope = ResponseEnvelope()
+    envelope.ParseFromString(rest)
+    return envelope, returns
+
+
+def measure(func):
+    func()  # warm up descriptor and plan caches
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    return peak - before, current - before, blocks
+
+
+def main():
+    rpc = make_rpc_api()
+
+    for name, (subrequests, response) in (('GET_MAP_OBJECTS', map_objects_fixture()),
+                                          ('GET_INVENTORY', inventory_fixture(items=2000))):
+        content = response.content
+        print('{} ({} bytes)'.format(name, len(content)))
+        print('  {:<26} {:>10} {:>10} {:>8} {:>10}'.format(
+            '', 'peak', 'retained', 'blocks', 'time'))
+
+        cases = (
+            ('copying envelope', lambda: copying_envelope(content)),
+            ('split envelope', lambda: split_envelope(content)),
+            ('call(use_dict=False)',
+             lambda: rpc._parse_main_response(response, subrequests, False)),
+            ('call()',
+             lambda: rpc._parse_main_response(response, subrequests, True)),
+            ('call(lazy=True)',
+             lambda: rpc._parse_main_response(response, subrequests, True, True)),
+        )
+        for label, func in cases:
+            peak, retained, blocks = measure(func)
+            print('  {:<26} {:>9}K {:>9}K {:>8} {:>8.3f}ms'.format(
+                label, peak // 1024, retained // 1024, blocks,
+                per_call(func, number=10, repeat=3) * 1000))
+
+
+if __name__ == '__main__':
+    main()
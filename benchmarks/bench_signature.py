@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Cost of the Signature in RpcApi._build_main_request. "messages" builds and
+serializes it as a Signature message with nested location_fix and
+sensor_info, as done up to now; "template" writes it with the per session
+SignatureTemplate, which serializes the static parts once ("template"
+includes the encryption and the platform requests, so it is measured on
+the pessimistic side). The last columns
+puts the signing cost in relation to the client CPU of a whole call (build,
+serialize and parse with the default use_dict=True).
+"""
+
+from __future__ import absolute_import, print_function
+
+import ctypes
+import random
+
+from fixtures import make_rpc_api, map_objects_fixture, map_request_fixture, per_call, response_envelope
+
+from pgoapi.utilities import weighted_choice
+
+from pogoprotos.networking.envelopes.signature_pb2 import Signature
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+from pogoprotos.networking.responses.get_player_response_pb2 import GetPlayerResponse
+
+DEVICE_INFO = {
+    'device_id': '8525f6d8251f71b7',
+    'device_brand': 'Apple',
+    'device_model': 'iPhone',
+    'device_model_boot': 'iPhone10,2',
+    'hardware_manufacturer': 'Apple',
+    'hardware_model': 'D21AP',
+    'firmware_brand': 'iOS',
+    'firmware_type': '11.1.0'
+}
+
+
+def sign_with_messages(rpc, request, sig, altitude):
+    """
+    The serialization part of the previous _sign_main_request.
+    """
+    hash_engine = rpc._hash_engine
+    sig.location_hash1 = hash_engine.get_location_auth_hash()
+    sig.location_hash2 = hash_engine.get_location_hash()
+    for req_hash in hash_engine.get_request_hashes():
+        sig.request_hash.append(ctypes.c_uint64(req_hash).value)
+
+    loc = sig.location_fix.add()
+    sen = sig.sensor_info.add()
+    sen.timestamp_snapshot = sig.timestamp_since_start - int(random.triangular(93, 4900, 3000))
+    loc.timestamp_snapshot = sig.timestamp_since_start - int(random.triangular(320, 3000, 1000))
+    loc.provider = 'fused'
+    loc.latitude = request.latitude
+    loc.longitude = request.longitude
+    loc.altitude = altitude or random.uniform(150, 250)
+    loc.course = rpc.state.course
+    loc.speed = random.triangular(0.25, 9.7, 8.2)
+    loc.provider_status = 3
+    loc.location_type = 1
+    loc.horizontal_accuracy = request.accuracy
+    loc.vertical_accuracy = weighted_choice([(6, 4), (8, 34), (10, 35), (12, 11)])
+
+    sen.magnetic_field_accuracy = 2
+    sen.magnetic_field_x = rpc.state.magnetic_field_x
+    sen.magnetic_field_y = rpc.state.magnetic_field_y
+    sen.magnetic_field_z = rpc.state.magnetic_field_z
+    for name in ('linear_acceleration_x', 'linear_acceleration_y',
+                 'linear_acceleration_z', 'attitude_pitch', 'attitude_yaw',
+                 'attitude_roll', 'rotation_rate_x', 'rotation_rate_y',
+                 'rotation_rate_z', 'gravity_x', 'gravity_y', 'gravity_z'):
+        setattr(sen, name, random.triangular(-1, 1, 0))
+    sen.status = 3
+
+    sig.unknown25 = 4500779412463383546
+    for key in rpc.device_info:
+        setattr(sig.device_info, key, rpc.device_info[key])
+    sig.activity_status.stationary = True
+    return sig.SerializeToString()
+
+
+def main():
+    rpc = make_rpc_api()
+    rpc.device_info = DEVICE_INFO
+
+    player_response = response_envelope(GetPlayerResponse(success=True))
+    player = ([(RequestType.Value('GET_PLAYER'), None)],
+              type(map_objects_fixture()[1])(200, {}, player_response.SerializeToString()))
+    map_request, platforms, position = map_request_fixture()
+    map_response = map_objects_fixture()[1]
+
+    print('{:<18} {:>12} {:>12} {:>12} {:>14} {:>14}'.format(
+        '', 'messages', 'template', 'saved', 'share before', 'share after'))
+    for name, subrequests, response in (('GET_PLAYER', player[0], player[1]),
+                                        ('GET_MAP_OBJECTS', map_request, map_response)):
+        request, sig, _, altitude = rpc._prepare_main_request(
+            subrequests, platforms, position)
+        rpc._hash_engine.hash(sig.timestamp, request.latitude,
+                              request.longitude, request.accuracy, b'',
+                              sig.session_hash, request.requests)
+
+        def new_signature():
+            # what _prepare_main_request puts in, both paths start from it
+            fresh = Signature()
+            fresh.session_hash = sig.session_hash
+            fresh.timestamp = sig.timestamp
+            fresh.timestamp_since_start = sig.timestamp_since_start
+            return fresh
+
+        def messages():
+            return sign_with_messages(rpc, request, new_signature(), altitude)
+
+        def template():
+            del request.platform_requests[:]
+            return rpc._sign_main_request(request, new_signature(),
+                                          subrequests, altitude)
+
+        def call():
+            built = rpc._build_main_request(subrequests, platforms, position)
+            built.SerializeToString()
+            rpc._parse_main_response(response, subrequests)
+
+        before = per_call(messages, number=500)
+        after = per_call(template, number=500)
+        total = per_call(call, number=100)
+        # the call was measured with the template, add back what it saved
+        print('{:<18} {:>10.1f}us {:>10.1f}us {:>10.1f}us {:>13.1%} {:>13.1%}'.format(
+            name, before * 1e6, after * 1e6, (before - after) * 1e6,
+            before / (total - after + before), after / total))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks of the request/response hot path, with baselines to catch
+regressions between releases:
+
+    python benchmarks/bench_suite.py                        # run, compare to baseline.json
+    python benchmarks/bench_suite.py --save baseline.json   # store a new baseline
+    python benchmarks/bench_suite.py -k parse --repeat 9
+
+Timings are the best per-call time of `repeat` runs, each run sized to take
+about --run-time seconds. Cases slower than the baseline by more than
+--threshold are reported as regressions and make the script exit with 1.
+Baselines are only comparable on the same machine and Python version, the
+stored metadata shows where one was taken.
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+
+from collections import OrderedDict
+
+from fixtures import (get_map_objects_response, inventory_fixture,
+                      make_rpc_api, map_objects_fixture, map_request_fixture)
+
+import pgoapi
+from pgoapi.pgoapi import PGoApi
+from pgoapi.hash_server import HashServer
+from pgoapi.map_store import MapObjectStore
+from pgoapi.proto_dict import message_to_dict
+from pgoapi.proto_encode import get_encode_cache, set_encode_cache
+from pgoapi.proto_registry import get_request_class
+from pgoapi.utilities import clear_cell_id_cache, get_cell_ids, get_cell_ids_batch
+
+from google.protobuf.internal import api_implementation
+from pogoprotos.networking.envelopes.request_envelope_pb2 import RequestEnvelope
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), 'baseline.json')
+
+CASES = OrderedDict()
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+@case('rpc.build_main_request')
+def build_main_request():
+    rpc = make_rpc_api()
+    subrequests, platforms, position = map_request_fixture()
+    return lambda: rpc._build_main_request(subrequests, platforms, position)
+
+
+@case('rpc.build_sub_requests')
+def build_sub_requests():
+    rpc = make_rpc_api()
+    subrequests = map_request_fixture()[0]
+    return lambda: rpc._build_sub_requests(RequestEnvelope(), subrequests)
+
+
+def login_bundle():
+    """
+    The sub-requests of the last app_simulation_login call, sent with the
+    same arguments by every account.
+    """
+    return [
+        (RequestType.Value('DOWNLOAD_REMOTE_CONFIG_VERSION'),
+         {'platform': 1, 'app_version': PGoApi.get_api_version()}),
+        (RequestType.Value('CHECK_CHALLENGE'), None),
+        (RequestType.Value('GET_HATCHED_EGGS'), None),
+        (RequestType.Value('GET_INVENTORY'), {'last_timestamp_ms': 0}),
+        (RequestType.Value('CHECK_AWARDED_BADGES'), None),
+        (RequestType.Value('DOWNLOAD_SETTINGS'),
+         {'hash': '2788184af4004004d6ab0740f7632983332106f6'}),
+        (RequestType.Value('GET_PLAYER'),
+         {'player_locale': {'country': 'US', 'language': 'en',
+                            'timezone': 'America/Chicago'}}),
+    ]
+
+
+@case('rpc.build_sub_requests[login bundle]')
+def build_login_bundle():
+    rpc = make_rpc_api()
+    subrequests = login_bundle()
+    return lambda: rpc._build_sub_requests(RequestEnvelope(), subrequests)
+
+
+@case('rpc.build_sub_requests[login bundle,uncached]')
+def build_login_bundle_uncached():
+    rpc = make_rpc_api()
+    subrequests = login_bundle()
+
+    def build():
+        cache = get_encode_cache()
+        set_encode_cache(None)
+        try:
+            return rpc._build_sub_requests(RequestEnvelope(), subrequests)
+        finally:
+            set_encode_cache(cache)
+    return build
+
+
+@case('rpc.get_proto_bytes[GET_MAP_OBJECTS]')
+def get_proto_bytes():
+    rpc = make_rpc_api()
+    request_type, params = map_request_fixture()[0][0]
+    proto_class = get_request_class(request_type)
+    return lambda: rpc._get_proto_bytes(proto_class, params)
+
+
+def parse_main_response(fixture, use_dict, lazy=False):
+    def setup():
+        rpc = make_rpc_api()
+        subrequests, response = fixture()
+        return lambda: rpc._parse_main_response(response, subrequests,
+                                                use_dict, lazy)
+    return setup
+
+
+for _name, _fixture in (('GET_MAP_OBJECTS', map_objects_fixture),
+                        ('GET_INVENTORY', inventory_fixture)):
+    case('rpc.parse_main_response[{},dict]'.format(_name))(
+        parse_main_response(_fixture, True))
+    case('rpc.parse_main_response[{},proto]'.format(_name))(
+        parse_main_response(_fixture, False))
+    case('rpc.parse_main_response[{},lazy]'.format(_name))(
+        parse_main_response(_fixture, True, True))
+
+
+@case('map_store.ingest[GET_MAP_OBJECTS]')
+def map_store_ingest():
+    response = message_to_dict(get_map_objects_response())
+    return lambda: MapObjectStore().ingest(response, now=0)
+
+
+@case('map_store.query_radius[500m]')
+def map_store_query():
+    """
+    Wild pokemon around a position, in a store filled with 1000 map cells
+    of the 40.7-40.8, -74.0--73.9 area.
+    """
+    store = MapObjectStore()
+    for seed in range(40):
+        store.ingest(get_map_objects_response(seed=seed), now=0)
+    return lambda: store.query_radius('wild_pokemons', 40.75, -73.95, 500,
+                                      now=0)
+
+
+@case('hash_server.build_payload')
+def hash_payload():
+    rpc = make_rpc_api()
+    subrequests, platforms, position = map_request_fixture()
+    request, sig, ticket, _ = rpc._prepare_main_request(subrequests, platforms,
+                                                        position)
+    server = HashServer('benchmark-key')
+    return lambda: server._build_payload(
+        sig.timestamp, request.latitude, request.longitude, request.accuracy,
+        ticket, sig.session_hash, request.requests)
+
+
+def uncached_cell_ids(lat, lng, radius):
+    def cell_ids():
+        clear_cell_id_cache()
+        return get_cell_ids(lat, lng, radius)
+    return cell_ids
+
+
+@case('utilities.get_cell_ids[500m]')
+def cell_ids():
+    return uncached_cell_ids(40.7589, -73.9851, 500)
+
+
+@case('utilities.get_cell_ids[1500m]')
+def cell_ids_max():
+    return uncached_cell_ids(40.7589, -73.9851, 1500)
+
+
+@case('utilities.get_cell_ids[500m,cached]')
+def cell_ids_cached():
+    return lambda: get_cell_ids(40.7589, -73.9851)
+
+
+@case('utilities.get_cell_ids_batch[100 points]')
+def cell_ids_batch():
+    """
+    A 10x10 grid of scan positions 150m apart, per call.
+    """
+    points = [(40.7589 + row * 0.00135, -73.9851 + column * 0.00178)
+              for row in range(10) for column in range(10)]
+
+    def batch():
+        clear_cell_id_cache()
+        return get_cell_ids_batch(points)
+    return batch
+
+
+@case('pgoapi.request_dispatch')
+def request_dispatch():
+    """
+    PGoApiRequest.__getattr__ lookups of the usual map refresh requests.
+    """
+    api = PGoApi()
+    api.set_position(40.7589, -73.9851, 10.0)
+
+    def dispatch():
+        request = api.create_request()
+        request.get_map_objects(latitude=40.7589, longitude=-73.9851)
+        request.check_challenge()
+        request.get_hatched_eggs()
+        request.get_inventory(last_timestamp_ms=0)
+        request.check_awarded_badges()
+        request.get_buddy_walked()
+        return request
+    return dispatch
+
+
+def measure(func, repeat, run_time):
+    func()  # warm up caches
+    number, elapsed = 1, 0
+    while elapsed < run_time / 10.0:
+        number *= 2
+        elapsed = timeit.timeit(func, number=number)
+    number = max(1, int(number * run_time / elapsed))
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def get_metadata():
+    return {
+        'pgoapi': pgoapi.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'protobuf': api_implementation.Type(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%d'),
+    }
+
+
+def format_time(seconds):
+    if seconds >= 1e-3:
+        return '{:.3f}ms'.format(seconds * 1e3)
+    return '{:.2f}us'.format(seconds * 1e6)
+
+
+def report(results, baseline, threshold):
+    regressions = []
+    base_results = baseline['results'] if baseline else {}
+    print('{:<46} {:>12} {:>12} {:>8}'.format('case', 'time', 'baseline', 'change'))
+    for name, seconds in results.items():
+        base = base_results.get(name)
+        if base:
+            change = seconds / base - 1
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append(name)
+            elif change < -threshold:
+                flag = '  faster'
+            print('{:<46} {:>12} {:>12} {:>+7.1%}{}'.format(
+                name, format_time(seconds), format_time(base), change, flag))
+        else:
+            print('{:<46} {:>12} {:>12} {:>8}'.format(
+                name, format_time(seconds), '-', ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', dest='filter', default=None,
+                        help='only run cases containing this string')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--run-time', type=float, default=0.2,
+                        help='seconds per repeat of a case')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', metavar='PATH', default=None,
+                        help='store the results as a new baseline')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown reported as regression, 0.10 = 10%%')
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    metadata = get_metadata()
+    print(' '.join('{}={}'.format(k, v) for k, v in sorted(metadata.items())))
+    if baseline:
+        different = sorted(k for k in ('python', 'protobuf', 'machine')
+                           if baseline['meta'].get(k) != metadata[k])
+        print('baseline: pgoapi {} from {}{}'.format(
+            baseline['meta'].get('pgoapi'), baseline['meta'].get('date'),
+            ' (different {}, compare with care)'.format(', '.join(different))
+            if different else ''))
+    print()
+
+    results = OrderedDict()
+    for name, setup in CASES.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(setup(), args.repeat, args.run_time)
+
+    regressions = report(results, baseline, args.threshold)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'meta': metadata, 'results': results}, f, indent=2)
+            f.write('\n')
+        print('\nSaved baseline to {}'.format(args.save))
+
+    if regressions:
+        print('\n{} regression(s) over {:.0%}'.format(len(regressions),
+                                                     args.threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Local stand-ins for the services pgoapi talks to, for load tests without
+touching the real ones. All of them speak plain HTTP/1.1 with keep-alive
+and share a Profile of simulated latency and failures:
+
+    FakeRpcServer   POST /rpc, decodes the RequestEnvelope and answers every
+                    sub-request with a canned response of its RequestType
+    FakeHashServer  POST /api/v157_5/hash, the JSON protocol of HashServer
+                    including its X-Rate* headers and 429s per key and period
+    FakeSsoServer   the PTC login flow, see fake_sso.py
+
+    python benchmarks/fake_servers.py --latency 0.02 --error-rate 0.01
+"""
+
+from __future__ import absolute_import, print_function
+
+import json
+import time
+import random
+import argparse
+import threading
+
+from itertools import count
+from socketserver import ThreadingMixIn
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from fixtures import get_inventory_response, get_map_objects_response
+
+from pgoapi.utilities import get_time
+from pgoapi.exceptions import ProtoNotFoundException
+from pgoapi.proto_registry import get_response_class
+
+from pogoprotos.networking.envelopes.request_envelope_pb2 import RequestEnvelope
+from pogoprotos.networking.envelopes.response_envelope_pb2 import ResponseEnvelope
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+
+
+class Profile(object):
+    """
+    latency: seconds added to every request, plus up to `jitter` more
+    error_rate: share of requests answered with a 503
+    throttle_rate: share of RPCs answered with status code 52 (throttled)
+    """
+
+    def __init__(self, latency=0, jitter=0, error_rate=0, throttle_rate=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+    def delay(self):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def fail(self):
+        return random.random() < self.error_rate
+
+    def throttle(self):
+        return random.random() < self.throttle_rate
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, don't let Nagle delay them
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.count('connections')
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        self.server.count('requests')
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+
+        self.server.profile.delay()
+        if self.server.profile.fail():
+            self.server.count('errors')
+            self.send(503, b'Service Unavailable', content_type='text/plain')
+            return
+        self.handle_request(body)
+
+    def handle_request(self, body):
+        raise NotImplementedError()
+
+    def send(self, status, body=b'', headers=None,
+             content_type='application/json'):
+        if isinstance(body, dict):
+            body = json.dumps(body)
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# http.server.ThreadingHTTPServer is only there from Python 3.7 on
+class FakeServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    handler_class = None
+
+    def __init__(self, address=('127.0.0.1', 0), profile=None):
+        HTTPServer.__init__(self, address, self.handler_class)
+        self.profile = profile or Profile()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self.stats = {'connections': 0, 'requests': 0, 'errors': 0}
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address[:2])
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + n
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever,
+                                  name=type(self).__name__)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+class FakeRpcHandler(FakeHandler):
+    def handle_request(self, body):
+        request = RequestEnvelope()
+        try:
+            request.ParseFromString(body)
+        except Exception:
+            self.send(400, b'', content_type='application/binary')
+            return
+
+        response = ResponseEnvelope()
+        response.request_id = request.request_id
+        ticket = response.auth_ticket
+        ticket.expire_timestamp_ms = get_time(ms=True) + 1800000
+        ticket.start = b'fake-ticket-start'
+        ticket.end = b'fake-ticket-end'
+
+        if self.server.profile.throttle():
+            self.server.count('throttled')
+            response.status_code = 52
+        else:
+            response.status_code = 1
+            for subrequest in request.requests:
+                response.returns.append(
+                    self.server.get_response(subrequest.request_type))
+        self.server.count('subrequests', len(request.requests))
+
+        self.send(200, response.SerializeToString(),
+                  content_type='application/binary')
+
+
+class FakeRpcServer(FakeServer):
+    """
+    Canned sub-responses are built once per RequestType: generated map
+    objects and inventory (see fixtures.py), otherwise an empty response
+    with success/status set.
+    """
+    handler_class = FakeRpcHandler
+
+    def __init__(self, address=('127.0.0.1', 0), profile=None, cells=25,
+                 items=400):
+        FakeServer.__init__(self, address, profile)
+        self._responses = {
+            RequestType.Value('GET_MAP_OBJECTS'):
+            get_map_objects_response(cells).SerializeToString(),
+            RequestType.Value('GET_INVENTORY'):
+            get_inventory_response(items).SerializeToString(),
+        }
+
+    @property
+    def url(self):
+        return FakeServer.url.fget(self) + '/rpc'
+
+    def get_response(self, request_type):
+        try:
+            return self._responses[request_type]
+        except KeyError:
+            pass
+
+        try:
+            response = get_response_class(request_type)()
+        except ProtoNotFoundException:
+            content = b''
+        else:
+            fields = response.DESCRIPTOR.fields_by_name
+            if 'success' in fields:
+                response.success = True
+            elif 'status' in fields and fields['status'].enum_type:
+                response.status = 1
+            elif 'result' in fields and fields['result'].enum_type:
+                response.result = 1
+            content = response.SerializeToString()
+
+        self._responses[request_type] = content
+        return content
+
+
+class FakeHashHandler(FakeHandler):
+    def handle_request(self, body):
+        key = self.headers.get('X-AuthToken')
+        if not key:
+            self.send(401, b'Unauthorized', content_type='text/plain')
+            return
+
+        rate = self.server.take(key)
+        headers = {
+            'X-RatePeriodEnd': str(rate['period_end']),
+            'X-RateRequestsRemaining': str(rate['remaining']),
+            'X-MaxRequestCount': str(self.server.quota),
+            'X-AuthTokenExpiration': str(int(time.time()) + 86400)
+        }
+        if rate['limited']:
+            self.server.count('limited')
+            self.send(429, b'Request limited', headers, content_type='text/plain')
+            return
+
+        try:
+            requests = json.loads(body.decode('utf-8'))['Requests']
+        except (ValueError, KeyError, TypeError):
+            self.send(400, b'Bad request', content_type='text/plain')
+            return
+
+        rnd = random.Random(len(body))
+        self.send(200, {
+            'locationHash': rnd.getrandbits(31),
+            'locationAuthHash': rnd.getrandbits(31),
+            'requestHashes': [rnd.getrandbits(63) for _ in requests]
+        }, headers)
+
+
+class FakeHashServer(FakeServer):
+    """
+    Allows `quota` requests per key and period of `period` seconds, like
+    the rate limits of the real hashing API. quota=None disables the limit.
+    """
+    handler_class = FakeHashHandler
+
+    def __init__(self, address=('127.0.0.1', 0), profile=None, quota=None,
+                 period=60):
+        FakeServer.__init__(self, address, profile)
+        self.quota = quota
+        self.period = period
+        self._keys = {}
+
+    @property
+    def url(self):
+        return FakeServer.url.fget(self) + '/api/v157_5/hash'
+
+    def take(self, key):
+        with self._lock:
+            now = time.time()
+            period_end, used = self._keys.get(key, (0, 0))
+            if now >= period_end:
+                period_end, used = int(now) + self.period, 0
+
+            quota = self.quota if self.quota is not None else 2**31
+            limited = used >= quota
+            if not limited:
+                used += 1
+            self._keys[key] = (period_end, used)
+            return {'period_end': period_end,
+                    'remaining': max(0, quota - used),
+                    'limited': limited}
+
+
+def main():
+    from fake_sso import FakeSsoServer
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--rpc-port', type=int, default=8000)
+    parser.add_argument('--hash-port', type=int, default=8001)
+    parser.add_argument('--sso-port', type=int, default=8002)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--jitter', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0)
+    parser.add_argument('--hash-quota', type=int, default=None)
+    args = parser.parse_args()
+
+    profile = Profile(args.latency, args.jitter, args.error_rate,
+                      args.throttle_rate)
+    servers = [
+        FakeRpcServer((args.host, args.rpc_port), profile).start(),
+        FakeHashServer((args.host, args.hash_port), profile,
+                       quota=args.hash_quota).start(),
+        FakeSsoServer((args.host, args.sso_port), profile).start()
+    ]
+    for server in servers:
+        print('{:<16} {}'.format(type(server).__name__, server.url))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the PTC SSO server (sso.pokemon.com), speaking plain
+HTTP/1.1 with keep-alive. It implements just enough of the login flow of
+AuthPtc.user_login to benchmark and test logins offline:
+
+    GET  /sso/logout                302
+    GET  /sso/login                 JSON with lt and execution
+    POST /sso/login                 CASTGC cookie and a 302 to ?ticket=ST-...
+    POST /sso/oauth2.0/accessToken  access_token=...&expires=7200
+    POST /sso/oauth2.0/profile      JSON profile
+
+Every password is accepted except 'wrong', which gets the error response of
+a failed login. The Profile (see fake_servers.py) adds latency and errors
+to simulate the real server.
+
+    python benchmarks/fake_sso.py --port 8443 --latency 0.05
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+
+from urllib.parse import parse_qs, urlsplit
+
+from fake_servers import FakeHandler, FakeServer, Profile
+
+
+class FakeSsoHandler(FakeHandler):
+    def handle_request(self, body):
+        form = parse_qs(body.decode('utf-8'))
+        path = urlsplit(self.path).path
+
+        if path == '/sso/logout':
+            self.send(302, headers={'Location': '/sso/login'})
+        elif path == '/sso/login' and self.command == 'GET':
+            self.send(200, {'lt': 'LT-{}'.format(self.server.next_id()),
+                            'execution': 'e1s1'})
+        elif path == '/sso/login':
+            if form.get('password', [''])[0] == 'wrong':
+                self.server.count('failed')
+                self.send(200, {'errors': ['Your username or password is incorrect.']})
+                return
+            n = self.server.next_id()
+            self.server.count('logins')
+            self.send(302, headers={
+                'Location': 'https://www.nianticlabs.com/pokemongo/error?ticket=ST-{}'.format(n),
+                'Set-Cookie': 'CASTGC=TGT-{}-fake-sso; Path=/sso/'.format(n)
+            })
+        elif path == '/sso/oauth2.0/accessToken':
+            body = 'access_token=AT-{}&expires=7200'.format(self.server.next_id())
+            self.send(200, body, content_type='text/plain')
+        elif path == '/sso/oauth2.0/profile':
+            self.send(200, {'username': 'fake', 'locale': 'en_US'})
+        else:
+            self.send(404, {'error': 'not found'})
+
+
+class FakeSsoServer(FakeServer):
+    handler_class = FakeSsoHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--latency', type=float, default=0)
+    args = parser.parse_args()
+
+    server = FakeSsoServer((args.host, args.port), Profile(args.latency))
+    print('Fake SSO listening on {}'.format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
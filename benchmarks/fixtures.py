@@ -0,0 +1,190 @@
+"""
+Deterministic stand-ins for recorded traffic, shared by the benchmark
+scripts. Payload shapes follow real GET_MAP_OBJECTS and GET_INVENTORY
+responses; the content is generated from a fixed seed so runs are
+comparable between releases.
+"""
+
+from __future__ import absolute_import
+
+import os
+import sys
+import random
+import timeit
+
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import pgoapi
+from pgoapi.auth import Auth
+from pgoapi.hash_engine import HashEngine
+from pgoapi.rpc_api import RpcApi, RpcState
+from pgoapi.utilities import get_time
+
+from pogoprotos.networking.envelopes.response_envelope_pb2 import ResponseEnvelope
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+from pogoprotos.networking.responses.get_map_objects_response_pb2 import GetMapObjectsResponse
+from pogoprotos.networking.responses.get_inventory_response_pb2 import GetInventoryResponse
+
+FakeResponse = namedtuple('FakeResponse', ['status_code', 'headers', 'content'])
+
+
+class FixedAuth(Auth):
+    def __init__(self):
+        Auth.__init__(self)
+        self._auth_provider = 'ptc'
+        self._login = True
+        self._access_token = 'TGT-0000000-benchmark-cas'
+        self._access_token_expiry = get_time() + 7200
+
+    def get_access_token(self, force_refresh=False):
+        return self._access_token
+
+
+class StaticHashEngine(HashEngine):
+    def hash(self, timestamp, latitude, longitude, accuracy, authticket,
+             sessiondata, requests):
+        self.location_auth_hash = 0x1234
+        self.location_hash = 0x5678
+        self.request_hashes = [0x9abcdef0 + i for i in range(len(requests))]
+
+
+def make_rpc_api(auth=None):
+    rpc = RpcApi(auth or FixedAuth(), None, RpcState(), 2,
+                 get_time(ms=True) - 10000)
+    rpc._hash_engine = StaticHashEngine()
+    return rpc
+
+
+def get_map_objects_response(cells=25, seed=0):
+    rnd = random.Random(seed)
+    response = GetMapObjectsResponse()
+    response.status = 1
+    for _ in range(cells):
+        cell = response.map_cells.add()
+        cell.s2_cell_id = rnd.getrandbits(64)
+        cell.current_timestamp_ms = 1500000000000 + rnd.randint(0, 10**6)
+        for _ in range(rnd.randint(0, 4)):
+            fort = cell.forts.add()
+            fort.id = '%032x.16' % rnd.getrandbits(128)
+            fort.last_modified_timestamp_ms = 1500000000000
+            fort.latitude = rnd.uniform(40.7, 40.8)
+            fort.longitude = rnd.uniform(-74.0, -73.9)
+            fort.enabled = True
+            fort.type = rnd.randint(0, 1)
+            fort.image_url = 'http://lh3.ggpht.com/' + '%040x' % rnd.getrandbits(160)
+        for _ in range(rnd.randint(0, 6)):
+            spawn = cell.spawn_points.add()
+            spawn.latitude = rnd.uniform(40.7, 40.8)
+            spawn.longitude = rnd.uniform(-74.0, -73.9)
+        for _ in range(rnd.randint(0, 5)):
+            wild = cell.wild_pokemons.add()
+            wild.encounter_id = rnd.getrandbits(64)
+            wild.last_modified_timestamp_ms = 1500000000000
+            wild.latitude = rnd.uniform(40.7, 40.8)
+            wild.longitude = rnd.uniform(-74.0, -73.9)
+            wild.spawn_point_id = '%011x' % rnd.getrandbits(44)
+            wild.time_till_hidden_ms = rnd.randint(60000, 1800000)
+            wild.pokemon_data.pokemon_id = rnd.randint(1, 251)
+            catchable = cell.catchable_pokemons.add()
+            catchable.spawn_point_id = wild.spawn_point_id
+            catchable.encounter_id = wild.encounter_id
+            catchable.pokemon_id = wild.pokemon_data.pokemon_id
+            catchable.expiration_timestamp_ms = 1500000000000 + wild.time_till_hidden_ms
+            catchable.latitude = wild.latitude
+            catchable.longitude = wild.longitude
+        for _ in range(rnd.randint(0, 5)):
+            nearby = cell.nearby_pokemons.add()
+            nearby.pokemon_id = rnd.randint(1, 251)
+            nearby.encounter_id = rnd.getrandbits(64)
+            nearby.distance_in_meters = rnd.uniform(0, 200)
+    return response
+
+
+def get_inventory_response(items=400, seed=0):
+    rnd = random.Random(seed)
+    response = GetInventoryResponse()
+    response.success = True
+    delta = response.inventory_delta
+    delta.original_timestamp_ms = 1500000000000
+    delta.new_timestamp_ms = 1500000100000
+    for i in range(items):
+        entry = delta.inventory_items.add()
+        entry.modified_timestamp_ms = 1500000000000 + i
+        data = entry.inventory_item_data
+        if i % 4:
+            pokemon = data.pokemon_data
+            pokemon.id = rnd.getrandbits(64)
+            pokemon.pokemon_id = rnd.randint(1, 251)
+            pokemon.cp = rnd.randint(10, 3000)
+            pokemon.stamina = pokemon.stamina_max = rnd.randint(10, 200)
+            pokemon.move_1 = rnd.randint(200, 250)
+            pokemon.move_2 = rnd.randint(13, 130)
+            pokemon.height_m = rnd.uniform(0.2, 3)
+            pokemon.weight_kg = rnd.uniform(1, 300)
+            pokemon.individual_attack = rnd.randint(0, 15)
+            pokemon.individual_defense = rnd.randint(0, 15)
+            pokemon.individual_stamina = rnd.randint(0, 15)
+            pokemon.cp_multiplier = rnd.uniform(0.1, 0.8)
+            pokemon.pokeball = rnd.randint(1, 3)
+            pokemon.captured_cell_id = rnd.getrandbits(64)
+            pokemon.creation_time_ms = 1500000000000 - rnd.randint(0, 10**9)
+        else:
+            data.item.item_id = rnd.choice((1, 2, 3, 101, 102, 201, 701, 703))
+            data.item.count = rnd.randint(1, 100)
+    return response
+
+
+def response_envelope(*subresponses):
+    envelope = ResponseEnvelope()
+    envelope.status_code = 1
+    envelope.request_id = 0x7ead5fa9c85c5a66
+    envelope.auth_ticket.expire_timestamp_ms = get_time(ms=True) + 1800000
+    envelope.auth_ticket.start = os.urandom(40)
+    envelope.auth_ticket.end = os.urandom(20)
+    for subresponse in subresponses:
+        envelope.returns.append(subresponse.SerializeToString())
+    return envelope
+
+
+def map_objects_fixture(cells=25):
+    subrequests = [(RequestType.Value('GET_MAP_OBJECTS'), None)]
+    envelope = response_envelope(get_map_objects_response(cells))
+    return subrequests, FakeResponse(200, {}, envelope.SerializeToString())
+
+
+def inventory_fixture(items=400):
+    subrequests = [(RequestType.Value('GET_INVENTORY'), None)]
+    envelope = response_envelope(get_inventory_response(items))
+    return subrequests, FakeResponse(200, {}, envelope.SerializeToString())
+
+
+def map_request_fixture():
+    """
+    Sub-requests and position of the GET_MAP_OBJECTS call the app makes on
+    every map refresh, with the usual companion requests.
+    """
+    from pgoapi.utilities import get_cell_ids
+
+    lat, lng, alt = 40.7589, -73.9851, 10.0
+    cell_ids = get_cell_ids(lat, lng)
+    subrequests = [
+        (RequestType.Value('GET_MAP_OBJECTS'), {
+            'latitude': lat,
+            'longitude': lng,
+            'since_timestamp_ms': [0] * len(cell_ids),
+            'cell_id': cell_ids
+        }),
+        (RequestType.Value('CHECK_CHALLENGE'), None),
+        (RequestType.Value('GET_HATCHED_EGGS'), None),
+        (RequestType.Value('GET_INVENTORY'), {'last_timestamp_ms': 1500000000000}),
+        (RequestType.Value('CHECK_AWARDED_BADGES'), None),
+        (RequestType.Value('DOWNLOAD_SETTINGS'), {'hash': '2788184af4004004d6ab0740f7632983332106f6'}),
+        (RequestType.Value('GET_BUDDY_WALKED'), None),
+    ]
+    return subrequests, [], (lat, lng, alt)
+
+
+def per_call(func, number=200, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
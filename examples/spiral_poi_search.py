@@ -30,7 +30,6 @@ import sys
 import json
 import time
 import struct
-import random
 import logging
 import requests
 import argparse
@@ -39,10 +38,12 @@ import pprint
 from pgoapi import PGoApi
 from pgoapi.utilities import f2i, h2f
 from pgoapi import utilities as util
+from pgoapi.map_cache import MapCellCache
+from pgoapi.map_store import MapObjectStore
+from pgoapi.scan import Circle, plan_scan
 
 from google.protobuf.internal import encoder
 from geopy.geocoders import GoogleV3
-from s2sphere import Cell, CellId, LatLng
 
 log = logging.getLogger(__name__)
 
@@ -57,22 +58,6 @@ def get_pos_by_name(location_name):
 
     return (loc.latitude, loc.longitude, loc.altitude)
 
-def get_cell_ids(lat, long, radius = 10):
-    origin = CellId.from_lat_lng(LatLng.from_degrees(lat, long)).parent(15)
-    walk = [origin.id()]
-    right = origin.next()
-    left = origin.prev()
-
-    # Search around provided radius
-    for i in range(radius):
-        walk.append(right.id())
-        walk.append(left.id())
-        right = right.next()
-        left = left.prev()
-
-    # Return everything
-    return sorted(walk)
-
 def encode(cellid):
     output = []
     encoder._VarintEncoder()(output.append, cellid)
@@ -159,70 +144,33 @@ def main():
     find_poi(api, position[0], position[1])
 
 def find_poi(api, lat, lng):
-    poi = {'pokemons': {}, 'forts': []}
-    step_size = 0.0015
-    step_limit = 49
-    coords = generate_spiral(lat, lng, step_size, step_limit)
-    for coord in coords:
-        lat = coord['lat']
-        lng = coord['lng']
-        api.set_position(lat, lng, 0)
-
-        
-        #get_cellid was buggy -> replaced through get_cell_ids from pokecli
-        #timestamp gets computed a different way:
-        cell_ids = get_cell_ids(lat, lng)
+    store = MapObjectStore()
+    # neighbouring positions share cells, only ask for what changed since
+    api.set_map_cell_cache(MapCellCache())
+    # positions covering every level 15 cell within 700m, in walking order
+    coords = plan_scan(Circle(lat, lng, 700))
+    for scan_lat, scan_lng in coords:
+        api.set_position(scan_lat, scan_lng, 0)
+
+        cell_ids = util.get_cell_ids(scan_lat, scan_lng)
         timestamps = [0,] * len(cell_ids)
-        response_dict = api.get_map_objects(latitude = util.f2i(lat), longitude = util.f2i(lng), since_timestamp_ms = timestamps, cell_id = cell_ids)
-        if (response_dict['responses']):
-            if 'status' in response_dict['responses']['GET_MAP_OBJECTS']:
-                if response_dict['responses']['GET_MAP_OBJECTS']['status'] == 1:
-                    for map_cell in response_dict['responses']['GET_MAP_OBJECTS']['map_cells']:
-                        if 'wild_pokemons' in map_cell:
-                            for pokemon in map_cell['wild_pokemons']:
-                                pokekey = get_key_from_pokemon(pokemon)
-                                pokemon['hides_at'] = time.time() + pokemon['time_till_hidden_ms']/1000
-                                poi['pokemons'][pokekey] = pokemon
+        response_dict = api.get_map_objects(latitude = util.f2i(scan_lat), longitude = util.f2i(scan_lng), since_timestamp_ms = timestamps, cell_id = cell_ids)
+        store.ingest(response_dict)
 
         # time.sleep(0.51)
+    poi = {'pokemons': store.query_radius('wild_pokemons', lat, lng, 700),
+           'forts': store.query_radius('forts', lat, lng, 700)}
     # new dict, binary data
     # print('POI dictionary: \n\r{}'.format(json.dumps(poi, indent=2)))
     print('POI dictionary: \n\r{}'.format(pprint.PrettyPrinter(indent=4).pformat(poi)))
-    print('Open this in a browser to see the path the spiral search took:')
+    print('Open this in a browser to see the path the search took:')
     print_gmaps_dbug(coords)
 
-def get_key_from_pokemon(pokemon):
-    return '{}-{}'.format(pokemon['spawn_point_id'], pokemon['pokemon_data']['pokemon_id'])
-
 def print_gmaps_dbug(coords):
     url_string = 'http://maps.googleapis.com/maps/api/staticmap?size=400x400&path='
-    for coord in coords:
-        url_string += '{},{}|'.format(coord['lat'], coord['lng'])
+    for lat, lng in coords:
+        url_string += '{},{}|'.format(lat, lng)
     print(url_string[:-1])
 
-def generate_spiral(starting_lat, starting_lng, step_size, step_limit):
-    coords = [{'lat': starting_lat, 'lng': starting_lng}]
-    steps,x,y,d,m = 1, 0, 0, 1, 1
-    rlow = 0.0
-    rhigh = 0.0005
-
-    while steps < step_limit:
-        while 2 * x * d < m and steps < step_limit:
-            x = x + d
-            steps += 1
-            lat = x * step_size + starting_lat + random.uniform(rlow, rhigh)
-            lng = y * step_size + starting_lng + random.uniform(rlow, rhigh)
-            coords.append({'lat': lat, 'lng': lng})
-        while 2 * y * d < m and steps < step_limit:
-            y = y + d
-            steps += 1
-            lat = x * step_size + starting_lat + random.uniform(rlow, rhigh)
-            lng = y * step_size + starting_lng + random.uniform(rlow, rhigh)
-            coords.append({'lat': lat, 'lng': lng})
-
-        d = -1 * d
-        m = m + 1
-    return coords
-
 if __name__ == '__main__':
     main()
@@ -27,7 +27,6 @@ from __future__ import absolute_import
 
 from pgoapi.exceptions import PleaseInstallProtobufVersion3
 
-import pkg_resources
 import logging
 
 __title__ = 'pgoapi'
@@ -39,12 +38,13 @@ __copyright__ = 'Copyright (c) 2016 tjado <https://github.com/tejado>'
 protobuf_exist = False
 protobuf_version = 0
 try:
-    protobuf_version = pkg_resources.get_distribution("protobuf").version
+    # much cheaper than asking pkg_resources, which scans every distribution
+    from google.protobuf import __version__ as protobuf_version
     protobuf_exist = True
 except Exception:
     pass
 
-if (not protobuf_exist) or (int(protobuf_version[:1]) < 3):
+if (not protobuf_exist) or (int(protobuf_version.split(".")[0]) < 3):
     raise PleaseInstallProtobufVersion3()
 
 from pgoapi.pgoapi import PGoApi
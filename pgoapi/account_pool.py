@@ -0,0 +1,275 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pgoapi.pgoapi import PGoApi
+from pgoapi.exceptions import AuthException, BannedAccountException, InvalidCredentialsException, NianticThrottlingException, NoAccountAvailableException, NotLoggedInException
+
+"""
+Runs work on a pool of accounts, each with its own PGoApi instance. On
+Python 2 concurrent.futures comes from the `futures` backport, which is
+installed with pgoapi there.
+"""
+
+NEW = 'new'
+READY = 'ready'
+BUSY = 'busy'
+COOLDOWN = 'cooldown'
+BANNED = 'banned'
+FAILED = 'failed'
+
+
+class Account(object):
+    def __init__(self, api, provider, username, password):
+        self.api = api
+        self.provider = provider
+        self.username = username
+        self.password = password
+
+        self.status = NEW
+        self.logged_in = False
+        self.cooldown_until = 0
+        self.last_used = 0
+
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0  # consecutive
+        self.last_error = None
+
+    def is_available(self, now):
+        return self.status in (NEW, READY) or (
+            self.status == COOLDOWN and now >= self.cooldown_until)
+
+    def as_dict(self):
+        return {
+            'username': self.username,
+            'status': self.status,
+            'logged_in': self.logged_in,
+            'cooldown_until': self.cooldown_until,
+            'requests': self.requests,
+            'errors': self.errors,
+            'failures': self.failures,
+            'last_error': repr(self.last_error) if self.last_error else None
+        }
+
+
+class AccountPool(object):
+    """
+    Owns a set of accounts and runs submitted work on them with at most
+    max_workers requests in flight. Every job goes to the healthy account
+    which was idle the longest, logging it in first if needed. Logins are
+    spaced login_delay seconds apart over the whole pool.
+
+    The outcome of every job updates the account's health:
+    BannedAccountException and InvalidCredentialsException retire the
+    account, NianticThrottlingException puts it on a throttle_cooldown,
+    NotLoggedInException and AuthException force a new login and any other
+    error an error_cooldown. After max_failures errors in a row the account
+    is retired as failed.
+    """
+
+    def __init__(self,
+                 max_workers=10,
+                 login_delay=1.0,
+                 app_simulation=True,
+                 throttle_cooldown=60,
+                 error_cooldown=10,
+                 max_failures=5,
+                 setup=None,
+                 token_refresher=None):
+        self.log = logging.getLogger(__name__)
+
+        self.login_delay = login_delay
+        self.app_simulation = app_simulation
+        self.throttle_cooldown = throttle_cooldown
+        self.error_cooldown = error_cooldown
+        self.max_failures = max_failures
+        # called with every new PGoApi, e.g. to activate the hash server
+        self.setup = setup
+        # renews the tokens of logged in accounts in the background
+        self.token_refresher = token_refresher
+
+        self._accounts = []
+        self._cond = threading.Condition()
+        self._next_login = 0
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def add_account(self, provider, username, password, position, api=None,
+                    **api_kwargs):
+        if api is None:
+            api = PGoApi(**api_kwargs)
+        api.set_position(*position)
+        if self.token_refresher is not None:
+            api.enable_token_refresh(self.token_refresher)
+        if self.setup is not None:
+            self.setup(api)
+
+        account = Account(api, provider, username, password)
+        with self._cond:
+            self._accounts.append(account)
+            self._cond.notify_all()
+        return account
+
+    def get_accounts(self):
+        with self._cond:
+            return list(self._accounts)
+
+    def submit(self, request_builder, retries=1):
+        """
+        Schedules request_builder(api) on the next free account and returns
+        a concurrent.futures.Future of its result. If the job fails because
+        of the account (ban, throttling, lost login) it is retried up to
+        `retries` times on another account.
+        """
+        return self._executor.submit(self._run, request_builder, retries)
+
+    def map(self, request_builder, items, retries=1):
+        futures = [self.submit(lambda api, item=item: request_builder(api, item), retries)
+                   for item in items]
+        return [future.result() for future in futures]
+
+    def _run(self, request_builder, retries):
+        while True:
+            account = self._acquire()
+            try:
+                if not account.logged_in:
+                    self._login(account)
+                result = request_builder(account.api)
+            except Exception as e:
+                retry = self._release(account, e) and retries > 0
+                if not retry:
+                    raise
+                retries -= 1
+                self.log.info('Retrying job of %s on another account: %r',
+                              account.username, e)
+            else:
+                self._release(account)
+                return result
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                now = time.time()
+                available = [a for a in self._accounts if a.is_available(now)]
+                if available:
+                    account = min(available, key=lambda a: a.last_used)
+                    account.status = BUSY
+                    return account
+
+                cooldowns = [a.cooldown_until for a in self._accounts
+                             if a.status in (COOLDOWN, BUSY)]
+                if not cooldowns:
+                    raise NoAccountAvailableException(
+                        'All {} accounts are banned or failed'.format(
+                            len(self._accounts)))
+
+                waits = [c - now for c in cooldowns if c > now]
+                self._cond.wait(min(waits) if waits else None)
+
+    def _login(self, account):
+        with self._cond:
+            now = time.time()
+            start = max(now, self._next_login)
+            self._next_login = start + self.login_delay
+        if start > now:
+            time.sleep(start - now)
+
+        self.log.info('Logging in %s', account.username)
+        if not account.api.login(account.provider, account.username,
+                                 account.password,
+                                 app_simulation=self.app_simulation):
+            raise NotLoggedInException(
+                'Login of {} failed'.format(account.username))
+        account.logged_in = True
+
+    def _release(self, account, error=None):
+        """
+        Updates the account's health, returns whether the failed job may be
+        retried on another account.
+        """
+        with self._cond:
+            now = time.time()
+            account.last_used = now
+            account.requests += 1
+            retry = False
+
+            if error is None:
+                account.failures = 0
+                account.status = READY
+            else:
+                account.errors += 1
+                account.failures += 1
+                account.last_error = error
+
+                if isinstance(error, (BannedAccountException,
+                                      InvalidCredentialsException)):
+                    account.status = BANNED if isinstance(
+                        error, BannedAccountException) else FAILED
+                    retry = True
+                elif account.failures >= self.max_failures:
+                    account.status = FAILED
+                    retry = True
+                elif isinstance(error, NianticThrottlingException):
+                    account.status = COOLDOWN
+                    account.cooldown_until = now + self.throttle_cooldown
+                    retry = True
+                elif isinstance(error, (NotLoggedInException, AuthException)):
+                    account.logged_in = False
+                    account.status = READY
+                    retry = True
+                else:
+                    account.status = COOLDOWN
+                    account.cooldown_until = now + self.error_cooldown
+
+                self.log.warning('Account %s: %r, now %s', account.username,
+                                 error, account.status)
+
+            self._cond.notify_all()
+            return retry
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict((status, 0) for status in (NEW, READY, BUSY, COOLDOWN,
+                                                    BANNED, FAILED))
+            for account in self._accounts:
+                stats[account.status] += 1
+            stats['accounts'] = [a.as_dict() for a in self._accounts]
+            return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+
+import time
+import asyncio
+
+import aiohttp
+
+from pgoapi.hash_server import HashServer
+from pgoapi.exceptions import HashingOfflineException, HashingQuotaExceededException, HashingTimeoutException
+
+
+class AsyncHashServer(HashServer):
+    def __init__(self, auth_token, session):
+        HashServer.__init__(self, auth_token)
+        self._session = session
+        self.headers['User-Agent'] = 'Python pgoapi @pogodev'
+
+    async def hash(self, timestamp, latitude, longitude, accuracy, authticket,
+                   sessiondata, requestslist):
+        self.location_hash = None
+        self.location_auth_hash = None
+        self.request_hashes = []
+
+        payload = self._build_payload(timestamp, latitude, longitude, accuracy,
+                                      authticket, sessiondata, requestslist)
+
+        if self.key_pool is None:
+            self.set_result(
+                self._parse_response(*await self._send(payload, self.headers)))
+            return
+
+        start = time.time()
+        while True:
+            token, wait = self.key_pool.try_acquire()
+            if token is None:
+                # don't block the event loop in HashKeyPool.acquire()
+                waited = time.time() - start
+                if waited >= self.key_pool.max_wait:
+                    raise HashingQuotaExceededException(
+                        'All hash keys are out of quota')
+                await asyncio.sleep(min(wait, 1, self.key_pool.max_wait - waited))
+                continue
+
+            headers = dict(self.headers, **{'X-AuthToken': token})
+            response = None
+            try:
+                response = await self._send(payload, headers)
+            finally:
+                if response is None:
+                    self.key_pool.release(token)
+                else:
+                    self.key_pool.release(token, response[0], response[1])
+
+            if response[0] != 429:
+                self.set_result(self._parse_response(*response, token=token))
+                return
+
+    async def _send(self, payload, headers):
+        # request hashes from hashing server
+        try:
+            async with self._session.post(
+                    self.endpoint,
+                    json=payload,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=30)) as response:
+                content = await response.read()
+        except asyncio.TimeoutError:
+            raise HashingTimeoutException('Hashing request timed out.')
+        except aiohttp.ClientError as error:
+            raise HashingOfflineException(error)
+
+        return response.status, response.headers, content
@@ -0,0 +1,247 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import asyncio
+import functools
+
+import aiohttp
+
+from pgoapi.pgoapi import PGoApi, PGoApiRequest
+from pgoapi.async_rpc_api import AsyncRpcApi
+from pgoapi.exceptions import AuthException, AuthTokenExpiredException, BannedAccountException, ServerApiEndpointRedirectException
+
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+
+"""
+asyncio flavour of PGoApi. Envelope building, ticket handling and the
+re-auth/redirect loop are shared with the blocking client; the hash server
+and RPC requests are awaited on an aiohttp session instead. The PTC/Google
+login flows are still blocking and run in the loop's default executor.
+
+Pass a shared aiohttp.TCPConnector to let many sessions reuse one
+connection pool.
+"""
+
+
+def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+class AsyncPGoApi(PGoApi):
+    def __init__(self, *args, **kwargs):
+        self._connector = kwargs.pop('connector', None)
+        self._proxy = None
+        PGoApi.__init__(self, *args, **kwargs)
+
+    def _create_session(self, proxy_config=None):
+        # aiohttp sessions are bound to the running loop - see get_session()
+        if proxy_config is not None:
+            self.set_proxy(proxy_config)
+        return None
+
+    def get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=self._connector,
+                connector_owner=self._connector is None,
+                headers={
+                    'User-Agent': 'Niantic App',
+                    'Content-Type': 'application/binary',
+                    'Accept-Encoding': 'identity, gzip'
+                })
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def set_proxy(self, proxy_config):
+        # aiohttp only supports a single http(s) proxy per request
+        self._proxy = proxy_config.get('https') or proxy_config.get('http')
+
+    def get_proxy(self):
+        return self._proxy
+
+    def create_request(self):
+        request = AsyncPGoApiRequest(self, self._position_lat,
+                                     self._position_lng, self._position_alt,
+                                     self.device_info)
+        return request
+
+    def __getattr__(self, func):
+        async def function(**kwargs):
+            request = self.create_request()
+            getattr(request, func)(_call_direct=True, **kwargs)
+            return await request.call()
+
+        if func.upper() in RequestType.keys():
+            return function
+        else:
+            raise AttributeError
+
+    async def app_simulation_login(self):
+        self.log.info('Starting RPC login sequence (iOS app simulation)')
+
+        # Send empty initial request
+        request = self.create_request()
+        response = await request.call()
+
+        await asyncio.sleep(1.5)
+
+        # Send GET_PLAYER only
+        request = self.create_request()
+        request.get_player(player_locale={
+            'country': 'US',
+            'language': 'en',
+            'timezone': 'America/Chicago'
+        })
+        response = await request.call()
+
+        if response.get('responses', {}).get('GET_PLAYER', {}).get(
+                'banned', False):
+            raise BannedAccountException
+
+        await asyncio.sleep(1.5)
+
+        request = self.create_request()
+        request.download_remote_config_version(
+            platform=1, app_version=self.get_api_version())
+        request.check_challenge()
+        request.get_hatched_eggs()
+        request.get_inventory()
+        request.check_awarded_badges()
+        request.download_settings()
+        response = await request.call()
+
+        self.log.info('Finished RPC login sequence (iOS app simulation)')
+
+        return response
+
+    async def login(self,
+                    provider,
+                    username,
+                    password,
+                    lat=None,
+                    lng=None,
+                    alt=None,
+                    app_simulation=True):
+
+        if lat and lng:
+            self._position_lat = lat
+            self._position_lng = lng
+        if alt:
+            self._position_alt = alt
+
+        if await run_blocking(self.resume_session, provider, username,
+                              password):
+            return True
+
+        try:
+            await run_blocking(
+                self.set_authentication,
+                provider,
+                username=username,
+                password=password)
+        except AuthException as e:
+            self.log.error('Login process failed: %s', e)
+            return False
+
+        if app_simulation:
+            response = await self.app_simulation_login()
+        else:
+            self.log.info('Starting minimal RPC login sequence')
+            response = await self.get_player()
+            self.log.info('Finished minimal RPC login sequence')
+
+        if not response:
+            self.log.info('Login failed!')
+            return False
+
+        self.log.info('Login process completed')
+        await run_blocking(self.save_session_state)
+
+        return True
+
+
+class AsyncPGoApiRequest(PGoApiRequest):
+    async def call(self, use_dict=True, lazy=False):
+        self.__parent__.get_session()
+        request = self._create_rpc(AsyncRpcApi)
+        request.set_proxy(self.__parent__.get_proxy())
+
+        map_cell_cache = self.__parent__.get_map_cell_cache()
+        if map_cell_cache is not None:
+            self._req_method_list = map_cell_cache.prepare(
+                self._req_method_list)
+
+        response = None
+        execute = True
+
+        while execute:
+            execute = False
+
+            # an expired access token means a blocking login, keep it off the loop
+            auth_provider = self._auth_provider
+            if not auth_provider.check_ticket() and not auth_provider.check_access_token():
+                await run_blocking(auth_provider.get_access_token)
+
+            try:
+                response = await request.request(self._api_endpoint,
+                                                 self._req_method_list,
+                                                 self._req_platform_list,
+                                                 self.get_position(), use_dict,
+                                                 lazy)
+            except AuthTokenExpiredException as e:
+                await run_blocking(self._refresh_access_token)
+
+                request.request_proto = None  # reset request and rebuild
+                execute = True  # reexecute the call
+            except ServerApiEndpointRedirectException as e:
+                self._redirect_api_endpoint(e)
+
+                execute = True  # reexecute the call
+
+        # cleanup after call execution
+        self._req_method_list = []
+
+        if map_cell_cache is not None:
+            map_cell_cache.update(response)
+
+        # the stores do blocking file or database I/O
+        state = self.__parent__._get_changed_session_state()
+        if state is not None:
+            await run_blocking(self.__parent__._store_session_state, state)
+
+        return response
@@ -0,0 +1,121 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import asyncio
+
+from collections import namedtuple
+
+import aiohttp
+
+from pgoapi.rpc_api import RpcApi
+from pgoapi.async_hash_server import AsyncHashServer
+from pgoapi.exceptions import NianticOfflineException, NianticTimeoutException, NotLoggedInException
+
+# aiohttp responses are only readable inside their context manager, so the
+# body is buffered into this minimal stand-in for requests.Response
+BufferedResponse = namedtuple('BufferedResponse',
+                              ['status_code', 'headers', 'content'])
+
+
+class AsyncRpcApi(RpcApi):
+    def __init__(self, auth_provider, device_info, state, request_id,
+                 start_time):
+        RpcApi.__init__(self, auth_provider, device_info, state, request_id,
+                        start_time)
+        self._proxy = None
+
+    def activate_hash_server(self, auth_token, batcher=None):
+        # the event loop already multiplexes the hash requests of all
+        # sessions, a thread based batcher would only block it
+        self._hash_engine = AsyncHashServer(auth_token, self._session)
+
+    def set_proxy(self, proxy):
+        self._proxy = proxy
+
+    async def _make_rpc(self, endpoint, request_proto_plain):
+        self.log.debug('Execution of RPC')
+
+        request_proto_serialized = request_proto_plain.SerializeToString()
+        started = time.time()
+        try:
+            async with self._session.post(
+                    endpoint,
+                    data=request_proto_serialized,
+                    proxy=self._proxy,
+                    timeout=aiohttp.ClientTimeout(total=30)) as http_response:
+                content = await http_response.read()
+        except asyncio.TimeoutError:
+            raise NianticTimeoutException('RPC request timed out.')
+        except aiohttp.ClientError as e:
+            raise NianticOfflineException(e)
+
+        http_response = BufferedResponse(http_response.status,
+                                         http_response.headers, content)
+
+        if self._wire_trace:
+            self._wire_trace.trace(endpoint, request_proto_plain,
+                                   len(request_proto_serialized),
+                                   http_response, time.time() - started)
+
+        return http_response
+
+    async def request(self,
+                      endpoint,
+                      subrequests,
+                      platforms,
+                      player_position,
+                      use_dict=True,
+                      lazy=False):
+
+        if not self._auth_provider or self._auth_provider.is_login() is False:
+            raise NotLoggedInException()
+
+        if self.request_proto is None:
+            self.request_proto = await self._build_main_request(
+                subrequests, platforms, player_position)
+        response = await self._make_rpc(endpoint, self.request_proto)
+
+        response_dict = self._parse_main_response(response, subrequests,
+                                                  use_dict, lazy)
+
+        return self._check_response(response_dict, use_dict or lazy)
+
+    async def _build_main_request(self, subrequests, platforms,
+                                  player_position=None):
+        request, sig, ticket_serialized, altitude = self._prepare_main_request(
+            subrequests, platforms, player_position)
+
+        # local engines hash synchronously, only the hash server is awaitable
+        result = self._hash_engine.hash(sig.timestamp, request.latitude,
+                                        request.longitude, request.accuracy,
+                                        ticket_serialized, sig.session_hash,
+                                        request.requests)
+        if asyncio.iscoroutine(result):
+            await result
+
+        return self._sign_main_request(request, sig, subrequests, altitude)
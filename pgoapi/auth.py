@@ -25,7 +25,9 @@ Author: tjado <https://github.com/tejado>
 
 from __future__ import absolute_import
 
+import base64
 import logging
+import threading
 
 from pgoapi.utilities import get_time, get_format_time_diff
 
@@ -54,6 +56,9 @@ class Auth:
         self._ticket_start = None
         self._ticket_end = None
 
+        # held by providers while logging in
+        self._login_lock = threading.RLock()
+
     def get_name(self):
         return self._auth_provider
 
@@ -93,6 +98,31 @@ class Auth:
             return (self._ticket_expire, self._ticket_start, self._ticket_end)
         return False
 
+    def get_state(self):
+        """
+        Everything needed to resume this login later, as a JSON compatible
+        dict (see AuthStore).
+        """
+        return {
+            'provider': self._auth_provider,
+            'login': self._login,
+            'refresh_token': self._refresh_token,
+            'access_token': self._access_token,
+            'access_token_expiry': self._access_token_expiry,
+            'ticket_expire': self._ticket_expire,
+            'ticket_start': _b64encode(self._ticket_start),
+            'ticket_end': _b64encode(self._ticket_end)
+        }
+
+    def set_state(self, state):
+        self._login = state['login']
+        self._refresh_token = state['refresh_token']
+        self._access_token = state['access_token']
+        self._access_token_expiry = state['access_token_expiry']
+        self._ticket_expire = state['ticket_expire']
+        self._ticket_start = _b64decode(state['ticket_start'])
+        self._ticket_end = _b64decode(state['ticket_end'])
+
     def user_login(self, username, password):
         raise NotImplementedError()
 
@@ -102,6 +132,16 @@ class Auth:
     def get_access_token(self, force_refresh=False):
         raise NotImplementedError()
 
+    def get_access_token_expiry(self):
+        return self._access_token_expiry
+
+    def refresh_access_token(self):
+        """
+        Renews the access token ahead of its expiry. The current token and
+        session ticket stay usable until the new token has been received.
+        """
+        return self.get_access_token(force_refresh=True)
+
     def check_access_token(self):
         if self._access_token is None:
             self.log.debug('No Access Token available!')
@@ -122,3 +162,11 @@ class Auth:
 
         self.log.info('Access Token expired!')
         return False
+
+
+def _b64encode(value):
+    return base64.b64encode(value).decode('ascii') if value else None
+
+
+def _b64decode(value):
+    return base64.b64decode(value) if value else None
@@ -0,0 +1,134 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pgoapi.auth_ptc import AuthPtc
+from pgoapi.transport import get_transport
+
+"""
+Logs many PTC accounts in at once. Every account keeps its own AuthPtc
+session (cookies), the connections to the SSO server come from one shared
+TransportManager. On Python 2 concurrent.futures comes from the `futures`
+backport, which is installed with pgoapi there.
+"""
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """
+    Token bucket allowing `rate` acquisitions per second on average and up
+    to `burst` at once, shared by any number of threads.
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """
+        Takes a token if there is one and returns 0, otherwise returns the
+        seconds until the next token is available.
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+def batch_login(credentials,
+                workers=10,
+                rate_limit=None,
+                burst=1,
+                proxy_config=None,
+                transport=None,
+                **auth_kwargs):
+    """
+    Logs in every (username, password) of `credentials` with up to `workers`
+    logins running concurrently and, if rate_limit is set, at most
+    rate_limit logins started per second.
+
+    Returns a list in the order of `credentials` holding the logged in
+    AuthPtc instance or the exception the login raised. Logged in providers
+    can be handed to PGoApi.set_auth_provider. auth_kwargs (user_agent,
+    timeout, locale, sso_url) are passed to AuthPtc.
+    """
+    transport = transport or get_transport()
+    limiter = None
+    if rate_limit:
+        limiter = rate_limit if isinstance(
+            rate_limit, RateLimiter) else RateLimiter(rate_limit, burst)
+
+    def login(username, password):
+        auth = AuthPtc(username=username, password=password,
+                       transport=transport, **auth_kwargs)
+        if proxy_config:
+            auth.set_proxy(proxy_config)
+        if limiter is not None:
+            limiter.acquire()
+        auth.user_login()
+        return auth
+
+    executor = ThreadPoolExecutor(workers)
+    try:
+        futures = [executor.submit(login, username, password)
+                   for username, password in credentials]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        failed = sum(1 for r in results if isinstance(r, Exception))
+        log.info('Batch login: %s accounts, %s failed', len(results), failed)
+        return results
+    finally:
+        executor.shutdown(wait=True)
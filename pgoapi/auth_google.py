@@ -29,7 +29,6 @@ import logging
 
 from pgoapi.auth import Auth
 from pgoapi.exceptions import AuthException, InvalidCredentialsException, AuthGoogleTwoFactorRequiredException
-from gpsoauth import perform_master_login, perform_oauth
 from six import string_types
 
 
@@ -58,6 +57,8 @@ class AuthGoogle(Auth):
             raise InvalidCredentialsException(
                 "Username/password not correctly specified")
 
+        from gpsoauth import perform_master_login
+
         user_login = perform_master_login(
             username,
             password,
@@ -99,6 +100,8 @@ class AuthGoogle(Auth):
             else:
                 self.log.info('Request Google Access Token...')
 
+            from gpsoauth import perform_oauth
+
             token_data = perform_oauth(
                 None,
                 self._refresh_token,
@@ -33,6 +33,7 @@ from urllib.parse import parse_qs, urlsplit
 from six import string_types
 
 from pgoapi.auth import Auth
+from pgoapi.transport import get_transport
 from pgoapi.utilities import get_time
 from pgoapi.exceptions import AuthException, AuthTimeoutException, InvalidCredentialsException
 
@@ -46,7 +47,9 @@ class AuthPtc(Auth):
                  password=None,
                  user_agent=None,
                  timeout=None,
-                 locale=None):
+                 locale=None,
+                 transport=None,
+                 sso_url=None):
         Auth.__init__(self)
 
         self._auth_provider = 'ptc'
@@ -55,10 +58,12 @@ class AuthPtc(Auth):
         self.timeout = timeout or 10
         self.locale = locale or 'en_US'
         self.user_agent = user_agent or 'pokemongo/0 CFNetwork/893.14.2 Darwin/17.3.0'
+        # base URL of the SSO server, can point to a stand-in for testing
+        self.sso_url = (sso_url or 'https://sso.pokemon.com').rstrip('/')
 
         self._session = requests.session()
         self._session.headers = {
-            'Host': 'sso.pokemon.com',
+            'Host': urlsplit(self.sso_url).netloc,
             'Accept': '*/*',
             'Connection': 'keep-alive',
             'User-Agent': self.user_agent,
@@ -66,11 +71,18 @@ class AuthPtc(Auth):
             'Accept-Encoding': 'br, gzip, deflate',
             'X-Unity-Version': '2017.1.2f1'
         }
+        (transport or get_transport()).mount(self._session)
 
     def set_proxy(self, proxy_config):
         self._session.proxies = proxy_config
 
     def user_login(self, username=None, password=None):
+        # the token refresher and the request path may both log in, the two
+        # flows must not clear each other's cookies on the shared session
+        with self._login_lock:
+            return self._user_login(username, password)
+
+    def _user_login(self, username, password):
         self._username = username or self._username
         self._password = password or self._password
         if not isinstance(self._username, string_types) or not isinstance(
@@ -88,7 +100,7 @@ class AuthPtc(Auth):
                 'service': 'https://sso.pokemon.com/sso/oauth2.0/callbackAuthorize'
             }
             r = self._session.get(
-                'https://sso.pokemon.com/sso/logout',
+                self.sso_url + '/sso/logout',
                 params=logout_params,
                 timeout=self.timeout,
                 allow_redirects=False)
@@ -99,11 +111,11 @@ class AuthPtc(Auth):
                 'locale': self.locale
             }
             r = self._session.get(
-                'https://sso.pokemon.com/sso/login',
+                self.sso_url + '/sso/login',
                 params=login_params_get,
                 timeout=self.timeout)
 
-            data = r.json(encoding='utf-8')
+            data = r.json()
 
             assert 'lt' in data
             data.update({
@@ -120,7 +132,7 @@ class AuthPtc(Auth):
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             r = self._session.post(
-                'https://sso.pokemon.com/sso/login',
+                self.sso_url + '/sso/login',
                 params=login_params_post,
                 headers=login_headers_post,
                 data=data,
@@ -131,7 +143,7 @@ class AuthPtc(Auth):
                 self._access_token = self._session.cookies['CASTGC']
             except (AttributeError, KeyError, TypeError):
                 try:
-                    j = r.json(encoding='utf-8')
+                    j = r.json()
                 except ValueError as e:
                     raise AuthException('Unable to decode second response: {}'.format(e))
                 try:
@@ -152,7 +164,7 @@ class AuthPtc(Auth):
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             r = self._session.post(
-                'https://sso.pokemon.com/sso/oauth2.0/accessToken',
+                self.sso_url + '/sso/oauth2.0/accessToken',
                 headers=token_headers,
                 data=token_data,
                 timeout=self.timeout)
@@ -167,7 +179,7 @@ class AuthPtc(Auth):
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
             r = self._session.post(
-                'https://sso.pokemon.com/sso/oauth2.0/profile',
+                self.sso_url + '/sso/oauth2.0/profile',
                 headers=profile_headers,
                 data=profile_data,
                 timeout=self.timeout)
@@ -197,8 +209,16 @@ class AuthPtc(Auth):
             self.log.debug('Using cached PTC Access Token')
             return self._access_token
 
-        self._access_token = None
-        self._ticket_expire = 0
-        self._login = False
-        self.user_login()
-        return self._access_token
+        with self._login_lock:
+            self._access_token = None
+            self._ticket_expire = 0
+            self._login = False
+            self.user_login()
+            return self._access_token
+
+    def refresh_access_token(self):
+        # a new SSO login, but without dropping the old token and ticket
+        # first like get_access_token(force_refresh=True) does
+        with self._login_lock:
+            self.user_login()
+            return self._access_token
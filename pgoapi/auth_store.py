@@ -0,0 +1,145 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+
+"""
+Persistence for the session state of PGoApi instances (see
+PGoApi.get_session_state), so a restarted worker can resume its sessions
+instead of logging every account in again. States are JSON compatible
+dicts stored under a key, by default '<provider>:<username>'.
+
+The states contain access tokens, keep the files/database private.
+"""
+
+
+class AuthStore(object):
+    def load(self, key):
+        raise NotImplementedError()
+
+    def save(self, key, state):
+        raise NotImplementedError()
+
+    def delete(self, key):
+        raise NotImplementedError()
+
+
+class FileAuthStore(AuthStore):
+    """
+    One JSON file per key in `directory`. Files are replaced atomically, a
+    crash while saving leaves the previous state in place.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    def _path(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + '.json')
+
+    def load(self, key):
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)['state']
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def save(self, key, state):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'key': key, 'saved': time.time(), 'state': state}, f)
+            _replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+def _replace(src, dst):
+    # os.replace is Python 3 only, os.rename doesn't overwrite on Windows
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+class SQLiteAuthStore(AuthStore):
+    """
+    All states in one SQLite database, safe to share between the threads
+    of a process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS auth_state ('
+                             'key TEXT PRIMARY KEY, '
+                             'state TEXT NOT NULL, '
+                             'saved REAL NOT NULL)')
+
+    def load(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT state FROM auth_state WHERE key = ?',
+                                   (key, )).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def save(self, key, state):
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO auth_state VALUES (?, ?, ?)',
+                             (key, json.dumps(state), time.time()))
+
+    def delete(self, key):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM auth_state WHERE key = ?', (key, ))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,278 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import math
+
+from s2sphere import Angle, Cap, CellId, LatLng, RegionCoverer
+from s2sphere.sphere import LOOKUP_BITS, LOOKUP_POS, SWAP_MASK, INVERT_MASK, xyz_to_face_uv
+
+"""
+Level 15 S2 coverings of the circles around scan positions, as sent in
+GET_MAP_OBJECTS requests.
+
+get_covering is the s2sphere RegionCoverer, one point at a time.
+get_coverings computes many coverings at once with NumPy: the level 15
+cells around each point are tested with the same cap/cell intersection
+test as s2sphere (Cap.may_intersect), in the same floating point order, so
+the results are identical. Points whose cells are near a cube face edge
+fall back to get_covering.
+"""
+
+EARTH_RADIUS = 6371000  # radius of Earth in meters
+
+LEVEL = 15
+MAX_CELLS = 100  # max allowed by the server
+MAX_RADIUS = 1500  # max allowed by the server
+
+_SHIFT = CellId.MAX_LEVEL - LEVEL
+_SIZE = 1 << LEVEL  # level 15 cells along a face edge
+# narrowest a level 15 cell can be (S2 kMinWidth, quadratic projection)
+_MIN_WIDTH = 2 * math.sqrt(2) / 3 / _SIZE
+# points are handled in chunks to bound the size of the candidate arrays
+_CHUNK = 256
+
+_np = None
+_lookup_pos = None
+
+
+def get_cap(lat, lng, radius):
+    radius = min(radius, MAX_RADIUS)
+    return Cap.from_axis_angle(
+        LatLng.from_degrees(lat, lng).to_point(),
+        Angle.from_degrees(360 * radius / (2 * math.pi * EARTH_RADIUS)))
+
+
+def get_covering(lat, lng, radius=500):
+    return _cover_cap(get_cap(lat, lng, radius))
+
+
+def _cover_cap(cap):
+    coverer = RegionCoverer()
+    coverer.min_level = LEVEL
+    coverer.max_level = LEVEL
+    cells = coverer.get_covering(cap)
+    cells = cells[:MAX_CELLS]
+    return sorted([x.id() for x in cells])
+
+
+def get_numpy():
+    # NumPy is optional and slow to import, loaded on first use
+    global _np, _lookup_pos
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            _np = False
+        else:
+            _lookup_pos = numpy.array(LOOKUP_POS, dtype=numpy.int64)
+            _np = numpy
+    return _np or None
+
+
+def get_coverings(points, radius=500):
+    """
+    Coverings of all (lat, lng) points, in order. Uses get_covering per
+    point if NumPy isn't installed.
+    """
+    np = get_numpy()
+    if np is None:
+        return [get_covering(lat, lng, radius) for lat, lng in points]
+
+    results = [None] * len(points)
+    by_face = {}
+    for index, (lat, lng) in enumerate(points):
+        cap = get_cap(lat, lng, radius)
+        face, u, v = xyz_to_face_uv(cap.axis())
+        by_face.setdefault(face, []).append((index, cap, u, v))
+
+    # candidates up to this many cells away from the center cell
+    half = int(math.ceil(get_cap(0, 0, radius).angle().radians / _MIN_WIDTH)) + 2
+    for face, items in by_face.items():
+        for start in range(0, len(items), _CHUNK):
+            chunk = items[start:start + _CHUNK]
+            for (index, cap, _, _), cells in zip(chunk, _cover_face(
+                    np, face, chunk, half)):
+                if cells is None:
+                    cells = _cover_cap(cap)
+                results[index] = cells
+    return results
+
+
+def _st_to_uv(np, s):
+    return np.where(s >= 0.5, (1.0 / 3.0) * (4 * s * s - 1),
+                    (1.0 / 3.0) * (1 - 4 * (1 - s) * (1 - s)))
+
+
+def _face_uv_to_xyz(face, u, v):
+    if face == 0:
+        return 1.0, u, v
+    elif face == 1:
+        return -u, 1.0, v
+    elif face == 2:
+        return -u, -v, 1.0
+    elif face == 3:
+        return -1.0, -v, -u
+    elif face == 4:
+        return v, -1.0, -u
+    else:
+        return v, u, -1.0
+
+
+def _u_norm(face, u, sign):
+    if face == 0:
+        x, y, z = u, -1.0, 0.0
+    elif face == 1:
+        x, y, z = 1.0, u, 0.0
+    elif face == 2:
+        x, y, z = 1.0, 0.0, u
+    elif face == 3:
+        x, y, z = -u, 0.0, 1.0
+    elif face == 4:
+        x, y, z = 0.0, -u, 1.0
+    else:
+        x, y, z = 0.0, -1.0, -u
+    return sign * x, sign * y, sign * z
+
+
+def _v_norm(face, v, sign):
+    if face == 0:
+        x, y, z = -v, 0.0, 1.0
+    elif face == 1:
+        x, y, z = 0.0, -v, 1.0
+    elif face == 2:
+        x, y, z = 0.0, -1.0, -v
+    elif face == 3:
+        x, y, z = v, -1.0, 0.0
+    elif face == 4:
+        x, y, z = 1.0, v, 0.0
+    else:
+        x, y, z = 1.0, 0.0, v
+    return sign * x, sign * y, sign * z
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _normalize(np, p):
+    n = 1.0 / np.sqrt(_dot(p, p))
+    return p[0] * n, p[1] * n, p[2] * n
+
+
+def _cover_face(np, face, items, half):
+    """
+    Coverings of the caps of `items` on one cube face, None for the caps
+    which need the exact fallback.
+    """
+    axis = tuple(np.array([cap.axis()[c] for _, cap, _, _ in items])[:, None]
+                 for c in range(3))
+    height = np.array([cap.height() for _, cap, _, _ in items])[:, None]
+    axis_u = np.array([u for _, _, u, _ in items])[:, None]
+    axis_v = np.array([v for _, _, _, v in items])[:, None]
+    center_i = np.array([CellId.st_to_ij(CellId.uv_to_st(u)) >> _SHIFT
+                         for _, _, u, _ in items])
+    center_j = np.array([CellId.st_to_ij(CellId.uv_to_st(v)) >> _SHIFT
+                         for _, _, _, v in items])
+
+    offsets = np.arange(-half, half + 1)
+    di, dj = [a.ravel() for a in np.meshgrid(offsets, offsets, indexing='ij')]
+    border = (np.abs(di) == half) | (np.abs(dj) == half)
+    # windows reaching over the face edge go to the fallback
+    exact = ((center_i >= half) & (center_i < _SIZE - half) &
+             (center_j >= half) & (center_j < _SIZE - half))
+    i = np.clip(center_i[:, None] + di, 0, _SIZE - 1)
+    j = np.clip(center_j[:, None] + dj, 0, _SIZE - 1)
+
+    # Cell.__init__
+    scale = 1.0 / CellId.MAX_SIZE
+    u_lo = _st_to_uv(np, (i << _SHIFT).astype(np.float64) * scale)
+    u_hi = _st_to_uv(np, ((i + 1) << _SHIFT).astype(np.float64) * scale)
+    v_lo = _st_to_uv(np, (j << _SHIFT).astype(np.float64) * scale)
+    v_hi = _st_to_uv(np, ((j + 1) << _SHIFT).astype(np.float64) * scale)
+
+    # Cap.may_intersect: a vertex in the cap
+    vertices = [_normalize(np, _face_uv_to_xyz(face, u, v))
+                for u, v in ((u_lo, v_lo), (u_hi, v_lo), (u_hi, v_hi),
+                             (u_lo, v_hi))]
+    hit = np.zeros(i.shape, dtype=bool)
+    for vertex in vertices:
+        d = tuple(a - b for a, b in zip(axis, vertex))
+        hit |= _dot(d, d) <= 2 * height
+
+    # Cap.intersects: the axis in the cell or an edge crossing the cap
+    crossed = ((axis_u >= u_lo) & (axis_u <= u_hi) &
+               (axis_v >= v_lo) & (axis_v <= v_hi))
+    undecided = ~crossed
+    sin2_angle = height * (2 - height)
+    edges = (_v_norm(face, v_lo, 1.0), _u_norm(face, u_hi, 1.0),
+             _v_norm(face, v_hi, -1.0), _u_norm(face, u_lo, -1.0))
+    for k, edge in enumerate(edges):
+        dot = _dot(axis, edge)
+        tested = undecided & ~(dot > 0)
+        undecided &= ~(tested & (dot * dot > sin2_angle * _dot(edge, edge)))
+        direction = (edge[1] * axis[2] - edge[2] * axis[1],
+                     edge[2] * axis[0] - edge[0] * axis[2],
+                     edge[0] * axis[1] - edge[1] * axis[0])
+        found = undecided & tested & (_dot(direction, vertices[k]) < 0) & (
+            _dot(direction, vertices[(k + 1) & 3]) > 0)
+        crossed |= found
+        undecided &= ~found
+    hit |= crossed & (height < 1)
+
+    # cells touching the window border may continue beyond it
+    exact &= ~(hit & border).any(axis=1)
+
+    rows, columns = np.nonzero(hit & exact[:, None])
+    ids = _get_cell_ids(np, face, i[rows, columns] << _SHIFT,
+                        j[rows, columns] << _SHIFT)
+    order = np.lexsort((ids, rows))
+    ids = ids[order].tolist()
+    ends = np.cumsum(np.bincount(rows, minlength=len(items))).tolist()
+
+    coverings = []
+    start = 0
+    for index, end in enumerate(ends):
+        coverings.append(ids[start:end][:MAX_CELLS] if exact[index] else None)
+        start = end
+    return coverings
+
+
+def _get_cell_ids(np, face, i, j):
+    # CellId.from_face_ij(face, i, j).parent(LEVEL)
+    n = np.full(i.shape, face << (CellId.POS_BITS - 1), dtype=np.uint64)
+    bits = np.full(i.shape, face & SWAP_MASK, dtype=np.int64)
+    mask = (1 << LOOKUP_BITS) - 1
+    for k in range(7, -1, -1):
+        bits += ((i >> (k * LOOKUP_BITS)) & mask) << (LOOKUP_BITS + 2)
+        bits += ((j >> (k * LOOKUP_BITS)) & mask) << 2
+        bits = _lookup_pos[bits]
+        n |= (bits >> 2).astype(np.uint64) << np.uint64(k * 2 * LOOKUP_BITS)
+        bits &= SWAP_MASK | INVERT_MASK
+
+    lsb = CellId.lsb_for_level(LEVEL)
+    ids = n * np.uint64(2) + np.uint64(1)
+    return (ids & np.uint64(~(lsb - 1) & 0xFFFFFFFFFFFFFFFF)) | np.uint64(lsb)
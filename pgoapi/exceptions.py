@@ -23,6 +23,8 @@ OR OTHER DEALINGS IN THE SOFTWARE.
 Author: tjado <https://github.com/tejado>
 """
 
+from __future__ import absolute_import
+
 
 class PgoapiError(Exception):
     """Any custom exception in this module"""
@@ -52,6 +54,10 @@ class AuthTokenExpiredException(PgoapiError):
     """Raised when your auth token has expired (code 102)"""
 
 
+class NoAccountAvailableException(PgoapiError):
+    """Raised when an AccountPool has no usable account left"""
+
+
 class AuthGoogleTwoFactorRequiredException(Exception):
     def __init__(self, redirectUrl, message):
         self.redirectUrl = redirectUrl
@@ -90,6 +96,10 @@ class NoPlayerPositionSetException(PgoapiError, ValueError):
     """Raised when either lat or lng is None"""
 
 
+class InvalidRequestArgumentException(PgoapiError, ValueError):
+    """Raised when a request gets an unknown argument or a value of the wrong type"""
+
+
 class NotLoggedInException(PgoapiError):
     """Raised when attempting to make a request while not authenticated"""
 
@@ -119,10 +129,18 @@ class NoHashKeyException(HashServerException):
     """Raised when a request is made without a hash key being provided"""
 
 
+class HashLibraryException(HashServerException):
+    """Raised when a local hash library can't be loaded or fails to hash"""
+
+
 class PleaseInstallProtobufVersion3(PgoapiError):
     """Raised when Protobuf is unavailable or too old"""
 
 
+class ProtoNotFoundException(PgoapiError):
+    """Raised when there is no protobuf definition for a request type"""
+
+
 class ServerSideAccessForbiddenException(PgoapiError):
     """Raised when access to a server is forbidden"""
 
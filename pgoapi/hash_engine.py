@@ -1,3 +1,15 @@
+from __future__ import absolute_import
+
+from collections import namedtuple
+from importlib import import_module
+
+from six import string_types
+
+
+HashResult = namedtuple('HashResult', ['location_hash', 'location_auth_hash',
+                                       'request_hashes'])
+
+
 class HashEngine:
     def __init__(self):
         self.location_hash = None
@@ -8,6 +20,32 @@ class HashEngine:
              sessiondata, requests):
         raise NotImplementedError()
 
+    def hash_many(self, jobs):
+        """
+        Hashes a list of jobs, each a tuple of the hash() arguments. Returns
+        one entry per job in the same order: a HashResult, or the exception
+        raised for that job, so a failing job doesn't fail the whole batch.
+        Engines which can do better than one hash() after another override
+        this.
+        """
+        results = []
+        for job in jobs:
+            try:
+                self.hash(*job)
+                results.append(self.get_result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def get_result(self):
+        return HashResult(self.location_hash, self.location_auth_hash,
+                          self.request_hashes)
+
+    def set_result(self, result):
+        self.location_hash = result.location_hash
+        self.location_auth_hash = result.location_auth_hash
+        self.request_hashes = result.request_hashes
+
     def get_location_hash(self):
         return self.location_hash
 
@@ -16,3 +54,27 @@ class HashEngine:
 
     def get_request_hashes(self):
         return self.request_hashes
+
+
+# name -> HashEngine subclass or its dotted path, resolved on first use
+_engines = {
+    'server': 'pgoapi.hash_server.HashServer',
+    'local': 'pgoapi.hash_library.LocalHashEngine',
+}
+
+
+def register_hash_engine(name, engine_class):
+    _engines[name] = engine_class
+
+
+def get_hash_engine_class(name):
+    try:
+        engine_class = _engines[name]
+    except KeyError:
+        raise ValueError('Unknown hash engine {}, available: {}'.format(
+            name, ', '.join(sorted(_engines))))
+
+    if isinstance(engine_class, string_types):
+        module_, class_ = engine_class.rsplit('.', 1)
+        engine_class = _engines[name] = getattr(import_module(module_), class_)
+    return engine_class
@@ -0,0 +1,192 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+from pgoapi.exceptions import HashingQuotaExceededException, NoHashKeyException
+
+
+class HashKeyStatus(object):
+    def __init__(self, key, maximum):
+        self.key = key
+        self.maximum = maximum
+        self.remaining = None
+        self.period_end = None
+        self.expiration = None
+        self.in_flight = 0
+
+        self.requests = 0
+        self.throttled = 0
+
+    def headroom(self, now):
+        if self.remaining is None or self.period_end is None or now >= self.period_end:
+            remaining = self.maximum
+        else:
+            remaining = self.remaining
+        return remaining - self.in_flight
+
+    def update(self, headers):
+        try:
+            self.period_end = int(headers['X-RatePeriodEnd'])
+            self.remaining = int(headers['X-RateRequestsRemaining'])
+            self.maximum = int(headers['X-MaxRequestCount'])
+            self.expiration = int(headers['X-AuthTokenExpiration'])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    def as_dict(self, now):
+        return {
+            'remaining': self.remaining,
+            'maximum': self.maximum,
+            'period_end': self.period_end,
+            'expiration': self.expiration,
+            'headroom': self.headroom(now),
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'throttled': self.throttled
+        }
+
+
+class HashKeyPool(object):
+    """
+    Spreads hash requests over several hash keys. Every request goes to the
+    key with the most quota left in its current period (as reported by the
+    X-Rate* response headers, minus the requests still in flight). When no
+    key has quota left the request waits for the next period to start
+    instead of running into a 429, for at most max_wait seconds.
+
+    Keys which were not used yet are assumed to allow assumed_maximum
+    requests per period until the hashing server reports their real limit.
+    """
+
+    def __init__(self, keys, max_wait=60, assumed_maximum=60, period=60):
+        self.log = logging.getLogger(__name__)
+
+        self.max_wait = max_wait
+        self.assumed_maximum = assumed_maximum
+        self.period = period
+
+        self._keys = {}
+        self._cond = threading.Condition()
+
+        self.waits = 0
+        self.wait_time = 0.0
+
+        for key in keys:
+            self.add_key(key)
+
+    def add_key(self, key):
+        with self._cond:
+            if key not in self._keys:
+                self._keys[key] = HashKeyStatus(key, self.assumed_maximum)
+            self._cond.notify_all()
+
+    def remove_key(self, key):
+        with self._cond:
+            self._keys.pop(key, None)
+
+    def get_keys(self):
+        with self._cond:
+            return list(self._keys)
+
+    def try_acquire(self):
+        """
+        Non-blocking acquire(): returns (key, None) or, when every key is
+        exhausted, (None, seconds until the earliest period end).
+        """
+        with self._cond:
+            return self._reserve(time.time())
+
+    def acquire(self, timeout=None):
+        if timeout is None:
+            timeout = self.max_wait
+
+        start = time.time()
+        waited = False
+        with self._cond:
+            while True:
+                now = time.time()
+                key, wait = self._reserve(now)
+                if key is not None:
+                    if waited:
+                        self.waits += 1
+                        self.wait_time += now - start
+                    return key
+
+                remaining = start + timeout - now
+                if remaining <= 0:
+                    raise HashingQuotaExceededException(
+                        'All {} hash keys are out of quota'.format(len(self._keys)))
+                self.log.debug('All hash keys are out of quota, waiting %.1fs', wait)
+                self._cond.wait(min(wait, remaining))
+                waited = True
+
+    def _reserve(self, now):
+        if not self._keys:
+            raise NoHashKeyException('No keys in hash key pool.')
+
+        best = max(self._keys.values(), key=lambda status: status.headroom(now))
+        if best.headroom(now) > 0:
+            best.in_flight += 1
+            best.requests += 1
+            return best.key, None
+
+        ends = [status.period_end for status in self._keys.values()
+                if status.period_end is not None]
+        wait = min(ends) - now if ends else 1
+        return None, max(wait, 0.1)
+
+    def release(self, key, status_code=None, headers=None):
+        with self._cond:
+            status = self._keys.get(key)
+            if status is not None:
+                status.in_flight -= 1
+                if headers is not None:
+                    status.update(headers)
+                if status_code == 429:
+                    status.throttled += 1
+                    status.remaining = 0
+                    if status.period_end is None or status.period_end <= time.time():
+                        status.period_end = int(time.time()) + self.period
+            self._cond.notify_all()
+
+    def get_metrics(self):
+        with self._cond:
+            now = time.time()
+            keys = dict((key, status.as_dict(now))
+                        for key, status in self._keys.items())
+            return {
+                'keys': keys,
+                'headroom': sum(max(k['headroom'], 0) for k in keys.values()),
+                'in_flight': sum(k['in_flight'] for k in keys.values()),
+                'requests': sum(k['requests'] for k in keys.values()),
+                'throttled': sum(k['throttled'] for k in keys.values()),
+                'waits': self.waits,
+                'wait_time': self.wait_time
+            }
@@ -0,0 +1,135 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import os
+import ctypes
+import threading
+
+from pgoapi.hash_engine import HashEngine, HashResult
+from pgoapi.exceptions import HashLibraryException
+
+"""
+In-process hashing through a user supplied shared library. The library has
+to export the same contract the hashing server implements:
+
+    int pgoapi_hash(uint64_t timestamp,
+                    double latitude, double longitude, double accuracy,
+                    const uint8_t *auth_ticket, size_t auth_ticket_len,
+                    const uint8_t *session_data, size_t session_data_len,
+                    const uint8_t *const *requests, const size_t *request_lens,
+                    size_t request_count,
+                    int32_t *location_hash, int32_t *location_auth_hash,
+                    int64_t *request_hashes);
+
+request_hashes points to request_count slots. A non-zero return value is
+treated as an error.
+"""
+
+
+class HashLibrary(object):
+    def __init__(self, path):
+        self.path = path
+        try:
+            self._lib = ctypes.CDLL(path)
+            func = self._lib.pgoapi_hash
+        except (OSError, AttributeError) as e:
+            raise HashLibraryException(
+                'Unable to load hash library {}: {}'.format(path, e))
+
+        func.restype = ctypes.c_int
+        func.argtypes = [
+            ctypes.c_uint64,
+            ctypes.c_double, ctypes.c_double, ctypes.c_double,
+            ctypes.c_char_p, ctypes.c_size_t,
+            ctypes.c_char_p, ctypes.c_size_t,
+            ctypes.POINTER(ctypes.c_char_p), ctypes.POINTER(ctypes.c_size_t),
+            ctypes.c_size_t,
+            ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32),
+            ctypes.POINTER(ctypes.c_int64)
+        ]
+        self._func = func
+
+    def hash(self, timestamp, latitude, longitude, accuracy, authticket,
+             sessiondata, requests):
+        count = len(requests)
+        request_bufs = (ctypes.c_char_p * count)(*requests)
+        request_lens = (ctypes.c_size_t * count)(*[len(r) for r in requests])
+        request_hashes = (ctypes.c_int64 * count)()
+        location_hash = ctypes.c_int32()
+        location_auth_hash = ctypes.c_int32()
+
+        error = self._func(timestamp, latitude, longitude, accuracy,
+                           authticket, len(authticket),
+                           sessiondata, len(sessiondata),
+                           request_bufs, request_lens, count,
+                           ctypes.byref(location_hash),
+                           ctypes.byref(location_auth_hash),
+                           request_hashes)
+        if error:
+            raise HashLibraryException(
+                'pgoapi_hash of {} returned {}'.format(self.path, error))
+
+        return HashResult(location_hash.value, location_auth_hash.value,
+                          list(request_hashes))
+
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+def load_hash_library(path):
+    """
+    Loads the library at path once per process and returns the shared
+    HashLibrary for it.
+    """
+    path = os.path.abspath(path)
+    with _libraries_lock:
+        library = _libraries.get(path)
+        if library is None:
+            library = _libraries[path] = HashLibrary(path)
+        return library
+
+
+class LocalHashEngine(HashEngine):
+    def __init__(self, library_path=None):
+        HashEngine.__init__(self)
+        library_path = library_path or os.environ.get('PGOAPI_HASH_LIBRARY')
+        if not library_path:
+            raise HashLibraryException(
+                'No hash library given, pass library_path or set PGOAPI_HASH_LIBRARY.')
+        self.library = load_hash_library(library_path)
+
+    def hash(self, timestamp, latitude, longitude, accuracy, authticket,
+             sessiondata, requestslist):
+        self.location_hash = None
+        self.location_auth_hash = None
+        self.request_hashes = []
+
+        self.set_result(
+            self.library.hash(timestamp, latitude, longitude, accuracy,
+                              authticket, sessiondata,
+                              [x.SerializeToString() for x in requestslist]))
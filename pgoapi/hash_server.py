@@ -1,40 +1,141 @@
 from __future__ import absolute_import
 
+import time
+import json
 import ctypes
 import base64
 import requests
+import threading
 
 from struct import pack, unpack
 
-from pgoapi.hash_engine import HashEngine
+from pgoapi.hash_engine import HashEngine, HashResult
+from pgoapi.hash_key_pool import HashKeyPool
+from pgoapi.transport import get_transport
 from pgoapi.exceptions import BadHashRequestException, HashingOfflineException, HashingQuotaExceededException, HashingTimeoutException, MalformedHashResponseException, NoHashKeyException, TempHashingBanException, UnexpectedHashResponseException
 
 
 class HashServer(HashEngine):
-    _session = requests.session()
-    _adapter = requests.adapters.HTTPAdapter(pool_maxsize=150, pool_block=True)
-    _session.mount('https://', _adapter)
-    _session.verify = True
-    _session.headers.update({'User-Agent': 'Python pgoapi @pogodev'})
+    _session = None
+    _session_lock = threading.Lock()
     endpoint = 'https://pokehash.buddyauth.com/api/v157_5/hash'
     status = {}
 
+    max_workers = 16
+    _executor = None
+
     def __init__(self, auth_token):
+        HashEngine.__init__(self)
         if not auth_token:
             raise NoHashKeyException('Token not provided for hashing server.')
         self.headers = {
             'content-type': 'application/json',
-            'Accept': 'application/json',
-            'X-AuthToken': auth_token
+            'Accept': 'application/json'
         }
 
+        # either a single key or a HashKeyPool to pick one per request from
+        self.key_pool = None
+        if isinstance(auth_token, HashKeyPool):
+            self.key_pool = auth_token
+        else:
+            self.headers['X-AuthToken'] = auth_token
+
+    @staticmethod
+    def get_session():
+        # created on first use, so a TransportManager set up after import
+        # is picked up too
+        if HashServer._session is not None:
+            return HashServer._session
+        with HashServer._session_lock:
+            if HashServer._session is None:
+                session = requests.session()
+                session.verify = True
+                session.headers.update({'User-Agent': 'Python pgoapi @pogodev'})
+                HashServer._session = get_transport().mount(session)
+            return HashServer._session
+
     def hash(self, timestamp, latitude, longitude, accuracy, authticket,
              sessiondata, requestslist):
         self.location_hash = None
         self.location_auth_hash = None
         self.request_hashes = []
 
-        payload = {
+        payload = self._build_payload(timestamp, latitude, longitude, accuracy,
+                                      authticket, sessiondata, requestslist)
+        self.set_result(self._post(payload))
+
+    def hash_many(self, jobs):
+        """
+        The hashing API has no batch endpoint, so this still sends one POST
+        per job: it saves no round-trips. The jobs are only spread over a
+        shared pool of up to max_workers threads on keep-alive connections,
+        and the results collected in job order. Failed jobs get their
+        exception as result.
+        """
+        payloads = [self._build_payload(*job) for job in jobs]
+        if not payloads:
+            return []
+
+        # the calling thread takes the first job itself
+        futures = [self.get_executor().submit(self._try_post, payload)
+                   for payload in payloads[1:]]
+        results = [self._try_post(payloads[0])]
+        results.extend(future.result() for future in futures)
+        return results
+
+    @classmethod
+    def get_executor(cls):
+        # concurrent.futures (the `futures` backport on Python 2, a
+        # dependency there) is only imported when batching is used
+        if HashServer._executor is not None:
+            return HashServer._executor
+        with HashServer._session_lock:
+            if HashServer._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                HashServer._executor = ThreadPoolExecutor(cls.max_workers)
+            return HashServer._executor
+
+    def _try_post(self, payload):
+        try:
+            return self._post(payload)
+        except Exception as e:
+            return e
+
+    def _post(self, payload):
+        if self.key_pool is None:
+            return self._parse_response(*self._send(payload, self.headers))
+
+        while True:
+            token = self.key_pool.acquire()
+            headers = dict(self.headers, **{'X-AuthToken': token})
+            response = None
+            try:
+                response = self._send(payload, headers)
+            finally:
+                if response is None:
+                    self.key_pool.release(token)
+                else:
+                    self.key_pool.release(token, response[0], response[1])
+
+            # the pool has marked the key as exhausted, try the next one
+            if response[0] != 429:
+                return self._parse_response(*response, token=token)
+
+    def _send(self, payload, headers):
+        # request hashes from hashing server
+        try:
+            response = self.get_session().post(
+                self.endpoint, json=payload, headers=headers, timeout=30)
+        except requests.exceptions.Timeout:
+            raise HashingTimeoutException('Hashing request timed out.')
+        except requests.exceptions.ConnectionError as error:
+            raise HashingOfflineException(error)
+
+        return response.status_code, response.headers, response.content
+
+    def _build_payload(self, timestamp, latitude, longitude, accuracy,
+                       authticket, sessiondata, requestslist):
+        return {
             'Timestamp':
             timestamp,
             'Latitude64':
@@ -53,56 +154,158 @@ class HashServer(HashEngine):
             ]
         }
 
-        # request hashes from hashing server
-        try:
-            response = self._session.post(
-                self.endpoint, json=payload, headers=self.headers, timeout=30)
-        except requests.exceptions.Timeout:
-            raise HashingTimeoutException('Hashing request timed out.')
-        except requests.exceptions.ConnectionError as error:
-            raise HashingOfflineException(error)
+    def _parse_response(self, status_code, headers, content, token=None):
+        text = content.decode('utf-8', 'replace') if content else ''
 
-        if response.status_code == 400:
+        if status_code == 400:
             raise BadHashRequestException(
-                "400: Bad request, error: {}".format(response.text))
-        elif response.status_code == 403:
+                "400: Bad request, error: {}".format(text))
+        elif status_code == 403:
             raise TempHashingBanException(
                 'Your IP was temporarily banned for sending too many requests with invalid keys'
             )
-        elif response.status_code == 429:
+        elif status_code == 429:
             raise HashingQuotaExceededException(
-                "429: Request limited, error: {}".format(response.text))
-        elif response.status_code in (502, 503, 504):
+                "429: Request limited, error: {}".format(text))
+        elif status_code in (502, 503, 504):
             raise HashingOfflineException(
-                '{} Server Error'.format(response.status_code))
-        elif response.status_code != 200:
+                '{} Server Error'.format(status_code))
+        elif status_code != 200:
             error = 'Unexpected HTTP server response - needs 200 got {c}. {t}'.format(
-                c=response.status_code, t=response.text)
+                c=status_code, t=text)
             raise UnexpectedHashResponseException(error)
 
-        if not response.content:
+        if not content:
             raise MalformedHashResponseException('Response was empty')
 
-        headers = response.headers
         try:
             self.status['period'] = int(headers['X-RatePeriodEnd'])
             self.status['remaining'] = int(headers['X-RateRequestsRemaining'])
             self.status['maximum'] = int(headers['X-MaxRequestCount'])
             self.status['expiration'] = int(headers['X-AuthTokenExpiration'])
-            self.status['token'] = self.headers['X-AuthToken']
+            self.status['token'] = token or self.headers['X-AuthToken']
         except (KeyError, TypeError, ValueError):
             pass
 
         try:
-            response_parsed = response.json()
+            response_parsed = json.loads(text)
         except ValueError:
             raise MalformedHashResponseException(
                 'Unable to parse JSON from hash server.')
 
-        self.location_auth_hash = ctypes.c_int32(
-            response_parsed['locationAuthHash']).value
-        self.location_hash = ctypes.c_int32(
-            response_parsed['locationHash']).value
+        try:
+            return HashResult(
+                ctypes.c_int32(response_parsed['locationHash']).value,
+                ctypes.c_int32(response_parsed['locationAuthHash']).value,
+                [ctypes.c_int64(request_hash).value
+                 for request_hash in response_parsed['requestHashes']])
+        except (KeyError, TypeError):
+            raise MalformedHashResponseException(
+                'Unexpected JSON from hash server.')
+
+
+class HashBatcher(object):
+    """
+    Coalesces the hash jobs of many sessions running in parallel threads and
+    hands them to engine.hash_many() together, either once `window` seconds
+    passed since the first job of a batch or when `max_size` jobs are queued.
+    With HashServer this bounds the threads and connections used for hashing,
+    each job is still a request of its own.
+    The thread which opened a batch dispatches it, so there is no background
+    thread to manage. A job submitted while no other job is in flight is
+    dispatched right away, waiting could only delay it.
+    """
+
+    def __init__(self, engine, window=0.005, max_size=20):
+        self.engine = engine
+        self.window = window
+        self.max_size = max_size
+
+        self._cond = threading.Condition()
+        self._batch = None
+        self._in_flight = 0
+
+    def submit(self, *job):
+        entry = [job, None, threading.Event()]
+
+        with self._cond:
+            self._in_flight += 1
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = []
+            batch.append(entry)
+
+            if len(batch) >= self.max_size or self._in_flight == 1:
+                self._batch = None
+                self._cond.notify_all()
+            elif leader:
+                deadline = time.time() + self.window
+                while self._batch is batch:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self._batch = None
+                        break
+                    self._cond.wait(remaining)
+
+        try:
+            if leader:
+                self._dispatch(batch)
+            entry[2].wait()
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+
+        if isinstance(entry[1], Exception):
+            raise entry[1]
+        return entry[1]
+
+    def _dispatch(self, batch):
+        try:
+            results = self.engine.hash_many([entry[0] for entry in batch])
+        except Exception as e:
+            # never leave the other sessions of the batch waiting
+            results = [e] * len(batch)
+
+        for entry, result in zip(batch, results):
+            entry[1] = result
+            entry[2].set()
+
+
+class BatchedHashEngine(HashEngine):
+    """
+    Per request HashEngine which submits its job to a shared HashBatcher.
+    """
+
+    def __init__(self, batcher):
+        HashEngine.__init__(self)
+        self.batcher = batcher
+
+    def hash(self, timestamp, latitude, longitude, accuracy, authticket,
+             sessiondata, requestslist):
+        self.location_hash = None
+        self.location_auth_hash = None
+        self.request_hashes = []
+
+        self.set_result(
+            self.batcher.submit(timestamp, latitude, longitude, accuracy,
+                                authticket, sessiondata, requestslist))
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
 
-        for request_hash in response_parsed['requestHashes']:
-            self.request_hashes.append(ctypes.c_int64(request_hash).value)
+def get_hash_batcher(auth_token, window=0.005, max_size=20):
+    """
+    Returns the HashBatcher shared by every session using auth_token with the
+    same window and max_size. Sessions asking for other settings get their
+    own, so they don't change the latency of each other.
+    """
+    key = (auth_token, window, max_size)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = HashBatcher(HashServer(auth_token), window, max_size)
+            _batchers[key] = batcher
+        return batcher
@@ -0,0 +1,279 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import threading
+
+from collections import OrderedDict
+
+from pgoapi.proto_dict import message_to_dict
+from pgoapi.response import MessageView
+
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+
+"""
+Incremental GET_MAP_OBJECTS: MapCellCache remembers the current_timestamp_ms
+of every S2 cell seen in a response and fills it in as since_timestamp_ms
+of the next request for that cell, so the server only sends what changed.
+The delta responses are merged into a complete view of each cell:
+
+    cache = MapCellCache()
+    api.set_map_cell_cache(cache)   # or cache.prepare/cache.update by hand
+
+    cell_ids = get_cell_ids(lat, lng)
+    api.get_map_objects(latitude=lat, longitude=lng, cell_id=cell_ids)
+    cells = cache.get_cells(cell_ids)
+
+Forts, fort summaries and spawn points are merged by id (location for spawn
+points) and removed again when listed in deleted_objects. The pokemon lists
+are not incremental, every response replaces them.
+
+Requests without since_timestamp_ms, or with None or only zeros (the
+usual [0] * len(cell_ids)), are filled in. Other explicitly passed
+timestamps are sent as they are.
+
+Results of call(lazy=True) and call(use_dict=False) are merged straight
+from the messages, objects are only converted to dicts by get_cells.
+"""
+
+GET_MAP_OBJECTS = RequestType.Value('GET_MAP_OBJECTS')
+SUCCESS = 1  # GetMapObjectsResponse.Status
+
+# merged lists and the key of their entries
+MERGED = (
+    ('forts', 'id'),
+    ('fort_summaries', 'fort_summary_id'),
+    ('spawn_points', None),
+    ('decimated_spawn_points', None),
+)
+REPLACED = ('wild_pokemons', 'catchable_pokemons', 'nearby_pokemons')
+
+
+def get_map_objects(response):
+    """
+    The GET_MAP_OBJECTS response, from a call() result of any mode or the
+    sub-response itself: a dict for dict results, the message otherwise,
+    so lazy results are not converted. None if there is none.
+    """
+    if isinstance(response, (MessageView, dict)):
+        if 'responses' in response:
+            response = response['responses'].get('GET_MAP_OBJECTS')
+
+    if isinstance(response, MessageView):
+        response = response.get_message()
+    if not isinstance(response, dict) and not hasattr(response, 'ListFields'):
+        return None  # missing or an error message
+    return response
+
+
+def _get(value, name, default=None):
+    # field of a dict or a message, unset message fields are their default
+    if isinstance(value, dict):
+        return value.get(name, default)
+    return getattr(value, name)
+
+
+def _to_dict(value):
+    return value if isinstance(value, dict) else message_to_dict(value)
+
+
+def _get_key(key, value):
+    if key is None:
+        return (_get(value, 'latitude'), _get(value, 'longitude'))
+    return _get(value, key)
+
+
+def _is_unset(timestamps):
+    # callers traditionally pass [0] * len(cell_ids) for "everything"
+    return timestamps is None or not any(timestamps)
+
+
+def _keep(value):
+    # a kept sub-message can hold on to its whole response (with the C++
+    # and upb backends), merged objects may be kept for long
+    if isinstance(value, dict):
+        return value
+    copy = type(value)()
+    copy.CopyFrom(value)
+    return copy
+
+
+class MapCell(object):
+    """
+    Merged contents of one cell. Objects are kept in the form they came in
+    (dicts or messages) and converted to dicts when read.
+    """
+
+    def __init__(self, cell_id):
+        self.cell_id = cell_id
+        self.timestamp = 0
+        self.objects = dict((name, OrderedDict()) for name, _ in MERGED)
+        self.pokemons = dict((name, []) for name in REPLACED)
+
+    def update(self, cell):
+        for name, key in MERGED:
+            entries = self.objects[name]
+            for value in _get(cell, name, ()):
+                entries[_get_key(key, value)] = _keep(value)
+
+        deleted = _get(cell, 'deleted_objects')
+        if deleted:
+            for name, key in MERGED:
+                if key is None:
+                    continue
+                entries = self.objects[name]
+                for object_id in deleted:
+                    entries.pop(object_id, None)
+
+        for name in REPLACED:
+            self.pokemons[name] = list(_get(cell, name, ()))
+
+        # the rest of a truncated list comes with the next request
+        if not _get(cell, 'is_truncated_list'):
+            self.timestamp = max(self.timestamp,
+                                 _get(cell, 'current_timestamp_ms', 0))
+
+    def to_dict(self):
+        cell = {'s2_cell_id': self.cell_id,
+                'current_timestamp_ms': self.timestamp}
+        for name, _ in MERGED:
+            if self.objects[name]:
+                cell[name] = [_to_dict(value)
+                              for value in self.objects[name].values()]
+        for name in REPLACED:
+            if self.pokemons[name]:
+                cell[name] = [_to_dict(value) for value in self.pokemons[name]]
+        return cell
+
+
+class MapCellCache(object):
+    """
+    Merged contents of up to max_cells S2 cells, the least recently updated
+    are dropped first. Safe to share between the PGoApi instances of a
+    process.
+    """
+
+    def __init__(self, max_cells=50000):
+        self.max_cells = max_cells
+
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.updates = 0
+        self.full = 0
+        self.incremental = 0
+
+    def get_since_timestamps(self, cell_ids):
+        with self._lock:
+            timestamps = []
+            for cell_id in cell_ids:
+                cell = self._cells.get(cell_id)
+                timestamps.append(cell.timestamp if cell is not None else 0)
+            return timestamps
+
+    def prepare(self, subrequests):
+        """
+        Sub-requests (as in PGoApiRequest) with since_timestamp_ms filled in
+        for GET_MAP_OBJECTS requests which don't pass it or pass only zeros.
+        """
+        prepared = []
+        for request_type, kwargs in subrequests:
+            if (request_type == GET_MAP_OBJECTS and kwargs and
+                    kwargs.get('cell_id') is not None and
+                    _is_unset(kwargs.get('since_timestamp_ms'))):
+                kwargs = dict(kwargs)
+                kwargs['since_timestamp_ms'] = self.get_since_timestamps(
+                    kwargs['cell_id'])
+            prepared.append((request_type, kwargs))
+        return prepared
+
+    def update(self, response):
+        """
+        Merges the map cells of a GET_MAP_OBJECTS response, returns the ids
+        of the updated cells.
+        """
+        response = get_map_objects(response)
+        if response is None or _get(response, 'status') != SUCCESS:
+            return []
+
+        updated = []
+        with self._lock:
+            for value in _get(response, 'map_cells', ()):
+                cell_id = _get(value, 's2_cell_id')
+                if cell_id is None:
+                    continue
+
+                cell = self._cells.pop(cell_id, None)
+                if cell is None or not cell.timestamp:
+                    self.full += 1
+                else:
+                    self.incremental += 1
+                if cell is None:
+                    cell = MapCell(cell_id)
+                cell.update(value)
+                self._cells[cell_id] = cell
+                updated.append(cell_id)
+
+            while len(self._cells) > self.max_cells:
+                self._cells.popitem(last=False)
+            self.updates += 1
+        return updated
+
+    def get_cell(self, cell_id):
+        with self._lock:
+            cell = self._cells.get(cell_id)
+            return cell.to_dict() if cell is not None else None
+
+    def get_cells(self, cell_ids):
+        """
+        Merged map cells (dicts like the map_cells of a response) of the
+        given ids, skipping cells not seen yet.
+        """
+        with self._lock:
+            return [self._cells[cell_id].to_dict() for cell_id in cell_ids
+                    if cell_id in self._cells]
+
+    def forget(self, cell_ids):
+        with self._lock:
+            for cell_id in cell_ids:
+                self._cells.pop(cell_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+
+    def __len__(self):
+        return len(self._cells)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'cells': len(self._cells),
+                'max_cells': self.max_cells,
+                'updates': self.updates,
+                'full': self.full,
+                'incremental': self.incremental
+            }
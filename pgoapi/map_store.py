@@ -0,0 +1,351 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import math
+import time
+import heapq
+import threading
+
+from itertools import count
+from collections import OrderedDict
+
+from s2sphere import CellId
+
+from pgoapi.map_cache import get_map_objects
+from pgoapi.proto_dict import message_to_dict
+from pgoapi.utilities import EARTH_RADIUS
+
+"""
+In-memory store of the map objects of GET_MAP_OBJECTS responses, indexed
+on a lat/lng grid for radius and bounding box queries:
+
+    store = MapObjectStore()
+    store.ingest(api.get_map_objects(...))
+    pokemons = store.query_radius('wild_pokemons', lat, lng, 200)
+
+Objects are the dicts of the response, stored per kind (see KINDS) under
+their id. Pokemon expire with time_till_hidden_ms or
+expiration_timestamp_ms, taken relative to the cell's current_timestamp_ms
+so the local clock doesn't need to match the server's. Kinds without an
+expiry of their own live for `ttls[kind]` seconds, None keeps them until
+they are replaced. Expired objects are evicted on every ingest and query.
+On top of that every kind holds at most max_objects objects, the least
+recently stored are evicted first.
+
+Nearby pokemons have no position of their own, they are placed at their
+fort (if it is known) or else the center of their map cell. Weather is
+placed at the center of its S2 cell.
+"""
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+KINDS = ('forts', 'spawn_points', 'wild_pokemons', 'catchable_pokemons',
+         'nearby_pokemons', 'weather')
+
+DEFAULT_TTLS = {
+    'forts': 86400,  # renewed whenever a scan sees them again
+    'spawn_points': 86400,
+    'wild_pokemons': 900,  # no or negative time_till_hidden_ms
+    'catchable_pokemons': 900,
+    'nearby_pokemons': 120,
+    'weather': 3600
+}
+
+
+class _Entry(object):
+    __slots__ = ('key', 'lat', 'lng', 'expires', 'value', 'bucket', 'version')
+
+    def __init__(self, key, lat, lng, expires, value, bucket, version):
+        self.key = key
+        self.lat = lat
+        self.lng = lng
+        self.expires = expires
+        self.value = value
+        self.bucket = bucket
+        self.version = version
+
+
+def _cell_center(cell_id):
+    # ClientWeather has the id as int64
+    cell = CellId(cell_id % (1 << 64))
+    if not cell.is_valid():
+        return None
+    lat_lng = cell.to_lat_lng()
+    return lat_lng.lat().degrees, lat_lng.lng().degrees
+
+
+class MapObjectStore(object):
+    """
+    Map objects in grid buckets of about bucket_size meters (of latitude,
+    buckets narrow towards the poles). Safe to share between threads.
+    """
+
+    def __init__(self, bucket_size=250, ttls=None, max_objects=100000):
+        self.step = float(bucket_size) / METERS_PER_DEGREE
+        self.max_objects = max_objects
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        # in the order they were stored, for the max_objects eviction
+        self._objects = dict((kind, OrderedDict()) for kind in KINDS)
+        self._buckets = dict((kind, {}) for kind in KINDS)
+        self._expiry = []
+        self._versions = count()
+        self._lock = threading.RLock()
+
+    def _bucket(self, lat, lng):
+        return (int(math.floor(lat / self.step)),
+                int(math.floor(lng / self.step)))
+
+    def add(self, kind, key, lat, lng, value, expires=None, now=None):
+        """
+        Stores (or replaces) an object. expires is a time.time() timestamp,
+        by default now plus the ttl of the kind.
+        """
+        if now is None:
+            now = time.time()
+        if expires is None and self.ttls[kind] is not None:
+            expires = now + self.ttls[kind]
+
+        with self._lock:
+            self._remove(kind, key)
+            entry = _Entry(key, lat, lng, expires, value,
+                           self._bucket(lat, lng), next(self._versions))
+            objects = self._objects[kind]
+            objects[key] = entry
+            self._buckets[kind].setdefault(entry.bucket, {})[key] = entry
+            if self.max_objects is not None:
+                while len(objects) > self.max_objects:
+                    self._remove(kind, next(iter(objects)))
+            if expires is not None:
+                heapq.heappush(self._expiry,
+                               (expires, entry.version, kind, key))
+                if len(self._expiry) > 2 * len(self) + 1024:
+                    self._compact()
+
+    def _compact(self):
+        # drop the queue entries of replaced and removed objects
+        self._expiry = [item for item in self._expiry
+                        if self._is_current(item)]
+        heapq.heapify(self._expiry)
+
+    def _is_current(self, item):
+        _, version, kind, key = item
+        entry = self._objects[kind].get(key)
+        return entry is not None and entry.version == version
+
+    def _remove(self, kind, key):
+        entry = self._objects[kind].pop(key, None)
+        if entry is None:
+            return None
+        bucket = self._buckets[kind][entry.bucket]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[kind][entry.bucket]
+        return entry
+
+    def remove(self, kind, key):
+        with self._lock:
+            entry = self._remove(kind, key)
+            return entry.value if entry is not None else None
+
+    def expire(self, now=None):
+        """
+        Evicts the expired objects, returns how many.
+        """
+        if now is None:
+            now = time.time()
+        expired = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                item = heapq.heappop(self._expiry)
+                if self._is_current(item):
+                    self._remove(item[2], item[3])
+                    expired += 1
+        return expired
+
+    def ingest(self, response, now=None):
+        """
+        Stores the objects of a GET_MAP_OBJECTS response (a call() result of
+        any mode or the sub-response), returns the number of objects.
+        """
+        response = get_map_objects(response)
+        if response is None:
+            return 0
+        if not isinstance(response, dict):
+            response = message_to_dict(response)
+        if now is None:
+            now = time.time()
+
+        added = 0
+        with self._lock:
+            self.expire(now)
+            for cell in response.get('map_cells', ()):
+                added += self._ingest_cell(cell, now)
+
+            for weather in response.get('client_weather', ()):
+                center = _cell_center(weather.get('s2_cell_id', 0))
+                if center is not None:
+                    self.add('weather', weather['s2_cell_id'], center[0],
+                             center[1], weather, now=now)
+                    added += 1
+        return added
+
+    def _ingest_cell(self, cell, now):
+        added = 0
+        forts = {}
+        for fort in cell.get('forts', ()):
+            self.add('forts', fort['id'], fort.get('latitude', 0.0),
+                     fort.get('longitude', 0.0), fort, now=now)
+            forts[fort['id']] = fort
+            added += 1
+
+        for name in ('spawn_points', 'decimated_spawn_points'):
+            for spawn in cell.get(name, ()):
+                location = (spawn.get('latitude', 0.0),
+                            spawn.get('longitude', 0.0))
+                self.add('spawn_points', location, location[0], location[1],
+                         spawn, now=now)
+                added += 1
+
+        # server time of the cell, to turn server timestamps into local ones
+        server_now = cell.get('current_timestamp_ms')
+
+        for wild in cell.get('wild_pokemons', ()):
+            expires = None
+            if wild.get('time_till_hidden_ms', 0) > 0:
+                expires = now + wild['time_till_hidden_ms'] / 1000.0
+            self.add('wild_pokemons', wild['encounter_id'],
+                     wild.get('latitude', 0.0), wild.get('longitude', 0.0),
+                     wild, expires, now)
+            added += 1
+
+        for pokemon in cell.get('catchable_pokemons', ()):
+            expires = None
+            expiration = pokemon.get('expiration_timestamp_ms', 0)
+            if expiration > 0:
+                expires = (now + (expiration - server_now) / 1000.0 if server_now
+                           else expiration / 1000.0)
+            self.add('catchable_pokemons', pokemon['encounter_id'],
+                     pokemon.get('latitude', 0.0),
+                     pokemon.get('longitude', 0.0), pokemon, expires, now)
+            added += 1
+
+        center = None
+        for pokemon in cell.get('nearby_pokemons', ()):
+            fort_id = pokemon.get('fort_id')
+            fort = forts.get(fort_id) or self.get('forts', fort_id)
+            if fort is not None:
+                location = (fort.get('latitude', 0.0),
+                            fort.get('longitude', 0.0))
+            else:
+                if center is None:
+                    center = _cell_center(cell.get('s2_cell_id', 0)) or False
+                location = center
+            if location:
+                self.add('nearby_pokemons', pokemon['encounter_id'],
+                         location[0], location[1], pokemon, now=now)
+                added += 1
+        return added
+
+    def get(self, kind, key):
+        with self._lock:
+            entry = self._objects[kind].get(key)
+            return entry.value if entry is not None else None
+
+    def _query(self, kind, lat_min, lng_min, lat_max, lng_max, now, match):
+        self.expire(now)
+        row_min, column_min = self._bucket(lat_min, lng_min)
+        row_max, column_max = self._bucket(lat_max, lng_max)
+        buckets = self._buckets[kind]
+
+        results = []
+        if (row_max - row_min + 1) * (column_max - column_min + 1) > len(buckets):
+            # larger than the stored area, faster to go through all buckets
+            candidates = [bucket for (row, column), bucket in buckets.items()
+                          if row_min <= row <= row_max and
+                          column_min <= column <= column_max]
+        else:
+            candidates = [buckets[(row, column)]
+                          for row in range(row_min, row_max + 1)
+                          for column in range(column_min, column_max + 1)
+                          if (row, column) in buckets]
+        for bucket in candidates:
+            for entry in bucket.values():
+                if match(entry):
+                    results.append(entry)
+        return results
+
+    def query_bbox(self, kind, lat_min, lng_min, lat_max, lng_max, now=None):
+        """
+        Objects of `kind` inside the bounding box.
+        """
+        if now is None:
+            now = time.time()
+
+        def match(entry):
+            return (lat_min <= entry.lat <= lat_max and
+                    lng_min <= entry.lng <= lng_max)
+
+        with self._lock:
+            return [entry.value for entry in self._query(
+                kind, lat_min, lng_min, lat_max, lng_max, now, match)]
+
+    def query_radius(self, kind, lat, lng, radius, now=None):
+        """
+        Objects of `kind` within `radius` meters of (lat, lng), nearest first.
+        Distances are equirectangular, accurate for radii of a few km.
+        """
+        if now is None:
+            now = time.time()
+        scale = math.cos(math.radians(lat))
+        lat_span = radius / METERS_PER_DEGREE
+        lng_span = lat_span / max(scale, 1e-6)
+        limit = lat_span * lat_span
+
+        def distance2(entry):
+            y = entry.lat - lat
+            x = (entry.lng - lng) * scale
+            return x * x + y * y
+
+        with self._lock:
+            entries = self._query(kind, lat - lat_span, lng - lng_span,
+                                  lat + lat_span, lng + lng_span, now,
+                                  lambda entry: distance2(entry) <= limit)
+            entries.sort(key=distance2)
+            return [entry.value for entry in entries]
+
+    def __len__(self):
+        return sum(len(objects) for objects in self._objects.values())
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict((kind, len(self._objects[kind])) for kind in KINDS)
+            stats['buckets'] = sum(len(b) for b in self._buckets.values())
+            stats['expiry_queue'] = len(self._expiry)
+            return stats
@@ -26,14 +26,23 @@ Author: tjado <https://github.com/tejado>
 from __future__ import absolute_import
 
 import time
+import base64
 import random
 import logging
 import requests
 
+from six import string_types
+
 from . import __title__, __version__, __copyright__
 from pgoapi.rpc_api import RpcApi, RpcState
 from pgoapi.auth_ptc import AuthPtc
 from pgoapi.auth_google import AuthGoogle
+from pgoapi.hash_engine import get_hash_engine_class
+from pgoapi.hash_key_pool import HashKeyPool
+from pgoapi.hash_server import get_hash_batcher
+from pgoapi.token_refresher import get_token_refresher
+from pgoapi.trace import WireTrace
+from pgoapi.transport import get_transport
 from pgoapi.utilities import parse_api_endpoint, get_time
 from pgoapi.exceptions import AuthException, AuthTokenExpiredException, BadRequestException, BannedAccountException, InvalidCredentialsException, NoPlayerPositionSetException, NotLoggedInException, ServerApiEndpointRedirectException, ServerBusyOrOfflineException, UnexpectedResponseException
 
@@ -43,6 +52,10 @@ from pogoprotos.networking.platform.platform_request_type_pb2 import PlatformReq
 
 logger = logging.getLogger(__name__)
 
+# the session state is saved at least every REQUEST_ID_SAVE_INTERVAL request
+# ids, a resumed session skips twice as many so it never reuses one
+REQUEST_ID_SAVE_INTERVAL = 50
+
 
 class PGoApi:
     def __init__(self,
@@ -54,7 +67,8 @@ class PGoApi:
                  position_lng=None,
                  position_alt=None,
                  proxy_config=None,
-                 device_info=None):
+                 device_info=None,
+                 transport=None):
         self.RPC_ID_LOW = 1
         self.RPC_ID_HIGH = 1
         self.START_TIME = get_time(ms=True) - random.randint(6000, 10000)
@@ -62,6 +76,14 @@ class PGoApi:
         self.set_logger()
         self.log.info('%s v%s - %s', __title__, __version__, __copyright__)
 
+        # connection pools shared with all other instances using it
+        self._transport = transport or get_transport()
+        self._token_refresher = None
+        self._auth_store = None
+        self._auth_store_key = None
+        self._saved_session = None
+        self._saved_request_id = None
+
         self._auth_provider = None
         if provider is not None and (
             (username is not None and password is not None) or
@@ -76,24 +98,33 @@ class PGoApi:
         self._position_alt = position_alt
 
         self._hash_server_token = None
+        self._hash_batcher = None
+        self._hash_engine_factory = None
+        self._wire_trace = None
+        self._map_cell_cache = None
 
-        self._session = requests.session()
+        self._session = self._create_session(proxy_config)
+
+        self.device_info = device_info
+        self.state = RpcState()
+
+    def _create_session(self, proxy_config=None):
+        session = requests.session()
 
         # requests' Session calls .default_headers() in init, which
         # makes it set a bunch of default headers, including
         # 'Connection': 'keep-alive', so we overwrite all of them.
-        self._session.headers = {
+        session.headers = {
             'User-Agent': 'Niantic App',
             'Content-Type': 'application/binary',
             'Accept-Encoding': 'identity, gzip'
         }
-        self._session.verify = True
+        session.verify = True
 
         if proxy_config is not None:
-            self._session.proxies = proxy_config
+            session.proxies = proxy_config
 
-        self.device_info = device_info
-        self.state = RpcState()
+        return self._transport.mount(session)
 
     def set_logger(self, logger=None):
         self.log = logger or logging.getLogger(__name__)
@@ -111,8 +142,32 @@ class PGoApi:
                            user_agent=None,
                            timeout=None,
                            locale=None):
+        self._set_auth_provider(provider, proxy_config, user_agent, timeout,
+                                locale)
+
+        if oauth2_refresh_token is not None:
+            self._auth_provider.set_refresh_token(oauth2_refresh_token)
+        elif username and password:
+            if not self._auth_provider.user_login(username, password):
+                raise AuthException("User login failed!")
+        else:
+            raise InvalidCredentialsException(
+                "Invalid Credential Input - Please provide username/password or an oauth2 refresh token"
+            )
+
+        if self._token_refresher is not None:
+            self._token_refresher.add(self._auth_provider)
+
+    def _set_auth_provider(self, provider, proxy_config=None, user_agent=None,
+                           timeout=None, locale=None, username=None,
+                           password=None):
+        if self._token_refresher is not None and self._auth_provider is not None:
+            self._token_refresher.remove(self._auth_provider)
+
         if provider == 'ptc':
-            self._auth_provider = AuthPtc(user_agent=user_agent, timeout=timeout, locale=locale)
+            self._auth_provider = AuthPtc(username=username, password=password,
+                                          user_agent=user_agent, timeout=timeout,
+                                          locale=locale, transport=self._transport)
         elif provider == 'google':
             self._auth_provider = AuthGoogle()
         elif provider is None:
@@ -126,15 +181,122 @@ class PGoApi:
         if proxy_config:
             self._auth_provider.set_proxy(proxy_config)
 
-        if oauth2_refresh_token is not None:
-            self._auth_provider.set_refresh_token(oauth2_refresh_token)
-        elif username and password:
-            if not self._auth_provider.user_login(username, password):
-                raise AuthException("User login failed!")
+    def set_auth_store(self, store, key=None):
+        """
+        Persists the session state (see get_session_state) in an AuthStore
+        after login, after calls which changed the auth ticket, access
+        token or API endpoint and every REQUEST_ID_SAVE_INTERVAL request
+        ids, login() resumes from it. key
+        defaults to '<provider>:<username>' of the login.
+        """
+        self._auth_store = store
+        self._auth_store_key = key
+
+    def get_session_state(self):
+        return {
+            'auth': self._auth_provider.get_state() if self._auth_provider else None,
+            'session_hash': base64.b64encode(self.state.session_hash).decode('ascii'),
+            'request_id_low': self.RPC_ID_LOW,
+            'request_id_high': self.RPC_ID_HIGH,
+            'start_time': self.START_TIME,
+            'api_endpoint': self._api_endpoint
+        }
+
+    def set_session_state(self, state):
+        self.state.session_hash = base64.b64decode(state['session_hash'])
+        self.RPC_ID_LOW = state['request_id_low']
+        self.RPC_ID_HIGH = state['request_id_high']
+        self.START_TIME = state['start_time']
+        self._api_endpoint = state['api_endpoint']
+        if state['auth'] and self._auth_provider is not None:
+            self._auth_provider.set_state(state['auth'])
+
+    def save_session_state(self, changed_only=False):
+        if changed_only:
+            state = self._get_changed_session_state()
+        elif self._auth_store is not None and self._auth_store_key is not None:
+            state = self.get_session_state()
         else:
-            raise InvalidCredentialsException(
-                "Invalid Credential Input - Please provide username/password or an oauth2 refresh token"
-            )
+            state = None
+        if state is not None:
+            self._store_session_state(state)
+
+    def _get_changed_session_state(self):
+        """
+        The session state if its auth part or the API endpoint changed since
+        it was last saved, or REQUEST_ID_SAVE_INTERVAL request ids were used,
+        None otherwise. The request ids alone are not worth a save on every
+        call.
+        """
+        if self._auth_store is None or self._auth_store_key is None:
+            return None
+        auth = self._auth_provider.get_state() if self._auth_provider else None
+        if ((auth, self._api_endpoint) == self._saved_session and
+                self.RPC_ID_LOW - self._saved_request_id <
+                REQUEST_ID_SAVE_INTERVAL):
+            return None
+        return self.get_session_state()
+
+    def _store_session_state(self, state):
+        try:
+            self._auth_store.save(self._auth_store_key, state)
+        except Exception as e:
+            self.log.warning('Saving the session state failed: %r', e)
+        else:
+            self._saved_session = (state['auth'], state['api_endpoint'])
+            self._saved_request_id = state['request_id_low']
+
+    def resume_session(self, provider, username=None, password=None,
+                       proxy_config=None):
+        """
+        Restores the stored session of the account. Returns True if its
+        session ticket or access token is still valid, so no login is needed.
+        The device state (session hash, request ids, start time) is restored
+        either way. The request ids used after the last save are not known,
+        so 2 * REQUEST_ID_SAVE_INTERVAL ids are skipped.
+        """
+        if self._auth_store is None:
+            return False
+
+        key = self._auth_store_key or '{}:{}'.format(provider, username)
+        self._auth_store_key = key
+        state = self._auth_store.load(key)
+        if not state:
+            return False
+
+        auth_state = state.get('auth')
+        if not auth_state or auth_state.get('provider') != provider:
+            state = dict(state, auth=None)
+
+        self._set_auth_provider(provider, proxy_config, username=username,
+                                password=password)
+        self.set_session_state(state)
+        self.skip_request_ids(2 * REQUEST_ID_SAVE_INTERVAL)
+
+        auth = self._auth_provider
+        if not state['auth'] or not auth.is_login() or not (
+                auth.check_ticket() or auth.check_access_token()):
+            return False
+
+        self.log.info('Resumed stored session of %s', key)
+        if self._token_refresher is not None:
+            self._token_refresher.add(auth)
+        return True
+
+    def enable_token_refresh(self, refresher=None):
+        """
+        Lets a TokenRefresher (by default the process wide one) renew the
+        access token in the background shortly before it expires.
+        """
+        self.disable_token_refresh()
+        self._token_refresher = refresher or get_token_refresher()
+        if self._auth_provider is not None:
+            self._token_refresher.add(self._auth_provider)
+
+    def disable_token_refresh(self):
+        if self._token_refresher is not None and self._auth_provider is not None:
+            self._token_refresher.remove(self._auth_provider)
+        self._token_refresher = None
 
     def get_position(self):
         return (self._position_lat, self._position_lng, self._position_alt)
@@ -153,7 +315,8 @@ class PGoApi:
         return self._api_endpoint
 
     def set_api_endpoint(self, api_url):
-        if api_url.startswith("https"):
+        # plain http is only used by local test servers
+        if api_url.startswith(("https", "http://")):
             self._api_endpoint = api_url
         else:
             self._api_endpoint = parse_api_endpoint(api_url)
@@ -161,17 +324,85 @@ class PGoApi:
     def get_auth_provider(self):
         return self._auth_provider
 
+    def set_auth_provider(self, auth_provider):
+        """
+        Uses an already logged in Auth provider, e.g. one of the results of
+        pgoapi.auth_batch.batch_login.
+        """
+        if self._token_refresher is not None and self._auth_provider is not None:
+            self._token_refresher.remove(self._auth_provider)
+        self._auth_provider = auth_provider
+        if self._token_refresher is not None and auth_provider is not None:
+            self._token_refresher.add(auth_provider)
+
     def create_request(self):
         request = PGoApiRequest(self, self._position_lat, self._position_lng,
                                 self._position_alt, self.device_info)
         return request
 
-    def activate_hash_server(self, hash_server_token):
+    def activate_hash_server(self, hash_server_token=None, batch_window=None,
+                             batch_size=20, engine='server', **engine_options):
+        """
+        hash_server_token is a single key, a list of keys or a HashKeyPool.
+        Several keys are spread by quota, pass the same HashKeyPool to all
+        PGoApi instances to share the keys between them.
+
+        With batch_window (in seconds) set, the hash requests of every PGoApi
+        instance using the same token and settings are queued in a shared
+        HashBatcher. The hash server has no batch endpoint, each job is still
+        one request, but many accounts running in parallel threads share a
+        bounded pool of hashing threads and connections.
+
+        engine selects another registered HashEngine (a name or a class),
+        e.g. engine='local', library_path='libpgohash.so' to hash in-process.
+        Each request gets its own engine instance created with engine_options.
+        """
+        if isinstance(hash_server_token, (list, tuple)):
+            hash_server_token = HashKeyPool(hash_server_token)
         self._hash_server_token = hash_server_token
+        self._hash_engine_factory = None
+        if engine != 'server':
+            if isinstance(engine, string_types):
+                engine = get_hash_engine_class(engine)
+            # fail early, e.g. on a missing library
+            engine(**engine_options)
+            self._hash_engine_factory = lambda: engine(**engine_options)
+            self._hash_batcher = None
+        elif batch_window is not None:
+            self._hash_batcher = get_hash_batcher(hash_server_token,
+                                                  batch_window, batch_size)
+        else:
+            self._hash_batcher = None
 
     def get_hash_server_token(self):
         return self._hash_server_token
 
+    def get_hash_batcher(self):
+        return self._hash_batcher
+
+    def get_hash_engine_factory(self):
+        return self._hash_engine_factory
+
+    def activate_wire_trace(self, handler=None, include_raw=False):
+        self._wire_trace = WireTrace(handler, include_raw)
+
+    def deactivate_wire_trace(self):
+        self._wire_trace = None
+
+    def get_wire_trace(self):
+        return self._wire_trace
+
+    def set_map_cell_cache(self, cache):
+        """
+        Lets a MapCellCache (pgoapi.map_cache) fill in since_timestamp_ms of
+        GET_MAP_OBJECTS requests and merge their responses. Share one cache
+        between the instances scanning the same area.
+        """
+        self._map_cell_cache = cache
+
+    def get_map_cell_cache(self):
+        return self._map_cell_cache
+
     def get_next_request_id(self):
         self.RPC_ID_LOW += 1
         self.RPC_ID_HIGH = ((7**5) * self.RPC_ID_HIGH) % ((2**31) - 1)
@@ -179,6 +410,11 @@ class PGoApi:
         self.log.debug('RPC Request ID: %s.', reqid)
         return reqid
 
+    def skip_request_ids(self, count):
+        self.RPC_ID_LOW += count
+        self.RPC_ID_HIGH = (pow(7**5, count, (2**31) - 1) *
+                            self.RPC_ID_HIGH) % ((2**31) - 1)
+
     def get_start_time(self):
         return self.START_TIME
 
@@ -250,6 +486,10 @@ class PGoApi:
         if alt:
             self._position_alt = alt
 
+        # a stored, still valid session makes the login flow unnecessary
+        if self.resume_session(provider, username, password):
+            return True
+
         try:
             self.set_authentication(
                 provider, username=username, password=password)
@@ -269,6 +509,7 @@ class PGoApi:
             return False
 
         self.log.info('Login process completed')
+        self.save_session_state()
 
         return True
 
@@ -296,21 +537,13 @@ class PGoApiRequest:
         self._req_platform_list = []
         self.device_info = device_info
 
-    def call(self, use_dict=True):
-        if (self._position_lat is None) or (self._position_lng is None):
-            raise NoPlayerPositionSetException
-
-        if self._auth_provider is None or not self._auth_provider.is_login():
-            self.log.info('Not logged in')
-            raise NotLoggedInException
-
-        api = self.__parent__
-        request = RpcApi(self._auth_provider, self.device_info, self.state,
-                         api.get_next_request_id(), api.get_start_time())
-        request._session = api._session
+    def call(self, use_dict=True, lazy=False):
+        request = self._create_rpc(RpcApi)
 
-        hash_server_token = api.get_hash_server_token()
-        request.activate_hash_server(hash_server_token)
+        map_cell_cache = self.__parent__.get_map_cell_cache()
+        if map_cell_cache is not None:
+            self._req_method_list = map_cell_cache.prepare(
+                self._req_method_list)
 
         response = None
         execute = True
@@ -322,37 +555,71 @@ class PGoApiRequest:
                 response = request.request(self._api_endpoint,
                                            self._req_method_list,
                                            self._req_platform_list,
-                                           self.get_position(), use_dict)
+                                           self.get_position(), use_dict,
+                                           lazy)
             except AuthTokenExpiredException as e:
                 """
                 This exception only occures if the OAUTH service provider (google/ptc) didn't send any expiration date
                 so that we are assuming, that the access_token is always valid until the API server states differently.
                 """
-                try:
-                    self.log.info(
-                        'Access Token rejected! Requesting new one...')
-                    self._auth_provider.get_access_token(force_refresh=True)
-                except Exception as e:
-                    error = 'Reauthentication failed: {}'.format(e)
-                    self.log.error(error)
-                    raise NotLoggedInException(error)
+                self._refresh_access_token()
 
                 request.request_proto = None  # reset request and rebuild
                 execute = True  # reexecute the call
             except ServerApiEndpointRedirectException as e:
-                self.log.info('API Endpoint redirect... re-execution of call')
-                new_api_endpoint = e.get_redirected_endpoint()
-
-                self._api_endpoint = parse_api_endpoint(new_api_endpoint)
-                api.set_api_endpoint(self._api_endpoint)
+                self._redirect_api_endpoint(e)
 
                 execute = True  # reexecute the call
 
         # cleanup after call execution
         self._req_method_list = []
 
+        if map_cell_cache is not None:
+            map_cell_cache.update(response)
+
+        self.__parent__.save_session_state(changed_only=True)
+
         return response
 
+    def _create_rpc(self, rpc_class):
+        if (self._position_lat is None) or (self._position_lng is None):
+            raise NoPlayerPositionSetException
+
+        if self._auth_provider is None or not self._auth_provider.is_login():
+            self.log.info('Not logged in')
+            raise NotLoggedInException
+
+        api = self.__parent__
+        request = rpc_class(self._auth_provider, self.device_info, self.state,
+                            api.get_next_request_id(), api.get_start_time())
+        request._session = api._session
+
+        hash_engine_factory = api.get_hash_engine_factory()
+        if hash_engine_factory is not None:
+            request.set_hash_engine(hash_engine_factory())
+        else:
+            request.activate_hash_server(api.get_hash_server_token(),
+                                         api.get_hash_batcher())
+        request.set_wire_trace(api.get_wire_trace())
+
+        return request
+
+    def _refresh_access_token(self):
+        try:
+            self.log.info('Access Token rejected! Requesting new one...')
+            self._auth_provider.get_access_token(force_refresh=True)
+        except Exception as e:
+            error = 'Reauthentication failed: {}'.format(e)
+            self.log.error(error)
+            raise NotLoggedInException(error)
+
+    def _redirect_api_endpoint(self, e):
+        self.log.info('API Endpoint redirect... re-execution of call')
+        new_api_endpoint = e.get_redirected_endpoint()
+
+        self._api_endpoint = parse_api_endpoint(new_api_endpoint)
+        self.__parent__.set_api_endpoint(self._api_endpoint)
+
     def list_curr_methods(self):
         for i in self._req_method_list:
             print("{} ({})".format(RequestType.Name(i), i))
@@ -379,11 +646,11 @@ class PGoApiRequest:
             name = func.upper()
             if kwargs:
                 self._req_method_list.append((RequestType.Value(name), kwargs))
-                self.log.info("Adding '%s' to RPC request including arguments", name)
+                self.log.debug("Adding '%s' to RPC request including arguments", name)
                 self.log.debug("Arguments of '%s': \n\r%s", name, kwargs)
             else:
                 self._req_method_list.append((RequestType.Value(name), None))
-                self.log.info("Adding '%s' to RPC request", name)
+                self.log.debug("Adding '%s' to RPC request", name)
 
             return self
 
@@ -396,12 +663,12 @@ class PGoApiRequest:
             if kwargs:
                 self._req_platform_list.append(
                     (PlatformRequestType.Value(name), kwargs))
-                self.log.info("Adding '%s' to RPC request including arguments", name)
+                self.log.debug("Adding '%s' to RPC request including arguments", name)
                 self.log.debug("Arguments of '%s': \n\r%s", name, kwargs)
             else:
                 self._req_platform_list.append(
                     (PlatformRequestType.Value(name), None))
-                self.log.info("Adding '%s' to RPC request", name)
+                self.log.debug("Adding '%s' to RPC request", name)
 
             return self
 
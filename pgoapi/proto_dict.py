@@ -0,0 +1,139 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+from google.protobuf.descriptor import FieldDescriptor
+
+"""
+Protobuf message to plain dict conversion. The output is the same as
+protobuf_to_dict's defaults (only set fields, enums as ints, bytes kept as
+bytes), but the per field decisions are compiled once per message type into
+a "plan" and reused for every message of that type.
+"""
+
+SCALAR = 0
+REPEATED_SCALAR = 1
+MESSAGE = 2
+REPEATED_MESSAGE = 3
+MAP = 4
+
+_plans = {}
+_includes = {}
+
+
+def get_plan(descriptor):
+    try:
+        return _plans[descriptor]
+    except KeyError:
+        pass
+
+    plan = {}
+    for field in descriptor.fields:
+        repeated = field.label == FieldDescriptor.LABEL_REPEATED
+        if field.type != FieldDescriptor.TYPE_MESSAGE:
+            kind = REPEATED_SCALAR if repeated else SCALAR
+        elif field.message_type.GetOptions().map_entry:
+            kind = MAP
+        else:
+            kind = REPEATED_MESSAGE if repeated else MESSAGE
+        plan[field] = (field.name, kind)
+
+    _plans[descriptor] = plan
+    return plan
+
+
+def compile_include(descriptor, include):
+    """
+    Turns dotted field paths like ['map_cells.wild_pokemons', 'status'] into
+    the nested dict message_to_dict walks. Every path is checked against the
+    message descriptors, a misspelled field raises a ValueError.
+    """
+    key = (descriptor, tuple(include))
+    try:
+        return _includes[key]
+    except KeyError:
+        pass
+
+    tree = {}
+    for path in include:
+        node = tree
+        current = descriptor
+        names = path.split('.')
+        for depth, name in enumerate(names):
+            if current is None or name not in current.fields_by_name:
+                raise ValueError('Unknown field {} in include path {} of {}'.format(
+                    name, path, descriptor.full_name))
+            field = current.fields_by_name[name]
+            current = field.message_type
+
+            if depth == len(names) - 1:
+                node[name] = None  # include the whole subtree
+            elif node.get(name, {}) is None:
+                break  # a shorter path already includes everything below
+            else:
+                node = node.setdefault(name, {})
+
+    _includes[key] = tree
+    return tree
+
+
+def message_to_dict(message, include=None):
+    if include is not None:
+        include = compile_include(message.DESCRIPTOR, include)
+    return _to_dict(message, include)
+
+
+def _to_dict(message, include):
+    plan = get_plan(message.DESCRIPTOR)
+    result = {}
+    for field, value in message.ListFields():
+        name, kind = plan[field]
+
+        sub_include = None
+        if include is not None:
+            if name not in include:
+                continue
+            sub_include = include[name]
+
+        if kind == SCALAR:
+            result[name] = value
+        elif kind == REPEATED_SCALAR:
+            result[name] = list(value)
+        elif kind == MESSAGE:
+            result[name] = _to_dict(value, sub_include)
+        elif kind == REPEATED_MESSAGE:
+            result[name] = [_to_dict(v, sub_include) for v in value]
+        else:
+            result[name] = _map_to_dict(field, value)
+
+    return result
+
+
+def _map_to_dict(field, value):
+    value_field = field.message_type.fields_by_name['value']
+    if value_field.type == FieldDescriptor.TYPE_MESSAGE:
+        return dict((k, _to_dict(v, None)) for k, v in value.items())
+    return dict(value)
@@ -0,0 +1,252 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+
+from __future__ import absolute_import
+
+import threading
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from collections import OrderedDict
+
+from six import integer_types, string_types
+from google.protobuf.descriptor import FieldDescriptor
+
+from pgoapi.exceptions import InvalidRequestArgumentException
+from pgoapi.proto_dict import MAP, MESSAGE, REPEATED_MESSAGE, REPEATED_SCALAR, SCALAR
+
+"""
+Request arguments (plain dicts, like the keyword arguments of the request
+methods) to protobuf messages, the counterpart of proto_dict. The field
+lookups are compiled once per message type into an encoder plan.
+
+Values are assigned as they are, protobuf does the type checks. On top of
+that enum fields take value names, repeated fields take lists, tuples or a
+single value, message fields take dicts or messages and None leaves a field
+unset. Anything else raises an InvalidRequestArgumentException.
+
+Most requests are sent with the same few argument sets by every account
+(download_settings, get_player with its locale, ...), encode_message keeps
+the serialized bytes of small argument sets in a bounded EncodeCache.
+"""
+
+_plans = {}
+
+
+def get_encoder_plan(descriptor):
+    try:
+        return _plans[descriptor]
+    except KeyError:
+        pass
+
+    plan = {}
+    for field in descriptor.fields:
+        repeated = field.label == FieldDescriptor.LABEL_REPEATED
+        if field.type != FieldDescriptor.TYPE_MESSAGE:
+            kind = REPEATED_SCALAR if repeated else SCALAR
+        elif field.message_type.GetOptions().map_entry:
+            kind = MAP
+        else:
+            kind = REPEATED_MESSAGE if repeated else MESSAGE
+
+        enum_values = None
+        if field.enum_type is not None:
+            enum_values = dict((value.name, value.number)
+                               for value in field.enum_type.values)
+        plan[field.name] = (kind, field, enum_values)
+
+    _plans[descriptor] = plan
+    return plan
+
+
+def dict_to_message(message, values):
+    plan = get_encoder_plan(message.DESCRIPTOR)
+    for name, value in values.items():
+        if value is None:
+            continue
+        try:
+            kind, field, enum_values = plan[name]
+        except KeyError:
+            raise InvalidRequestArgumentException(
+                'Unknown argument {} for {}'.format(
+                    name, message.DESCRIPTOR.full_name))
+
+        try:
+            if kind == SCALAR:
+                if enum_values is not None and isinstance(value, string_types):
+                    value = enum_values[value]
+                setattr(message, name, value)
+            elif kind == REPEATED_SCALAR:
+                if not isinstance(value, (list, tuple)):
+                    value = [value]
+                if enum_values is not None:
+                    value = [enum_values[v] if isinstance(v, string_types) else v
+                             for v in value]
+                getattr(message, name).extend(value)
+            elif kind == MESSAGE:
+                _set_message(getattr(message, name), value)
+            elif kind == REPEATED_MESSAGE:
+                container = getattr(message, name)
+                if isinstance(value, Mapping):
+                    value = [value]
+                for item in value:
+                    _set_message(container.add(), item)
+            else:
+                _set_map(field, getattr(message, name), value)
+        except InvalidRequestArgumentException:
+            raise
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise InvalidRequestArgumentException(
+                'Invalid value {!r} for {}.{}: {}'.format(
+                    value, message.DESCRIPTOR.full_name, name, e))
+    return message
+
+
+def _set_message(message, value):
+    if isinstance(value, Mapping):
+        dict_to_message(message, value)
+    else:
+        message.CopyFrom(value)
+
+
+def _set_map(field, container, value):
+    value_field = field.message_type.fields_by_name['value']
+    for key, item in value.items():
+        if value_field.type == FieldDescriptor.TYPE_MESSAGE:
+            _set_message(container[key], item)
+        else:
+            container[key] = item
+
+
+class EncodeCache(object):
+    """
+    LRU cache of serialized messages keyed by message class and frozen
+    arguments. Only argument sets made of plain immutable values, dicts and
+    lists of up to max_list_length items are cached, anything else (e.g.
+    message objects or the cell id lists of GET_MAP_OBJECTS) is encoded on
+    every call.
+    """
+
+    def __init__(self, maxsize=512, max_list_length=8):
+        self.maxsize = maxsize
+        self.max_list_length = max_list_length
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+    def get_key(self, proto_class, values):
+        try:
+            return proto_class, self._freeze(values)
+        except (_Uncacheable, TypeError):
+            # TypeError: unhashable or unsortable values
+            with self._lock:
+                self.uncacheable += 1
+            return None
+
+    def _freeze(self, value):
+        if isinstance(value, _IMMUTABLE_TYPES):
+            # the type is part of the key, 1, 1.0 and True are validated
+            # differently
+            return type(value), value
+        if isinstance(value, Mapping):
+            return dict, tuple(sorted(
+                (k, self._freeze(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)) and len(value) <= self.max_list_length:
+            return list, tuple(self._freeze(v) for v in value)
+        raise _Uncacheable()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                content = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries[key] = content
+            self.hits += 1
+            return content
+
+    def put(self, key, content):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = content
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'uncacheable': self.uncacheable
+            }
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+_IMMUTABLE_TYPES = string_types + integer_types + (bytes, float, bool, type(None))
+
+_encode_cache = EncodeCache()
+
+
+def get_encode_cache():
+    return _encode_cache
+
+
+def set_encode_cache(cache):
+    """
+    Replaces the process wide EncodeCache, None disables caching.
+    """
+    global _encode_cache
+    _encode_cache = cache
+
+
+def encode_message(proto_class, values):
+    cache = _encode_cache
+    key = cache.get_key(proto_class, values) if cache is not None else None
+    if key is None:
+        return dict_to_message(proto_class(), values).SerializeToString()
+
+    content = cache.get(key)
+    if content is None:
+        content = dict_to_message(proto_class(), values).SerializeToString()
+        cache.put(key, content)
+    return content
@@ -0,0 +1,137 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import threading
+
+from importlib import import_module
+
+from pgoapi.exceptions import ProtoNotFoundException
+from pgoapi.utilities import to_camel_case
+
+from . import protos
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+from pogoprotos.networking.platform.platform_request_type_pb2 import PlatformRequestType
+
+
+class ProtoRegistry(object):
+    """
+    Maps the ids of a request type enum to their protobuf message classes,
+    following the POGOProtos naming convention. Each class is resolved once
+    on first use and cached afterwards.
+    """
+
+    def __init__(self, enum, package, suffix, aliases=None):
+        self.enum = enum
+        self.package = package
+        self.suffix = suffix
+        self.aliases = aliases or {}
+
+        self._classes = {}
+        self._missing = {}
+        self._lock = threading.Lock()
+
+    def name(self, type_id):
+        return self.enum.Name(type_id)
+
+    def module_name(self, type_id):
+        entry_name = self.name(type_id)
+        proto_name = self.aliases.get(entry_name, entry_name).lower() + self.suffix
+        return self.package + proto_name + '_pb2', to_camel_case(proto_name)
+
+    def get(self, type_id):
+        try:
+            return self._classes[type_id]
+        except KeyError:
+            pass
+
+        if type_id in self._missing:
+            raise ProtoNotFoundException(self._missing[type_id])
+
+        with self._lock:
+            try:
+                module_, class_ = self.module_name(type_id)
+            except ValueError:
+                raise ProtoNotFoundException('Unknown {} {}'.format(
+                    self.enum.DESCRIPTOR.name, type_id))
+
+            try:
+                proto_class = getattr(import_module(module_), class_)
+            except (ImportError, AttributeError):
+                error = 'Protobuf definition for {}.{} not found'.format(
+                    module_, class_)
+                self._missing[type_id] = error
+                raise ProtoNotFoundException(error)
+
+            self._classes[type_id] = proto_class
+            return proto_class
+
+    def __contains__(self, type_id):
+        try:
+            self.get(type_id)
+        except ProtoNotFoundException:
+            return False
+        return True
+
+    def load_all(self):
+        """
+        Resolves every type of the enum up front and returns the names of
+        the ones without a protobuf definition.
+        """
+        missing = []
+        for type_id in self.enum.values():
+            if type_id not in self:
+                missing.append(self.name(type_id))
+        return missing
+
+
+request_messages = ProtoRegistry(
+    RequestType, 'pogoprotos.networking.requests.messages.', '_message')
+response_messages = ProtoRegistry(
+    RequestType, 'pogoprotos.networking.responses.', '_response')
+
+platform_requests = ProtoRegistry(
+    PlatformRequestType, 'pogoprotos.networking.platform.requests.',
+    '_request', {'UNKNOWN_PTR_8': 'UNKNOWN_PTR8'})
+platform_responses = ProtoRegistry(
+    PlatformRequestType, 'pogoprotos.networking.platform.responses.',
+    '_response', {'UNKNOWN_PTR_8': 'UNKNOWN_PTR8'})
+
+
+def get_request_class(request_type):
+    return request_messages.get(request_type)
+
+
+def get_response_class(request_type):
+    return response_messages.get(request_type)
+
+
+def get_platform_request_class(platform_type):
+    return platform_requests.get(platform_type)
+
+
+def get_platform_response_class(platform_type):
+    return platform_responses.get(platform_type)
@@ -0,0 +1,214 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from google.protobuf.descriptor import FieldDescriptor
+
+from pgoapi.exceptions import ProtoNotFoundException
+from pgoapi.proto_dict import message_to_dict
+from pgoapi.proto_registry import get_response_class
+
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+
+log = logging.getLogger(__name__)
+
+
+def wrap_value(field, value):
+    if field.type != FieldDescriptor.TYPE_MESSAGE:
+        if field.label == FieldDescriptor.LABEL_REPEATED:
+            return list(value)
+        return value
+
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        return [MessageView(v) for v in value]
+    return MessageView(value)
+
+
+class MessageView(Mapping):
+    """
+    Read-only, dict compatible view on a protobuf message. Item access
+    mirrors what message_to_dict would return (only fields which are set,
+    nested messages as views, enums as ints) without converting the whole
+    message up front. Attribute access goes straight to the message.
+    """
+
+    def __init__(self, message):
+        self._message = message
+        self._fields = None
+
+    def get_message(self):
+        return self._message
+
+    def _list_fields(self):
+        if self._fields is None:
+            self._fields = dict(
+                (field.name, (field, value))
+                for field, value in self._message.ListFields())
+        return self._fields
+
+    def __getitem__(self, key):
+        field, value = self._list_fields()[key]
+        return wrap_value(field, value)
+
+    def __iter__(self):
+        return iter(self._list_fields())
+
+    def __len__(self):
+        return len(self._list_fields())
+
+    def __contains__(self, key):
+        return key in self._list_fields()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._message, name)
+
+    def to_dict(self, include=None):
+        return message_to_dict(self._message, include)
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__,
+                                self._message.DESCRIPTOR.full_name)
+
+
+class LazySubResponses(Mapping):
+    """
+    The 'responses' part of a LazyResponse. returns[i] is only parsed into
+    its response message when the matching key is accessed.
+    """
+
+    def __init__(self, returns, subrequests):
+        self._returns = returns
+        self._index = {}
+        self._parsed = {}
+
+        for i, (entry_id, _) in enumerate(subrequests[:len(returns)]):
+            self._index[RequestType.Name(entry_id)] = (i, entry_id)
+
+    def get_message(self, key):
+        try:
+            return self._parsed[key]
+        except KeyError:
+            pass
+
+        i, entry_id = self._index[key]
+        try:
+            message = get_response_class(entry_id)()
+        except ProtoNotFoundException as e:
+            log.warning(str(e))
+            message = str(e)
+        else:
+            try:
+                message.ParseFromString(self._returns[i])
+            except Exception:
+                message = "Protobuf definition for {} seems not to match".format(
+                    message.DESCRIPTOR.full_name)
+                log.warning(message)
+
+        self._parsed[key] = message
+        return message
+
+    def __getitem__(self, key):
+        message = self.get_message(key)
+        if isinstance(message, str):
+            return message
+        return MessageView(message)
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def to_dict(self, include=None):
+        """
+        include optionally maps response names to field paths, e.g.
+        {'GET_MAP_OBJECTS': ['map_cells.wild_pokemons']}; responses without
+        an entry are converted completely.
+        """
+        include = include or {}
+        return dict((key, value.to_dict(include.get(key))
+                     if isinstance(value, MessageView) else value)
+                    for key, value in self.items())
+
+
+class LazyResponse(MessageView):
+    """
+    Returned by call(lazy=True). Behaves like the dict of a use_dict=True
+    call but keeps the ResponseEnvelope and decodes sub-responses on demand.
+
+    returns are the raw sub-responses if they were split off the envelope
+    (see RpcApi._parse_main_response), the envelope's returns field is empty
+    then.
+    """
+
+    def __init__(self, envelope, subrequests, returns=None):
+        MessageView.__init__(self, envelope)
+        if returns is None:
+            returns = envelope.returns
+        self.responses = LazySubResponses(returns, subrequests)
+
+    def get_envelope(self):
+        return self._message
+
+    def _list_fields(self):
+        if self._fields is None:
+            MessageView._list_fields(self)
+            self._fields.pop('returns', None)
+        return self._fields
+
+    def __getitem__(self, key):
+        if key == 'responses':
+            return self.responses
+        return MessageView.__getitem__(self, key)
+
+    def __iter__(self):
+        for key in self._list_fields():
+            yield key
+        yield 'responses'
+
+    def __len__(self):
+        return len(self._list_fields()) + 1
+
+    def __contains__(self, key):
+        return key == 'responses' or key in self._list_fields()
+
+    def to_dict(self, include=None):
+        response_dict = message_to_dict(self._message)
+        response_dict.pop('returns', None)
+        response_dict['responses'] = self.responses.to_dict(include)
+        return response_dict
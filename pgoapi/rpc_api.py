@@ -26,30 +26,35 @@ Author: tjado <https://github.com/tejado>
 from __future__ import absolute_import
 
 import os
+import time
 import random
 import logging
 import requests
-import subprocess
 import ctypes
 
-from importlib import import_module
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 from google.protobuf import message
-from protobuf_to_dict import protobuf_to_dict
 from pycrypt import pycrypt
 
-from pgoapi.exceptions import (AuthTokenExpiredException, BadRequestException, MalformedNianticResponseException, NianticIPBannedException, NianticOfflineException, NianticThrottlingException, NianticTimeoutException, NotLoggedInException, ServerApiEndpointRedirectException, UnexpectedResponseException)
-from pgoapi.utilities import to_camel_case, get_time, get_format_time_diff, weighted_choice
-from pgoapi.hash_server import HashServer
+from pgoapi.exceptions import (AuthTokenExpiredException, BadRequestException, MalformedNianticResponseException, NianticIPBannedException, NianticOfflineException, NianticThrottlingException, NianticTimeoutException, NotLoggedInException, ProtoNotFoundException, ServerApiEndpointRedirectException, UnexpectedResponseException)
+from pgoapi.utilities import get_time, get_format_time_diff, weighted_choice
+from pgoapi.hash_server import BatchedHashEngine, HashServer
+from pgoapi.proto_dict import message_to_dict
+from pgoapi.proto_encode import encode_message
+from pgoapi.proto_registry import get_platform_request_class, get_request_class, get_response_class
+from pgoapi.response import LazyResponse
+from pgoapi.signature import SignatureTemplate
+from pgoapi.wire import WireDecodeError, decode_raw, encode_bytes_field, split_field
 
 from . import protos
-from pogoprotos.networking.envelopes.request_envelope_pb2 import RequestEnvelope
-from pogoprotos.networking.envelopes.response_envelope_pb2 import ResponseEnvelope
 from pogoprotos.networking.requests.request_type_pb2 import RequestType
-from pogoprotos.networking.platform.platform_request_type_pb2 import PlatformRequestType
-from pogoprotos.networking.envelopes.signature_pb2 import Signature
-from pogoprotos.networking.platform.requests.send_encrypted_signature_request_pb2 import SendEncryptedSignatureRequest
-from pogoprotos.networking.platform.requests.unknown_ptr8_request_pb2 import UnknownPtr8Request
+
+# the envelope protos pull in a good part of the pogoprotos tree, they are
+# imported on first use to keep 'import pgoapi' cheap
 
 
 class RpcApi:
@@ -72,33 +77,31 @@ class RpcApi:
         self.state = state
         self.device_info = device_info
 
-    def activate_hash_server(self, auth_token):
-        self._hash_engine = HashServer(auth_token)
+        self._wire_trace = None
+
+    def activate_hash_server(self, auth_token, batcher=None):
+        if batcher is not None:
+            self._hash_engine = BatchedHashEngine(batcher)
+        else:
+            self._hash_engine = HashServer(auth_token)
+
+    def set_hash_engine(self, hash_engine):
+        self._hash_engine = hash_engine
+
+    def set_wire_trace(self, wire_trace):
+        self._wire_trace = wire_trace
 
     def decode_raw(self, raw):
-        output = error = None
         try:
-            process = subprocess.Popen(
-                ['protoc', '--decode_raw'],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                close_fds=True)
-            output, error = process.communicate(raw)
-        except (subprocess.SubprocessError, OSError):
-            output = "Couldn't find protoc in your environment OR other issue..."
-
-        return output
-
-    def get_class(self, cls):
-        module_, class_ = cls.rsplit('.', 1)
-        class_ = getattr(import_module(module_), to_camel_case(class_))
-        return class_
+            return decode_raw(raw)
+        except WireDecodeError as e:
+            return 'Could not decode raw protobuf: {}'.format(e)
 
     def _make_rpc(self, endpoint, request_proto_plain):
         self.log.debug('Execution of RPC')
 
         request_proto_serialized = request_proto_plain.SerializeToString()
+        started = time.time()
         try:
             http_response = self._session.post(
                 endpoint, data=request_proto_serialized, timeout=30)
@@ -107,6 +110,11 @@ class RpcApi:
         except requests.exceptions.ConnectionError as e:
             raise NianticOfflineException(e)
 
+        if self._wire_trace:
+            self._wire_trace.trace(endpoint, request_proto_plain,
+                                   len(request_proto_serialized),
+                                   http_response, time.time() - started)
+
         return http_response
 
     def request(self,
@@ -114,7 +122,8 @@ class RpcApi:
                 subrequests,
                 platforms,
                 player_position,
-                use_dict=True):
+                use_dict=True,
+                lazy=False):
 
         if not self._auth_provider or self._auth_provider.is_login() is False:
             raise NotLoggedInException()
@@ -124,10 +133,13 @@ class RpcApi:
         response = self._make_rpc(endpoint, self.request_proto)
 
         response_dict = self._parse_main_response(response, subrequests,
-                                                  use_dict)
+                                                  use_dict, lazy)
+
+        return self._check_response(response_dict, use_dict or lazy)
 
+    def _check_response(self, response_dict, use_dict=True):
         # some response validations
-        if isinstance(response_dict, dict):
+        if isinstance(response_dict, Mapping):
             if use_dict:
                 status_code = response_dict.get('status_code')
                 if ('auth_ticket' in response_dict) and (
@@ -178,8 +190,23 @@ class RpcApi:
 
     def _build_main_request(self, subrequests, platforms,
                             player_position=None):
+        request, sig, ticket_serialized, altitude = self._prepare_main_request(
+            subrequests, platforms, player_position)
+
+        self._hash_engine.hash(sig.timestamp, request.latitude,
+                               request.longitude, request.accuracy,
+                               ticket_serialized, sig.session_hash,
+                               request.requests)
+
+        return self._sign_main_request(request, sig, subrequests, altitude)
+
+    def _prepare_main_request(self, subrequests, platforms,
+                              player_position=None):
         self.log.debug('Generating main RPC request...')
 
+        from pogoprotos.networking.envelopes.request_envelope_pb2 import RequestEnvelope
+        from pogoprotos.networking.envelopes.signature_pb2 import Signature
+
         request = RequestEnvelope()
         request.status_code = 2
         request.request_id = self.request_id
@@ -194,6 +221,7 @@ class RpcApi:
             (random.uniform(65, 200), 7)
         ])
 
+        altitude = None
         if player_position:
             request.latitude, request.longitude, altitude = player_position
 
@@ -224,44 +252,33 @@ class RpcApi:
         sig.timestamp = get_time(ms=True)
         sig.timestamp_since_start = get_time(ms=True) - self.start_time
 
-        self._hash_engine.hash(sig.timestamp, request.latitude,
-                               request.longitude, request.accuracy,
-                               ticket_serialized, sig.session_hash,
-                               request.requests)
-        sig.location_hash1 = self._hash_engine.get_location_auth_hash()
-        sig.location_hash2 = self._hash_engine.get_location_hash()
-        for req_hash in self._hash_engine.get_request_hashes():
-            sig.request_hash.append(ctypes.c_uint64(req_hash).value)
-
-        loc = sig.location_fix.add()
-        sen = sig.sensor_info.add()
+        return request, sig, ticket_serialized, altitude
 
-        sen.timestamp_snapshot = sig.timestamp_since_start - int(random.triangular(93, 4900, 3000))
-        loc.timestamp_snapshot = sig.timestamp_since_start - int(random.triangular(320, 3000, 1000))
+    def _sign_main_request(self, request, sig, subrequests, altitude=None):
+        template = self.state.get_signature_template(self.device_info)
+        hash_engine = self._hash_engine
 
-        loc.provider = 'fused'
-        loc.latitude = request.latitude
-        loc.longitude = request.longitude
+        timestamp_since_start = sig.timestamp_since_start
+        sensor_timestamp = timestamp_since_start - int(random.triangular(93, 4900, 3000))
+        location_timestamp = timestamp_since_start - int(random.triangular(320, 3000, 1000))
 
-        loc.altitude = altitude or random.uniform(150, 250)
+        altitude = altitude or random.uniform(150, 250)
 
         if random.random() > .85:
             # no reading for roughly 1 in 7 updates
-            loc.course = -1
-            loc.speed = -1
+            course = -1
+            speed = -1
         else:
-            loc.course = self.state.course
-            loc.speed = random.triangular(0.25, 9.7, 8.2)
+            course = self.state.course
+            speed = random.triangular(0.25, 9.7, 8.2)
 
-        loc.provider_status = 3
-        loc.location_type = 1
         if isinstance(request.accuracy, float):
-            loc.horizontal_accuracy = weighted_choice([
+            horizontal_accuracy = weighted_choice([
                 (request.accuracy, 50),
                 (65, 40),
                 (200, 10)
             ])
-            loc.vertical_accuracy = weighted_choice([
+            vertical_accuracy = weighted_choice([
                 (random.uniform(10, 96), 50),
                 (10, 34),
                 (12, 5),
@@ -272,9 +289,9 @@ class RpcApi:
                 (96, 1)
             ])
         else:
-            loc.horizontal_accuracy = request.accuracy
+            horizontal_accuracy = request.accuracy
             if request.accuracy >= 10:
-                loc.vertical_accuracy = weighted_choice([
+                vertical_accuracy = weighted_choice([
                     (6, 4),
                     (8, 34),
                     (10, 35),
@@ -285,7 +302,7 @@ class RpcApi:
                     (48, 1)
                 ])
             else:
-                loc.vertical_accuracy = weighted_choice([
+                vertical_accuracy = weighted_choice([
                     (3, 15),
                     (4, 39),
                     (6, 14),
@@ -294,64 +311,62 @@ class RpcApi:
                     (12, 5)
                 ])
 
-        sen.magnetic_field_accuracy = weighted_choice([
+        location_fix = template.encode_location_fix(location_timestamp, (
+            altitude, request.latitude, request.longitude, speed, course,
+            horizontal_accuracy, vertical_accuracy))
+
+        magnetic_field_accuracy = weighted_choice([
             (-1, 8),
             (0, 2),
             (1, 42),
             (2, 48)
         ])
-        if sen.magnetic_field_accuracy == -1:
-            sen.magnetic_field_x = 0
-            sen.magnetic_field_y = 0
-            sen.magnetic_field_z = 0
+        if magnetic_field_accuracy == -1:
+            magnetic_field = (0, 0, 0)
         else:
-            sen.magnetic_field_x = self.state.magnetic_field_x
-            sen.magnetic_field_y = self.state.magnetic_field_y
-            sen.magnetic_field_z = self.state.magnetic_field_z
-
-        sen.linear_acceleration_x = random.triangular(-1.5, 2.5, 0)
-        sen.linear_acceleration_y = random.triangular(-1.2, 1.4, 0)
-        sen.linear_acceleration_z = random.triangular(-1.4, .9, 0)
-        sen.attitude_pitch = random.triangular(-1.56, 1.57, 0.475)
-        sen.attitude_yaw = random.triangular(-1.56, 3.14, .1)
-        sen.attitude_roll = random.triangular(-3.14, 3.14, 0)
-        sen.rotation_rate_x = random.triangular(-3.2, 3.52, 0)
-        sen.rotation_rate_y = random.triangular(-3.1, 4.88, 0)
-        sen.rotation_rate_z = random.triangular(-6, 3.7, 0)
-        sen.gravity_x = random.triangular(-1, 1, 0.01)
-        sen.gravity_y = random.triangular(-1, 1, -.4)
-        sen.gravity_z = random.triangular(-1, 1, -.4)
-        sen.status = 3
-
-        sig.unknown25 = 4500779412463383546
-
-        if self.device_info:
-            for key in self.device_info:
-                setattr(sig.device_info, key, self.device_info[key])
-            if self.device_info['device_brand'] == 'Apple':
-                sig.activity_status.stationary = True
-        else:
-            sig.activity_status.stationary = True
-
-        signature_proto = sig.SerializeToString()
+            magnetic_field = (self.state.magnetic_field_x,
+                              self.state.magnetic_field_y,
+                              self.state.magnetic_field_z)
+
+        triangular = random.triangular
+        sensor_info = template.encode_sensor_info(
+            sensor_timestamp,
+            (triangular(-1.5, 2.5, 0),  # linear acceleration
+             triangular(-1.2, 1.4, 0),
+             triangular(-1.4, .9, 0)) + magnetic_field,
+            magnetic_field_accuracy,
+            (triangular(-1.56, 1.57, 0.475),  # attitude pitch, yaw, roll
+             triangular(-1.56, 3.14, .1),
+             triangular(-3.14, 3.14, 0),
+             triangular(-3.2, 3.52, 0),  # rotation rate
+             triangular(-3.1, 4.88, 0),
+             triangular(-6, 3.7, 0),
+             triangular(-1, 1, 0.01),  # gravity
+             triangular(-1, 1, -.4),
+             triangular(-1, 1, -.4)))
+
+        signature_proto = template.encode_signature(
+            timestamp_since_start, location_fix, sensor_info,
+            hash_engine.get_location_auth_hash(),
+            hash_engine.get_location_hash(), sig.timestamp,
+            [ctypes.c_uint64(req_hash).value
+             for req_hash in hash_engine.get_request_hashes()])
 
         if self._needsPtr8(subrequests):
-            plat_eight = UnknownPtr8Request()
-            plat_eight.message = '15c79df0558009a4242518d2ab65de2a59e09499'
             plat8 = request.platform_requests.add()
             plat8.type = 8
-            plat8.request_message = plat_eight.SerializeToString()
+            plat8.request_message = template.ptr8_request
 
-        sig_request = SendEncryptedSignatureRequest()
-        sig_request.encrypted_signature = pycrypt(signature_proto,
-                                                  sig.timestamp_since_start)
         plat = request.platform_requests.add()
         plat.type = 6
-        plat.request_message = sig_request.SerializeToString()
+        # SendEncryptedSignatureRequest, its only field is the signature
+        plat.request_message = encode_bytes_field(
+            1, pycrypt(signature_proto, timestamp_since_start))
 
-        request.ms_since_last_locationfix = sig.timestamp_since_start - loc.timestamp_snapshot
+        request.ms_since_last_locationfix = timestamp_since_start - location_timestamp
 
-        self.log.debug('Generated protobuf request: \n\r%s', request)
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug('Generated protobuf request: \n\r%s', request)
 
         return request
 
@@ -373,11 +388,8 @@ class RpcApi:
 
         for entry_id, params in subrequest_list:
             if params:
-                entry_name = RequestType.Name(entry_id)
-                proto_name = entry_name.lower() + '_message'
                 bytes = self._get_proto_bytes(
-                    'pogoprotos.networking.requests.messages.', proto_name,
-                    params)
+                    get_request_class(entry_id), params)
 
                 subrequest = mainrequest.requests.add()
                 subrequest.request_type = entry_id
@@ -394,13 +406,8 @@ class RpcApi:
 
         for entry_id, params in platform_list:
             if params:
-                entry_name = PlatformRequestType.Name(entry_id)
-                if entry_name == 'UNKNOWN_PTR_8':
-                    entry_name = 'UNKNOWN_PTR8'
-                proto_name = entry_name.lower() + '_request'
                 bytes = self._get_proto_bytes(
-                    'pogoprotos.networking.platform.requests.', proto_name,
-                    params)
+                    get_platform_request_class(entry_id), params)
 
                 platform = mainrequest.platform_requests.add()
                 platform.type = entry_id
@@ -412,49 +419,14 @@ class RpcApi:
 
         return mainrequest
 
-    def _get_proto_bytes(self, path, name, entry_content):
-        proto_classname = path + name + '_pb2.' + name
-        proto = self.get_class(proto_classname)()
-
-        self.log.debug("Subrequest class: %s", proto_classname)
-
-        for key, value in entry_content.items():
-            if isinstance(value, list):
-                self.log.debug("Found list: %s - trying as repeated", key)
-                for i in value:
-                    try:
-                        self.log.debug("%s -> %s", key, i)
-                        r = getattr(proto, key)
-                        r.append(i)
-                    except Exception as e:
-                        self.log.warning(
-                            'Argument %s with value %s unknown inside %s (Exception: %s)',
-                            key, i, proto_classname, e)
-            elif isinstance(value, dict):
-                for k in value.keys():
-                    try:
-                        r = getattr(proto, key)
-                        setattr(r, k, value[k])
-                    except Exception as e:
-                        self.log.warning(
-                            'Argument %s with value %s unknown inside %s (Exception: %s)',
-                            key, str(value), proto_classname, e)
-            else:
-                try:
-                    setattr(proto, key, value)
-                except Exception as e:
-                    try:
-                        self.log.debug("%s -> %s", key, value)
-                        r = getattr(proto, key)
-                        r.append(value)
-                    except Exception as e:
-                        self.log.warning(
-                            'Argument %s with value %s unknown inside %s (Exception: %s)',
-                            key, value, proto_classname, e)
-
-        return proto.SerializeToString()
-
-    def _parse_main_response(self, response_raw, subrequests, use_dict=True):
+    def _get_proto_bytes(self, proto_class, entry_content):
+        return encode_message(proto_class, entry_content)
+
+    def _parse_main_response(self,
+                             response_raw,
+                             subrequests,
+                             use_dict=True,
+                             lazy=False):
         self.log.debug('Parsing main RPC response...')
 
         if response_raw.status_code == 400:
@@ -470,35 +442,51 @@ class RpcApi:
             error = 'Unexpected HTTP server response - needs 200 got {}'.format(
                 response_raw.status_code)
             self.log.warning(error)
-            self.log.debug('HTTP output: \n%s',
-                           response_raw.content.decode('utf-8'))
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug('HTTP output: \n%s',
+                               response_raw.content.decode('utf-8', 'replace'))
             raise UnexpectedResponseException(error)
 
         if not response_raw.content:
             self.log.warning('Empty server response!')
             raise MalformedNianticResponseException('Empty server response!')
 
+        from pogoprotos.networking.envelopes.response_envelope_pb2 import ResponseEnvelope
+
+        # Unless the caller wants the envelope itself, the sub-responses are
+        # cut out of the body and parsed from memoryview slices of it later,
+        # instead of being copied into envelope.returns first.
+        returns = None
         response_proto = ResponseEnvelope()
         try:
-            response_proto.ParseFromString(response_raw.content)
-        except message.DecodeError as e:
+            if use_dict or lazy:
+                envelope_raw, returns = split_field(
+                    response_raw.content,
+                    ResponseEnvelope.RETURNS_FIELD_NUMBER)
+                response_proto.ParseFromString(envelope_raw)
+            else:
+                response_proto.ParseFromString(response_raw.content)
+        except (message.DecodeError, WireDecodeError, TypeError) as e:
             self.log.error('Could not parse response: %s', e)
             raise MalformedNianticResponseException(
                 'Could not decode response.')
 
-        self.log.debug('Protobuf structure of rpc response:\n\r%s',
-                       response_proto)
-        try:
-            self.log.debug(
-                'Decode raw over protoc (protoc has to be in your PATH):\n\r%s',
-                self.decode_raw(response_raw.content).decode('utf-8'))
-        except Exception:
-            self.log.debug('Error during protoc parsing - ignored.')
+        # decoding the raw response is expensive, only do it for debug output
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug('Protobuf structure of rpc response:\n\r%s',
+                           response_proto)
+            self.log.debug('Decode raw:\n\r%s',
+                           self.decode_raw(response_raw.content))
+
+        if lazy:
+            if response_proto.status_code == 53:
+                exception = ServerApiEndpointRedirectException()
+                exception.set_redirected_endpoint(response_proto.api_url)
+                raise exception
+            return LazyResponse(response_proto, subrequests, returns)
 
         if use_dict:
-            response_proto_dict = protobuf_to_dict(response_proto)
-            if 'returns' in response_proto_dict:
-                del response_proto_dict['returns']
+            response_proto_dict = message_to_dict(response_proto)
         else:
             response_proto_dict = {'envelope': response_proto}
 
@@ -507,7 +495,8 @@ class RpcApi:
                 'Could not convert protobuf to dict.')
 
         response_proto_dict = self._parse_sub_responses(
-            response_proto, subrequests, response_proto_dict, use_dict)
+            response_proto, subrequests, response_proto_dict, use_dict,
+            returns)
 
         # It can't be done before.
         if not use_dict:
@@ -519,7 +508,8 @@ class RpcApi:
                              response_proto,
                              subrequests_list,
                              response_proto_dict,
-                             use_dict=True):
+                             use_dict=True,
+                             returns=None):
         self.log.debug('Parsing sub RPC responses...')
         response_proto_dict['responses'] = {}
 
@@ -528,22 +518,22 @@ class RpcApi:
             exception.set_redirected_endpoint(response_proto.api_url)
             raise exception
 
+        if returns is None:
+            returns = response_proto.returns
+
         i = 0
-        for subresponse in response_proto.returns:
+        for subresponse in returns:
             entry_id, _ = subrequests_list[i]
             entry_name = RequestType.Name(entry_id)
-            proto_name = entry_name.lower() + '_response'
-            proto_classname = 'pogoprotos.networking.responses.' + proto_name + '_pb2.' + proto_name
-
-            self.log.debug("Parsing class: %s", proto_classname)
 
             subresponse_return = None
             try:
-                subresponse_extension = self.get_class(proto_classname)()
-            except Exception:
+                subresponse_extension = get_response_class(entry_id)()
+                proto_classname = subresponse_extension.DESCRIPTOR.full_name
+                self.log.debug("Parsing class: %s", proto_classname)
+            except ProtoNotFoundException as e:
                 subresponse_extension = None
-                error = 'Protobuf definition for {} not found'.format(
-                    proto_classname)
+                error = str(e)
                 subresponse_return = error
                 self.log.warning(error)
 
@@ -552,7 +542,7 @@ class RpcApi:
                     subresponse_extension.ParseFromString(subresponse)
                     if use_dict:
 
-                        subresponse_return = protobuf_to_dict(
+                        subresponse_return = message_to_dict(
                             subresponse_extension)
                     else:
                         subresponse_return = subresponse_extension
@@ -579,6 +569,19 @@ class RpcState:
         self.mag_z_min = random.uniform(-70, 40)
         self.mag_z_max = self.mag_y_min + 15
         self._course = random.uniform(0, 359.99)
+        self._signature_template = None
+
+    def get_signature_template(self, device_info=None):
+        """
+        The pre-serialized parts of the Signature, rebuilt when the session
+        hash or the device info changed.
+        """
+        template = self._signature_template
+        if template is None or not template.matches(self.session_hash,
+                                                    device_info):
+            template = SignatureTemplate(self.session_hash, device_info)
+            self._signature_template = template
+        return template
 
     @property
     def magnetic_field_x(self):
@@ -0,0 +1,295 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import math
+import heapq
+
+from s2sphere import CellId, LatLng
+
+from pgoapi.covering import LEVEL
+from pgoapi.utilities import CELL_ID_PRECISION, EARTH_RADIUS, get_cell_ids_batch
+
+"""
+Scan position planning for GET_MAP_OBJECTS: which positions to request,
+and in which order, to see every level 15 cell of an area.
+
+    positions = plan_scan(Circle(40.7589, -73.9851, 2000), radius=500)
+
+Candidate positions are laid out on a dense hex grid. From their coverings
+(get_cell_ids) the positions are picked greedily, each one covering the
+most cells not seen yet, until every cell of the area is covered. Positions
+made redundant by later picks are dropped again. The result is ordered
+for travel by nearest neighbour plus a windowed 2-opt pass.
+
+Distances use an equirectangular projection around the area, good enough
+for areas of city size.
+"""
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+class Projection(object):
+    """
+    Local planar coordinates in meters around (lat, lng).
+    """
+
+    def __init__(self, lat, lng):
+        self.lat = lat
+        self.lng = lng
+        self.scale = math.cos(math.radians(lat))
+
+    def to_xy(self, lat, lng):
+        return ((lng - self.lng) * METERS_PER_DEGREE * self.scale,
+                (lat - self.lat) * METERS_PER_DEGREE)
+
+    def to_lat_lng(self, x, y):
+        return (self.lat + y / METERS_PER_DEGREE,
+                self.lng + x / (METERS_PER_DEGREE * self.scale))
+
+
+class Circle(object):
+    def __init__(self, lat, lng, radius):
+        self.lat = lat
+        self.lng = lng
+        self.radius = radius
+        self.projection = Projection(lat, lng)
+
+    def get_bounds(self):
+        # (x_min, y_min, x_max, y_max) in the area's projection
+        return (-self.radius, -self.radius, self.radius, self.radius)
+
+    def get_points(self):
+        return [(self.lat, self.lng)]
+
+    def contains(self, lat, lng):
+        x, y = self.projection.to_xy(lat, lng)
+        return x * x + y * y <= self.radius * self.radius
+
+    def is_near(self, lat, lng, distance):
+        x, y = self.projection.to_xy(lat, lng)
+        return math.hypot(x, y) <= self.radius + distance
+
+
+class Polygon(object):
+    """
+    A simple polygon given by its (lat, lng) vertices, in either
+    orientation.
+    """
+
+    def __init__(self, points):
+        if len(points) < 3:
+            raise ValueError('A polygon needs at least 3 points')
+        self.points = list(points)
+        self.projection = Projection(
+            sum(lat for lat, _ in self.points) / len(self.points),
+            sum(lng for _, lng in self.points) / len(self.points))
+        self.vertices = [self.projection.to_xy(lat, lng)
+                         for lat, lng in self.points]
+
+    def get_points(self):
+        return list(self.points)
+
+    def get_bounds(self):
+        xs = [x for x, _ in self.vertices]
+        ys = [y for _, y in self.vertices]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def contains(self, lat, lng):
+        # even-odd rule
+        x, y = self.projection.to_xy(lat, lng)
+        inside = False
+        x1, y1 = self.vertices[-1]
+        for x2, y2 in self.vertices:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+            x1, y1 = x2, y2
+        return inside
+
+    def is_near(self, lat, lng, distance):
+        # within `distance` of the bounds
+        x, y = self.projection.to_xy(lat, lng)
+        x_min, y_min, x_max, y_max = self.get_bounds()
+        return (x_min - distance <= x <= x_max + distance and
+                y_min - distance <= y <= y_max + distance)
+
+
+def hex_grid(area, spacing, margin=0):
+    """
+    Points `spacing` meters apart on a hex grid over the bounds of `area`,
+    grown by `margin` meters.
+    """
+    x_min, y_min, x_max, y_max = area.get_bounds()
+    x_min, y_min = x_min - margin, y_min - margin
+    x_max, y_max = x_max + margin, y_max + margin
+
+    row_height = spacing * math.sqrt(3) / 2
+    points = []
+    row = 0
+    y = y_min
+    while y <= y_max + row_height:
+        x = x_min - (spacing / 2 if row % 2 else 0)
+        while x <= x_max + spacing:
+            lat, lng = area.projection.to_lat_lng(x, y)
+            points.append((round(lat, CELL_ID_PRECISION),
+                           round(lng, CELL_ID_PRECISION)))
+            x += spacing
+        y += row_height
+        row += 1
+    return points
+
+
+def get_cells_in(area, cell_ids):
+    """
+    The cells of `cell_ids` belonging to the area: those whose center is
+    inside, and those containing the area's center or vertices, so areas
+    smaller than a cell still have one.
+    """
+    cell_ids = set(cell_ids)
+    cells = set()
+    for lat, lng in area.get_points():
+        cell_id = CellId.from_lat_lng(LatLng.from_degrees(lat, lng)).parent(
+            LEVEL).id()
+        if cell_id in cell_ids:
+            cells.add(cell_id)
+    for cell_id in cell_ids:
+        lat_lng = CellId(cell_id).to_lat_lng()
+        if area.contains(lat_lng.lat().degrees, lat_lng.lng().degrees):
+            cells.add(cell_id)
+    return cells
+
+
+def select_positions(candidates, coverings, targets):
+    """
+    Greedy set cover: indices of the candidates whose coverings together
+    contain all `targets`, picking the candidate with the most uncovered
+    targets first (ties go to the one with the smaller covering).
+    """
+    cover = [targets.intersection(cells) for cells in coverings]
+    heap = [(-len(cells), len(coverings[index]), index)
+            for index, cells in enumerate(cover) if cells]
+    heapq.heapify(heap)
+
+    uncovered = set(targets)
+    selected = []
+    while uncovered and heap:
+        gain, size, index = heapq.heappop(heap)
+        # gains only shrink, a candidate whose gain is still current is best
+        current = len(cover[index] & uncovered)
+        if current == -gain:
+            selected.append(index)
+            uncovered -= cover[index]
+        elif current:
+            heapq.heappush(heap, (-current, size, index))
+
+    # later picks can cover all the cells of earlier ones
+    counts = {}
+    for index in selected:
+        for cell in cover[index]:
+            counts[cell] = counts.get(cell, 0) + 1
+    result = []
+    for index in reversed(selected):
+        if all(counts[cell] > 1 for cell in cover[index]):
+            for cell in cover[index]:
+                counts[cell] -= 1
+        else:
+            result.append(index)
+    result.reverse()
+    return result
+
+
+def order_positions(positions, start=None, window=25):
+    """
+    Orders (lat, lng) positions for a short path from `start` (default the
+    first position): nearest neighbour, then 2-opt moves between positions
+    at most `window` steps apart on the path.
+    """
+    if len(positions) < 2:
+        return list(positions)
+
+    projection = Projection(*(start or positions[0]))
+    points = [projection.to_xy(lat, lng) for lat, lng in positions]
+
+    def distance(a, b):
+        return math.hypot(points[a][0] - points[b][0],
+                          points[a][1] - points[b][1])
+
+    x, y = projection.to_xy(*(start or positions[0]))
+    remaining = set(range(len(points)))
+    current = min(remaining, key=lambda i: math.hypot(points[i][0] - x,
+                                                      points[i][1] - y))
+    path = [current]
+    remaining.remove(current)
+    while remaining:
+        current = min(remaining, key=lambda i: distance(current, i))
+        path.append(current)
+        remaining.remove(current)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(path) - 2):
+            for j in range(i + 2, min(len(path), i + window)):
+                a, b, c = path[i], path[i + 1], path[j]
+                before = distance(a, b)
+                after = distance(a, c)
+                if j + 1 < len(path):
+                    d = path[j + 1]
+                    before += distance(c, d)
+                    after += distance(b, d)
+                if after < before - 1e-6:
+                    path[i + 1:j + 1] = reversed(path[i + 1:j + 1])
+                    improved = True
+
+    return [positions[i] for i in path]
+
+
+def get_path_length(positions):
+    if not positions:
+        return 0
+    projection = Projection(*positions[0])
+    points = [projection.to_xy(lat, lng) for lat, lng in positions]
+    return sum(math.hypot(x2 - x1, y2 - y1)
+               for (x1, y1), (x2, y2) in zip(points, points[1:]))
+
+
+def plan_scan(area, radius=500, spacing=None, start=None):
+    """
+    Scan positions (lat, lng) whose get_cell_ids(lat, lng, radius) coverings
+    together contain every level 15 cell of `area` (a Circle or Polygon),
+    in travel order from `start`. Candidates are `spacing` meters apart,
+    by default radius / 2. Denser candidates can save a few positions but
+    cost a covering each.
+    """
+    spacing = spacing or radius / 2.0
+    candidates = [point for point in hex_grid(area, spacing, margin=radius)
+                  if area.is_near(point[0], point[1], radius)]
+    coverings = [set(cells) for cells in get_cell_ids_batch(candidates, radius)]
+
+    targets = get_cells_in(area, set().union(*coverings))
+    selected = select_positions(candidates, coverings, targets)
+    return order_positions([candidates[index] for index in selected], start)
+
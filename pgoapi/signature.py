@@ -0,0 +1,164 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+
+from __future__ import absolute_import
+
+from struct import Struct
+
+from pgoapi.wire import WIRETYPE_FIXED32, WIRETYPE_FIXED64, WIRETYPE_LENGTH_DELIMITED, WIRETYPE_VARINT, encode_bytes_field, encode_key, encode_varint, encode_varint_field
+
+"""
+Serialization of the Signature sent with every request. Most of it is the
+same for all requests of a session (device info, session hash, constants),
+a SignatureTemplate serializes those parts once and writes only the per
+request fields, with the same bytes the Signature message would produce.
+Proto3 leaves out fields at their default value, so do the encoders here.
+"""
+
+_double = Struct('<d').pack
+_float = Struct('<f').pack
+
+_SENSOR_TIMESTAMP = encode_key(1, WIRETYPE_VARINT)
+# linear_acceleration_x/y/z, magnetic_field_x/y/z
+_SENSOR_KEYS_1 = [encode_key(n, WIRETYPE_FIXED64) for n in range(3, 9)]
+_SENSOR_ACCURACY = encode_key(9, WIRETYPE_VARINT)
+# attitude_pitch/yaw/roll, rotation_rate_x/y/z, gravity_x/y/z
+_SENSOR_KEYS_2 = [encode_key(n, WIRETYPE_FIXED64) for n in range(10, 19)]
+
+_LOCATION_TIMESTAMP = encode_key(2, WIRETYPE_VARINT)
+# altitude, latitude, longitude, speed, course, horizontal_accuracy,
+# vertical_accuracy
+_LOCATION_KEYS = [encode_key(n, WIRETYPE_FIXED32)
+                  for n in (4, 13, 14, 18, 20, 21, 22)]
+
+_SIG_TIMESTAMP_SINCE_START = encode_key(2, WIRETYPE_VARINT)
+_SIG_LOCATION_FIX = 4
+_SIG_SENSOR_INFO = 7
+_SIG_LOCATION_HASH1 = encode_key(10, WIRETYPE_VARINT)
+_SIG_LOCATION_HASH2 = encode_key(20, WIRETYPE_VARINT)
+_SIG_TIMESTAMP = encode_key(23, WIRETYPE_VARINT)
+_SIG_REQUEST_HASH = encode_key(24, WIRETYPE_LENGTH_DELIMITED)
+
+UNKNOWN25 = 4500779412463383546
+PTR8_MESSAGE = '15c79df0558009a4242518d2ab65de2a59e09499'
+
+
+class SignatureTemplate(object):
+    def __init__(self, session_hash, device_info=None):
+        from pogoprotos.networking.envelopes.signature_pb2 import Signature
+        from pgoapi.proto_registry import get_platform_request_class
+
+        self.session_hash = session_hash
+        self.device_info = dict(device_info) if device_info else None
+
+        # device_info (8) and activity_status (9)
+        sig = Signature()
+        if device_info:
+            for key in device_info:
+                setattr(sig.device_info, key, device_info[key])
+            if device_info['device_brand'] == 'Apple':
+                sig.activity_status.stationary = True
+        else:
+            sig.activity_status.stationary = True
+        self._device = sig.SerializeToString()
+
+        self._session_hash = encode_bytes_field(22, session_hash) if session_hash else b''
+        self._unknown25 = encode_varint_field(25, UNKNOWN25)
+
+        # provider (1), and provider_status (26) and location_type (28)
+        self._location_head = encode_bytes_field(1, b'fused')
+        self._location_tail = encode_varint_field(26, 3) + encode_varint_field(28, 1)
+        # status (19)
+        self._sensor_tail = encode_varint_field(19, 3)
+
+        ptr8 = get_platform_request_class(8)()
+        ptr8.message = PTR8_MESSAGE
+        self.ptr8_request = ptr8.SerializeToString()
+
+    def matches(self, session_hash, device_info):
+        return (session_hash == self.session_hash and
+                (dict(device_info) if device_info else None) == self.device_info)
+
+    def encode_location_fix(self, timestamp_snapshot, values):
+        """
+        values: altitude, latitude, longitude, speed, course,
+        horizontal_accuracy and vertical_accuracy
+        """
+        parts = [self._location_head]
+        if timestamp_snapshot:
+            parts.append(_LOCATION_TIMESTAMP + encode_varint(timestamp_snapshot))
+        for key, value in zip(_LOCATION_KEYS, values):
+            if value:
+                parts.append(key + _float(value))
+        parts.append(self._location_tail)
+        return b''.join(parts)
+
+    def encode_sensor_info(self, timestamp_snapshot, values_1,
+                           magnetic_field_accuracy, values_2):
+        """
+        values_1: linear_acceleration_x/y/z and magnetic_field_x/y/z
+        values_2: attitude_pitch/yaw/roll, rotation_rate_x/y/z and
+        gravity_x/y/z
+        """
+        parts = []
+        if timestamp_snapshot:
+            parts.append(_SENSOR_TIMESTAMP + encode_varint(timestamp_snapshot))
+        for key, value in zip(_SENSOR_KEYS_1, values_1):
+            if value:
+                parts.append(key + _double(value))
+        if magnetic_field_accuracy:
+            parts.append(_SENSOR_ACCURACY + encode_varint(magnetic_field_accuracy))
+        for key, value in zip(_SENSOR_KEYS_2, values_2):
+            if value:
+                parts.append(key + _double(value))
+        parts.append(self._sensor_tail)
+        return b''.join(parts)
+
+    def encode_signature(self, timestamp_since_start, location_fix,
+                         sensor_info, location_hash1, location_hash2,
+                         timestamp, request_hashes):
+        """
+        request_hashes are expected as unsigned 64 bit values.
+        """
+        parts = []
+        if timestamp_since_start:
+            parts.append(_SIG_TIMESTAMP_SINCE_START +
+                         encode_varint(timestamp_since_start))
+        parts.append(encode_bytes_field(_SIG_LOCATION_FIX, location_fix))
+        parts.append(encode_bytes_field(_SIG_SENSOR_INFO, sensor_info))
+        parts.append(self._device)
+        if location_hash1:
+            parts.append(_SIG_LOCATION_HASH1 + encode_varint(location_hash1))
+        if location_hash2:
+            parts.append(_SIG_LOCATION_HASH2 + encode_varint(location_hash2))
+        parts.append(self._session_hash)
+        if timestamp:
+            parts.append(_SIG_TIMESTAMP + encode_varint(timestamp))
+        if request_hashes:
+            packed = b''.join(encode_varint(h) for h in request_hashes)
+            parts.append(_SIG_REQUEST_HASH + encode_varint(len(packed)) + packed)
+        parts.append(self._unknown25)
+        return b''.join(parts)
@@ -0,0 +1,182 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import heapq
+import random
+import logging
+import weakref
+import threading
+
+from itertools import count
+
+
+class TokenRefresher(object):
+    """
+    Renews the access tokens of registered Auth providers in background
+    threads, lead_time seconds (minus up to `jitter` random seconds, so
+    accounts logged in together don't refresh together) before they expire.
+    Requests then never have to wait for a PTC or Google login.
+
+    Providers whose token expiry is not known yet are checked again every
+    retry_delay seconds, as are failed refreshes. Providers are only held by
+    weak reference, so the provider of an abandoned session is dropped once
+    it is collected. add() after stop() starts the workers again.
+    """
+
+    def __init__(self, lead_time=300, jitter=120, retry_delay=60, workers=2):
+        self.log = logging.getLogger(__name__)
+
+        self.lead_time = lead_time
+        self.jitter = jitter
+        self.retry_delay = retry_delay
+        self.workers = workers
+
+        # (due, heap sequence, weakref to the auth)
+        self._heap = []
+        # auth -> (expiry the refresh was scheduled for, heap sequence)
+        self._scheduled = weakref.WeakKeyDictionary()
+        self._counter = count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+        self.refreshes = 0
+        self.failures = 0
+
+    def add(self, auth):
+        with self._cond:
+            self._stopped = False
+            self._schedule(auth, time.time())
+            self._start()
+
+    def remove(self, auth):
+        with self._cond:
+            self._scheduled.pop(auth, None)
+
+    def __contains__(self, auth):
+        return auth in self._scheduled
+
+    def _schedule(self, auth, now, due=None, min_delay=0):
+        expiry = auth.get_access_token_expiry()
+        if due is None:
+            if expiry:
+                due = expiry - self.lead_time - random.uniform(0, self.jitter)
+            else:
+                due = now + self.retry_delay
+        due = max(due, now + min_delay)
+
+        seq = next(self._counter)
+        self._scheduled[auth] = (expiry, seq)
+        heapq.heappush(self._heap, (due, seq, weakref.ref(auth)))
+        self._cond.notify()
+
+    def _start(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run,
+                                      name='pgoapi-token-refresher')
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    _, seq, ref = heapq.heappop(self._heap)
+                    auth = ref()
+                    if auth is None:
+                        continue  # collected
+                    scheduled = self._scheduled.get(auth)
+                    if scheduled is None or scheduled[1] != seq:
+                        continue  # removed or rescheduled since
+
+                    expiry = auth.get_access_token_expiry()
+                    if not expiry or scheduled[0] != expiry:
+                        # not logged in yet or renewed on the request path
+                        # in the meantime
+                        self._schedule(auth, now)
+                        continue
+                    return auth
+
+                auth = None  # not kept alive while waiting
+                self._cond.wait(self._heap[0][0] - now if self._heap else None)
+
+    def _run(self):
+        while True:
+            auth = self._next()
+            if auth is None:
+                return
+            self._refresh(auth)
+            # don't keep it alive while waiting for the next one
+            del auth
+
+    def _refresh(self, auth):
+        if not auth.is_login():
+            # login failed elsewhere, nothing to keep alive
+            self.remove(auth)
+            return
+
+        try:
+            auth.refresh_access_token()
+        except Exception as e:
+            self.log.warning('Refreshing the access token failed: %r', e)
+            with self._cond:
+                self.failures += 1
+                if auth in self._scheduled:
+                    self._schedule(auth, time.time(),
+                                   min_delay=self.retry_delay)
+            return
+
+        self.log.debug('Refreshed access token, valid until %s',
+                       auth.get_access_token_expiry())
+        with self._cond:
+            self.refreshes += 1
+            if auth in self._scheduled:
+                # tokens living shorter than lead_time would otherwise
+                # be refreshed in a tight loop
+                self._schedule(auth, time.time(),
+                               min_delay=self.retry_delay)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
+_default_refresher = None
+_default_lock = threading.Lock()
+
+
+def get_token_refresher():
+    global _default_refresher
+    with _default_lock:
+        if _default_refresher is None:
+            _default_refresher = TokenRefresher()
+        return _default_refresher
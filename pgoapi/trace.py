@@ -0,0 +1,114 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+from google.protobuf import text_format
+
+from pgoapi.wire import WireDecodeError, decode_raw
+
+from pogoprotos.networking.requests.request_type_pb2 import RequestType
+
+
+class LazyText(object):
+    """
+    Defers building a (potentially huge) text rendering until str() is
+    called on it, e.g. by a logging handler that actually emits the record.
+    """
+
+    def __init__(self, func, *args):
+        self._func = func
+        self._args = args
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = self._func(*self._args)
+        return self._text
+
+    __repr__ = __str__
+
+
+def lazy_proto(message):
+    return LazyText(text_format.MessageToString, message)
+
+
+def _render_response(content):
+    from pogoprotos.networking.envelopes.response_envelope_pb2 import ResponseEnvelope
+
+    envelope = ResponseEnvelope()
+    try:
+        envelope.ParseFromString(content)
+    except Exception as e:
+        return 'Could not parse response: {}'.format(e)
+    return text_format.MessageToString(envelope)
+
+
+def _render_raw(content):
+    try:
+        return decode_raw(content)
+    except WireDecodeError as e:
+        return 'Could not decode raw protobuf: {}'.format(e)
+
+
+class WireTrace(object):
+    """
+    Per session trace of every RPC round-trip. Each exchange is turned into a
+    dict record and handed to `handler` (by default logged to the
+    'pgoapi.wire' logger). The proto renderings in the record are LazyText
+    objects, nothing is rendered unless the record is actually formatted.
+    """
+
+    def __init__(self, handler=None, include_raw=False):
+        self.log = logging.getLogger('pgoapi.wire')
+        self.handler = handler or self.log_record
+        self.include_raw = include_raw
+
+    def log_record(self, record):
+        self.log.info('RPC %(request_id)s %(request_types)s -> HTTP %(status_code)s, '
+                      '%(request_size)s/%(response_size)s bytes in %(elapsed_ms).1f ms\n'
+                      'Request:\n%(request)s\nResponse:\n%(response)s', record)
+
+    def trace(self, endpoint, request_proto, request_size, http_response,
+              elapsed):
+        content = http_response.content
+        record = {
+            'endpoint': endpoint,
+            'request_id': request_proto.request_id,
+            'request_types': [RequestType.Name(r.request_type)
+                              for r in request_proto.requests],
+            'request_size': request_size,
+            'status_code': http_response.status_code,
+            'response_size': len(content) if content else 0,
+            'elapsed_ms': elapsed * 1000,
+            'request': lazy_proto(request_proto),
+            'response': LazyText(_render_response, content)
+        }
+        if self.include_raw:
+            record['response_raw'] = LazyText(_render_raw, content)
+
+        self.handler(record)
@@ -0,0 +1,144 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import socket
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+
+class SharedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter which is mounted into many sessions at once. urllib3 keeps
+    one connection pool per (proxy, scheme, host, port) in it, so every
+    session going through the same proxy to the same host reuses the same
+    keep-alive connections.
+    """
+
+    def __init__(self, socket_options=None, **kwargs):
+        self._socket_options = socket_options
+        self._proxy_lock = threading.Lock()
+        HTTPAdapter.__init__(self, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self._socket_options is not None:
+            kwargs['socket_options'] = self._socket_options
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if self._socket_options is not None:
+            proxy_kwargs['socket_options'] = self._socket_options
+        # the proxy manager cache is a plain dict, don't let two sessions
+        # create a manager for the same proxy at the same time
+        with self._proxy_lock:
+            return HTTPAdapter.proxy_manager_for(self, proxy, **proxy_kwargs)
+
+    def close(self):
+        # called by Session.close(), the pools belong to the TransportManager
+        pass
+
+    def close_pools(self):
+        HTTPAdapter.close(self)
+
+
+class TransportManager(object):
+    """
+    Owns the connection pools used by PGoApi, AuthPtc and HashServer
+    sessions. Sessions stay per account (cookies, headers, proxy setting),
+    only the pooled connections are shared, so the number of TLS handshakes
+    and open sockets grows with the number of proxies and hosts instead of
+    the number of accounts.
+
+    pool_connections: host pools kept per proxy
+    pool_maxsize: connections kept per host pool
+    pool_block: with True pool_maxsize is a hard per host limit, requests
+        wait for a free connection instead of opening another one
+    tcp_keepalive: enable TCP keep-alive on the pooled sockets so idle
+        connections survive NAT and proxy timeouts
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=150, pool_block=True,
+                 max_retries=0, tcp_keepalive=True):
+        socket_options = None
+        if tcp_keepalive:
+            socket_options = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+
+        self._adapter = SharedHTTPAdapter(
+            socket_options=socket_options,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries)
+
+    def get_adapter(self):
+        return self._adapter
+
+    def mount(self, session):
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        return session
+
+    def get_stats(self):
+        """
+        Number of connection pools (one per host) without and per proxy.
+        """
+        adapter = self._adapter
+        with adapter._proxy_lock:
+            proxy_managers = dict(adapter.proxy_manager)
+        return {
+            'direct': len(adapter.poolmanager.pools),
+            'proxies': dict((proxy, len(manager.pools))
+                            for proxy, manager in proxy_managers.items())
+        }
+
+    def close(self):
+        self._adapter.close_pools()
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_transport():
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = TransportManager()
+        return _default_transport
+
+
+def set_transport(transport):
+    """
+    Replaces the process wide default TransportManager, sessions created
+    afterwards use the new one.
+    """
+    global _default_transport
+    with _default_lock:
+        _default_transport = transport
@@ -19,22 +19,30 @@ OR OTHER DEALINGS IN THE SOFTWARE.
 Author: tjado <https://github.com/tejado>
 """
 
+from __future__ import absolute_import
+
 import time
 import struct
 import random
 import logging
+import threading
 
 from json import JSONEncoder
 from binascii import unhexlify
+from collections import OrderedDict
 
-# other stuff
-from geopy.geocoders import GoogleV3
-from s2sphere import LatLng, Angle, Cap, RegionCoverer, math
+from pgoapi import covering
 
 log = logging.getLogger(__name__)
 
 EARTH_RADIUS = 6371000  # radius of Earth in meters
 
+CELL_ID_PRECISION = 6
+CELL_ID_CACHE_SIZE = 4096
+
+_cell_id_cache = OrderedDict()
+_cell_id_lock = threading.Lock()
+
 
 def f2i(float):
     return struct.unpack('<Q', struct.pack('<d', float))[0]
@@ -66,6 +74,9 @@ class JSONByteEncoder(JSONEncoder):
 
 
 def get_pos_by_name(location_name):
+    # geopy is slow to import and only needed here
+    from geopy.geocoders import GoogleV3
+
     geolocator = GoogleV3()
     loc = geolocator.geocode(location_name, timeout=10)
     if not loc:
@@ -79,19 +90,52 @@ def get_pos_by_name(location_name):
 
 
 def get_cell_ids(lat, long, radius=500):
+    return get_cell_ids_batch([(lat, long)], radius)[0]
+
+
+def get_cell_ids_batch(points, radius=500):
+    """
+    Level 15 cell ids around every (lat, long) point, at most 100 per point.
+    Coordinates are rounded to CELL_ID_PRECISION decimals (about 0.1m) and
+    the coverings of the last CELL_ID_CACHE_SIZE points are cached. Points
+    not in the cache are covered together, vectorized with NumPy if it is
+    installed (see pgoapi.covering).
+    """
     # Max values allowed by server according to this comment:
     # https://github.com/AeonLucid/POGOProtos/issues/83#issuecomment-235612285
-    if radius > 1500:
-        radius = 1500  # radius = 1500 is max allowed by the server
-    region = Cap.from_axis_angle(
-        LatLng.from_degrees(lat, long).to_point(),
-        Angle.from_degrees(360 * radius / (2 * math.pi * EARTH_RADIUS)))
-    coverer = RegionCoverer()
-    coverer.min_level = 15
-    coverer.max_level = 15
-    cells = coverer.get_covering(region)
-    cells = cells[:100]  # len(cells) = 100 is max allowed by the server
-    return sorted([x.id() for x in cells])
+    radius = min(radius, covering.MAX_RADIUS)
+    keys = [(round(lat, CELL_ID_PRECISION), round(long, CELL_ID_PRECISION),
+             radius) for lat, long in points]
+
+    results = []
+    missing = OrderedDict()
+    with _cell_id_lock:
+        for key in keys:
+            cells = _cell_id_cache.pop(key, None)
+            if cells is not None:
+                _cell_id_cache[key] = cells
+            else:
+                missing[key] = None
+            results.append(cells)
+
+    if missing:
+        coverings = covering.get_coverings([key[:2] for key in missing],
+                                           radius)
+        with _cell_id_lock:
+            for key, cells in zip(missing, coverings):
+                missing[key] = cells
+                _cell_id_cache[key] = cells
+            while len(_cell_id_cache) > CELL_ID_CACHE_SIZE:
+                _cell_id_cache.popitem(last=False)
+        results = [missing[key] if cells is None else cells
+                   for key, cells in zip(keys, results)]
+
+    return [list(cells) for cells in results]
+
+
+def clear_cell_id_cache():
+    with _cell_id_lock:
+        _cell_id_cache.clear()
 
 
 def get_time(ms=False):
@@ -0,0 +1,273 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import struct
+
+"""
+Schema-less protobuf wire format helpers. decode_raw() renders a buffer the
+same way `protoc --decode_raw` does, without needing protoc on the PATH.
+The encode_* functions write single fields, for messages which are put
+together from pre-serialized parts.
+"""
+
+WIRETYPE_VARINT = 0
+WIRETYPE_FIXED64 = 1
+WIRETYPE_LENGTH_DELIMITED = 2
+WIRETYPE_START_GROUP = 3
+WIRETYPE_END_GROUP = 4
+WIRETYPE_FIXED32 = 5
+
+
+class WireDecodeError(ValueError):
+    """Raised when a buffer is not valid protobuf wire format"""
+
+
+def read_varint(data, pos, end=None):
+    if end is None:
+        end = len(data)
+    result = 0
+    shift = 0
+    while pos < end:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return result & 0xffffffffffffffff, pos
+        shift += 7
+        if shift >= 70:
+            raise WireDecodeError('Varint too long')
+    raise WireDecodeError('Truncated varint')
+
+
+def encode_varint(value):
+    # negative values are sign extended to 64 bits, like protobuf does for
+    # int32 and int64 fields
+    value &= 0xffffffffffffffff
+    out = bytearray()
+    while value > 0x7f:
+        out.append(0x80 | (value & 0x7f))
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def encode_key(number, wire_type):
+    return encode_varint(number << 3 | wire_type)
+
+
+def encode_varint_field(number, value):
+    return encode_key(number, WIRETYPE_VARINT) + encode_varint(value)
+
+
+def encode_bytes_field(number, value):
+    return encode_key(number, WIRETYPE_LENGTH_DELIMITED) + encode_varint(
+        len(value)) + value
+
+
+def iter_fields(data, pos=0, end=None):
+    """
+    Yields (field_number, wire_type, value) for every field in data[pos:end].
+    Numeric wire types yield their integer value, length-delimited fields and
+    groups yield the (start, end) offsets of their payload.
+    """
+    if end is None:
+        end = len(data)
+    while pos < end:
+        key, pos = read_varint(data, pos, end)
+        number = key >> 3
+        wire_type = key & 7
+        if number == 0:
+            raise WireDecodeError('Invalid field number 0')
+
+        if wire_type == WIRETYPE_VARINT:
+            value, pos = read_varint(data, pos, end)
+        elif wire_type == WIRETYPE_FIXED64:
+            if pos + 8 > end:
+                raise WireDecodeError('Truncated fixed64')
+            value = struct.unpack('<Q', bytes(data[pos:pos + 8]))[0]
+            pos += 8
+        elif wire_type == WIRETYPE_FIXED32:
+            if pos + 4 > end:
+                raise WireDecodeError('Truncated fixed32')
+            value = struct.unpack('<I', bytes(data[pos:pos + 4]))[0]
+            pos += 4
+        elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+            length, pos = read_varint(data, pos, end)
+            if pos + length > end:
+                raise WireDecodeError('Truncated length-delimited field')
+            value = (pos, pos + length)
+            pos += length
+        elif wire_type == WIRETYPE_START_GROUP:
+            group_start = pos
+            group_end, pos = _skip_group(data, pos, end, number)
+            value = (group_start, group_end)
+        else:
+            raise WireDecodeError('Unexpected wire type {}'.format(wire_type))
+
+        yield number, wire_type, value
+
+
+def _skip_group(data, pos, end, number):
+    start = pos
+    while pos < end:
+        field_start = pos
+        key, pos = read_varint(data, pos, end)
+        if key & 7 == WIRETYPE_END_GROUP:
+            if key >> 3 != number:
+                raise WireDecodeError('Mismatched end group')
+            return field_start, pos
+        pos = _skip_field(data, pos, end, key)
+    raise WireDecodeError('Truncated group starting at {}'.format(start))
+
+
+def _skip_field(data, pos, end, key):
+    wire_type = key & 7
+    if wire_type == WIRETYPE_VARINT:
+        _, pos = read_varint(data, pos, end)
+    elif wire_type == WIRETYPE_FIXED64:
+        pos += 8
+    elif wire_type == WIRETYPE_FIXED32:
+        pos += 4
+    elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+        length, pos = read_varint(data, pos, end)
+        pos += length
+    elif wire_type == WIRETYPE_START_GROUP:
+        _, pos = _skip_group(data, pos, end, key >> 3)
+    else:
+        raise WireDecodeError('Unexpected wire type {}'.format(wire_type))
+
+    if pos > end:
+        raise WireDecodeError('Truncated field {}'.format(key >> 3))
+    return pos
+
+
+# Python 2 memoryviews index to str, fall back to a (copied) bytearray for
+# reading there and cut bytes slices, which b''.join and protobuf accept
+_VIEW_INDEXES_INT = isinstance(memoryview(b'\x00')[0], int)
+
+
+def split_field(data, number):
+    """
+    Cuts every occurrence of the length-delimited field `number` out of a
+    serialized message. Returns the remaining fields re-serialized as bytes
+    and the payloads of the cut out fields as memoryview slices of data,
+    which protobuf messages can parse from without copying them first (bytes
+    slices on Python 2).
+    """
+    if _VIEW_INDEXES_INT:
+        view = source = memoryview(data)
+    else:
+        view = bytearray(data)
+        source = bytes(data)
+    end = len(view)
+    pos = 0
+    rest_start = 0
+    rest = []
+    values = []
+
+    while pos < end:
+        field_start = pos
+        key, pos = read_varint(view, pos, end)
+        if key >> 3 != number or key & 7 != WIRETYPE_LENGTH_DELIMITED:
+            pos = _skip_field(view, pos, end, key)
+            continue
+
+        length, pos = read_varint(view, pos, end)
+        if pos + length > end:
+            raise WireDecodeError('Truncated length-delimited field')
+        if rest_start < field_start:
+            rest.append(source[rest_start:field_start])
+        values.append(source[pos:pos + length])
+        pos += length
+        rest_start = pos
+
+    if rest_start < end:
+        rest.append(source[rest_start:end])
+    return b''.join(rest), values
+
+
+def decode_raw(raw):
+    data = bytearray(raw)
+    lines = []
+    _format_fields(data, _parse_fields(data, 0, len(data)), 0, lines)
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def _parse_fields(data, start, end):
+    try:
+        return list(iter_fields(data, start, end))
+    except WireDecodeError:
+        return None
+
+
+def _format_fields(data, fields, depth, lines):
+    if fields is None:
+        raise WireDecodeError('Not a protobuf message')
+
+    indent = '  ' * depth
+    for number, wire_type, value in fields:
+        if wire_type == WIRETYPE_VARINT:
+            lines.append('{}{}: {}'.format(indent, number, value))
+        elif wire_type == WIRETYPE_FIXED64:
+            lines.append('{}{}: 0x{:016x}'.format(indent, number, value))
+        elif wire_type == WIRETYPE_FIXED32:
+            lines.append('{}{}: 0x{:08x}'.format(indent, number, value))
+        else:
+            start, end = value
+            nested = None
+            if wire_type == WIRETYPE_START_GROUP or end > start:
+                nested = _parse_fields(data, start, end)
+
+            if nested is not None:
+                lines.append('{}{} {{'.format(indent, number))
+                _format_fields(data, nested, depth + 1, lines)
+                lines.append('{}}}'.format(indent))
+            else:
+                lines.append('{}{}: "{}"'.format(indent, number,
+                                                 _c_escape(data[start:end])))
+
+
+_C_ESCAPES = {
+    ord('\n'): '\\n',
+    ord('\r'): '\\r',
+    ord('\t'): '\\t',
+    ord('"'): '\\"',
+    ord("'"): "\\'",
+    ord('\\'): '\\\\'
+}
+
+
+def _c_escape(value):
+    out = []
+    for b in bytearray(value):
+        if b in _C_ESCAPES:
+            out.append(_C_ESCAPES[b])
+        elif 0x20 <= b < 0x7f:
+            out.append(chr(b))
+        else:
+            out.append('\\{:03o}'.format(b))
+    return ''.join(out)
@@ -8,7 +8,9 @@ setup_dir = os.path.dirname(os.path.realpath(__file__))
 path_req = os.path.join(setup_dir, 'requirements.txt')
 install_reqs = parse_requirements(path_req, session=False)
 
-reqs = [str(ir.req) for ir in install_reqs]
+# keep environment markers, e.g. of the Python 2 only futures backport
+reqs = [str(ir.req) + ('; {}'.format(ir.markers) if ir.markers else '')
+        for ir in install_reqs]
 
 setup(name='pgoapi',
       author = 'tjado',
@@ -17,5 +19,9 @@ setup(name='pgoapi',
       url = 'https://github.com/pogodevorg/pgoapi',
       download_url = "https://github.com/pogodevorg/pgoapi/releases",
       packages = find_packages(),
-      install_requires = reqs
+      install_requires = reqs,
+      extras_require = {
+          'async': ['aiohttp>=3.3'],
+          'numpy': ['numpy']
+      }
       )